@@ -61,6 +61,10 @@ class Raven:
         parser.add_argument("--cleanup_each_optimize",
                             help="whether to clean up after running the benchmark",
                             action=argparse.BooleanOptionalAction)
+        parser.add_argument("--resume",
+                            help="continue the benchmark set with the given id. completed runs are skipped, failed runs pick up at the stage they failed in",
+                            type=int,
+                            metavar="SET_ID")
         parser.add_argument("--dryrun",
                             help="whether to only print the commands without executing them",
                             action=argparse.BooleanOptionalAction,
@@ -96,7 +100,8 @@ class Raven:
                 for experiment_file_name in args.experiment:
                     result_files, vector_file_location, join_attrs = setup.benchmark(experiment_file_name, args.config, args.system,
                                                                          args.postcleanup,
-                                                                         args.singlerun, args.stop_at_preprocess)
+                                                                         args.singlerun, args.stop_at_preprocess,
+                                                                         args.resume)
 
                     if len(result_files) >= 1:
                         match args.output_format:
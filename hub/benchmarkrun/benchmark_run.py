@@ -30,6 +30,7 @@ class BenchmarkRun:
                  warm_starts: int,
                  query_timeout: int,
                  resource_limits: dict,
+                 adaptive_warm_starts: dict | None = None,
                  ):
         """
         the Init function
@@ -41,6 +42,8 @@ class BenchmarkRun:
         :param experiment_name_file: the name of the benchmark
         :param warm_starts: the amount of warm starts to be done
         :param query_timeout: the query-timeout after which an execution shall be aborted
+        :param adaptive_warm_starts: the stopping criterion if warm starts shall be repeated until the execution time
+        is stable. warm_starts is the minimum amount of warm starts then
         """
         self.raster = copy.deepcopy(raster)
         self.vector = copy.deepcopy(vector)
@@ -51,6 +54,9 @@ class BenchmarkRun:
         self.warm_starts = warm_starts
         self.query_timeout = query_timeout
         self.resource_limits = resource_limits.copy()
+        self.adaptive_warm_starts = adaptive_warm_starts.copy() if adaptive_warm_starts else None
+        # the stages an earlier, failed attempt of this run completed, only set when a benchmark set is resumed
+        self.completed_stages: set[str] = set()
 
 
     def set_host(self, host_params: HostParameters):
@@ -59,6 +65,8 @@ class BenchmarkRun:
         """
         self.host_params = host_params
         self.measurements_loc = MeasurementsLocation(self.host_params, self.benchmark_params)
+        self.raster.set_host(host_params)
+        self.vector.set_host(host_params)
 
     def __str__(self):
         return ", ".join([f"[{p}]" for p in [str(self.raster),
@@ -68,6 +76,7 @@ class BenchmarkRun:
                                              str(self.controller_params),
                                              str(self.benchmark_params),
                                              str(self.warm_starts),
+                                             str(self.adaptive_warm_starts),
                                              str(self.query_timeout),
                                              str(self.resource_limits),
                                              str(self.measurements_loc)]])
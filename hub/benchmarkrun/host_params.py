@@ -12,13 +12,29 @@ class HostParameters:
     _ssh_config_path: Path
     _run_folder: str
     _workers: list[dict[str, str]] | None
+    _resource_sampler: str
+    _sampling_rate: int
+    _results_format: str
+    _preprocess_workers: int
+    _raster_warp_vrt: bool
+    _raster_lazy_preprocessing: bool
+    _raster_cog: bool
+    _tile_pruning: str
 
     def __init__(self,
                  ssh_connection: str,
                  ssh_config_path: str,
                  host_base_path: Path,
                  controller_params: ControllerParameters,
-                 workers: list[dict[str, str]] = None):
+                 workers: list[dict[str, str]] = None,
+                 resource_sampler: str = "cgroup",
+                 sampling_rate: int = 20,
+                 results_format: str = "csv",
+                 preprocess_workers: int = 0,
+                 raster_warp_vrt: bool = False,
+                 raster_lazy_preprocessing: bool = False,
+                 raster_cog: bool = False,
+                 tile_pruning: str = "extent"):
         """
 
         :param ssh_connection: the ssh connection base string
@@ -26,6 +42,16 @@ class HostParameters:
         :param host_base_path: the path where all files shall reside on the host
         :param controller_result_folder: the path where result files shall be put on the controller, later extended by a run-specific folder to group results
         :param controller_result_db: the path where the results database is located
+        :param resource_sampler: how resource utilization is recorded on the host, either cgroup or docker
+        :param sampling_rate: the sampling rate of the cgroup sampler in Hz
+        :param results_format: the format results are stored in on the controller, either csv or parquet
+        :param preprocess_workers: the amount of raster tiles preprocessed in parallel, all cores of the host if 0
+        :param raster_warp_vrt: whether raster tiles are warped into one VRT that is written in windows when preprocessing
+        :param raster_lazy_preprocessing: whether the raster preprocessing steps are composed as VRTs and the raster is
+        written only once
+        :param raster_cog: whether raster tiles split when preprocessing are written as cloud-optimized GeoTIFFs
+        :param tile_pruning: what raster tiles are pruned against, either the extent of the vector dataset, the
+        envelope of every feature or the geometry of every feature
         """
         self.controller_params = controller_params
         self._run_folder = controller_params.run_folder
@@ -33,6 +59,14 @@ class HostParameters:
         self._ssh_connection = ssh_connection
         self._host_base_path = host_base_path
         self._workers = workers
+        self._resource_sampler = resource_sampler
+        self._sampling_rate = sampling_rate
+        self._results_format = results_format
+        self._preprocess_workers = preprocess_workers
+        self._raster_warp_vrt = raster_warp_vrt
+        self._raster_lazy_preprocessing = raster_lazy_preprocessing
+        self._raster_cog = raster_cog
+        self._tile_pruning = tile_pruning
 
     @property
     def ssh_config_path(self):
@@ -77,6 +111,62 @@ class HostParameters:
         """
         return self._workers
 
+    @property
+    def resource_sampler(self) -> str:
+        """
+        :return: how resource utilization is recorded on the host, either cgroup or docker
+        """
+        return self._resource_sampler
+
+    @property
+    def sampling_rate(self) -> int:
+        """
+        :return: the sampling rate of the cgroup sampler in Hz
+        """
+        return self._sampling_rate
+
+    @property
+    def results_format(self) -> str:
+        """
+        :return: the format results are stored in on the controller, either csv or parquet
+        """
+        return self._results_format
+
+    @property
+    def preprocess_workers(self) -> int:
+        """
+        :return: the amount of raster tiles preprocessed in parallel, all cores of the host if 0
+        """
+        return self._preprocess_workers
+
+    @property
+    def raster_warp_vrt(self) -> bool:
+        """
+        :return: whether raster tiles are warped into one VRT that is written in windows when preprocessing
+        """
+        return self._raster_warp_vrt
+
+    @property
+    def raster_lazy_preprocessing(self) -> bool:
+        """
+        :return: whether the raster preprocessing steps are composed as VRTs and the raster is written only once
+        """
+        return self._raster_lazy_preprocessing
+
+    @property
+    def raster_cog(self) -> bool:
+        """
+        :return: whether raster tiles split when preprocessing are written as cloud-optimized GeoTIFFs
+        """
+        return self._raster_cog
+
+    @property
+    def tile_pruning(self) -> str:
+        """
+        :return: what raster tiles are pruned against, either extent, envelope or features
+        """
+        return self._tile_pruning
+
     # FIXME eventually remove duplicated code with ControllerParameters
 
     def close_db(self):
@@ -0,0 +1,230 @@
+#!/bin/bash
+# samples the resource utilization of all docker containers on the host from their cgroup v2 files.
+#
+# usage: cgroup_sampler.sh <samples file> <overhead file> [rate in Hz]
+#
+# protocol: prints "sampler started" once set up and "sampler ready" after the second sample (the first one that
+# allows computing a cpu rate). the line "idle <millicores> <samples> <max wait in s>" on stdin arms the idle
+# detection: once the containers together use less than <millicores> for <samples> consecutive samples, the sampler
+# prints "sampler idle", or "sampler idle timeout" if that does not happen within the max wait. any other line on
+# stdin or closing stdin stops the sampler. it takes a last sample, writes its own overhead to the overhead file and
+# prints "sampler stopped".
+#
+# the sampling loop only uses bash builtins, thus it does not fork. the only exception is resolving the name of a
+# container the first time it is seen.
+
+SAMPLES_FILE=$1
+OVERHEAD_FILE=$2
+RATE=${3:-20}
+CGROUP_ROOT=${CGROUP_ROOT:-/sys/fs/cgroup}
+
+if [[ ! -f $CGROUP_ROOT/cgroup.controllers ]]; then
+  echo "cgroup v2 is not available on this host"
+  exit 1
+fi
+
+if (( RATE < 1 || RATE > 1000 )); then
+  echo "invalid sampling rate $RATE"
+  exit 1
+fi
+
+INTERVAL_US=$(( 1000000 / RATE ))
+# new containers are looked up once per second
+DISCOVER_EVERY=$RATE
+CLK_TCK=$(getconf CLK_TCK)
+
+MEM_TOTAL=0
+while read -r key value _; do
+  if [[ $key == "MemTotal:" ]]; then
+    MEM_TOTAL=$(( value * 1024 ))
+    break
+  fi
+done < /proc/meminfo
+
+declare -A CONTAINER_PATHS CONTAINER_NAMES
+
+now_us() {
+  NOW_US=${EPOCHREALTIME//[.,]/}
+}
+
+discover_containers() {
+  local dir id
+  # systemd cgroup driver and cgroupfs driver
+  for dir in "$CGROUP_ROOT"/system.slice/docker-*.scope "$CGROUP_ROOT"/docker/*/; do
+    dir=${dir%/}
+    [[ -d $dir ]] || continue
+    id=${dir##*/}
+    id=${id#docker-}
+    id=${id%.scope}
+    (( ${#id} == 64 )) || continue
+
+    if [[ -z ${CONTAINER_PATHS[$id]} ]]; then
+      CONTAINER_PATHS[$id]=$dir
+      CONTAINER_NAMES[$id]=$(docker inspect --format '{{.Name}}' "$id" 2>/dev/null)
+      CONTAINER_NAMES[$id]=${CONTAINER_NAMES[$id]#/}
+    fi
+  done
+}
+
+sample_container() {
+  local id=$1
+  local dir=${CONTAINER_PATHS[$id]}
+  local key cpu mem limit inactive=0 rbytes=0 wbytes=0 pids=0 pid rx=0 tx=0 line field
+  local -a fields
+
+  # the container is gone
+  if ! { read -r key cpu _ < "$dir/cpu.stat"; } 2>/dev/null; then
+    unset "CONTAINER_PATHS[$id]" "CONTAINER_NAMES[$id]"
+    return
+  fi
+
+  { read -r mem < "$dir/memory.current"; } 2>/dev/null || mem=0
+  { read -r limit < "$dir/memory.max"; } 2>/dev/null || limit=max
+  [[ $limit == max ]] && limit=$MEM_TOTAL
+  { read -r pids < "$dir/pids.current"; } 2>/dev/null || pids=0
+
+  # same as docker stats: the page cache that may be reclaimed does not count as used memory
+  while read -r key field; do
+    if [[ $key == inactive_file ]]; then
+      inactive=$field
+      break
+    fi
+  done 2>/dev/null < "$dir/memory.stat"
+  (( inactive < mem )) && (( mem -= inactive ))
+
+  while read -r -a fields; do
+    for field in "${fields[@]:1}"; do
+      case $field in
+        rbytes=*) (( rbytes += ${field#rbytes=} )) ;;
+        wbytes=*) (( wbytes += ${field#wbytes=} )) ;;
+      esac
+    done
+  done 2>/dev/null < "$dir/io.stat"
+
+  # network counters are not part of the cgroup, they are read from the network namespace of the container
+  if { read -r pid < "$dir/cgroup.procs"; } 2>/dev/null && [[ -n $pid ]]; then
+    while read -r line; do
+      fields=( ${line/:/ } )
+      [[ ${fields[0]} == lo || ! ${fields[1]} =~ ^[0-9]+$ ]] && continue
+      (( rx += fields[1], tx += fields[9] ))
+    done 2>/dev/null < "/proc/$pid/net/dev"
+  fi
+
+  (( total_cpu += cpu ))
+
+  now_us
+  printf '%d.%06d\t%s\t%s\t%d\t%d\t%d\t%d\t%d\t%d\t%d\t%d\n' \
+    $(( NOW_US / 1000000 )) $(( NOW_US % 1000000 )) "${id:0:12}" "${CONTAINER_NAMES[$id]}" \
+    "$cpu" "$mem" "$limit" "$rx" "$tx" "$rbytes" "$wbytes" "$pids" >&"$OUT"
+}
+
+sample() {
+  local id
+  (( samples % DISCOVER_EVERY == 0 )) && discover_containers
+  total_cpu=0
+  for id in "${!CONTAINER_PATHS[@]}"; do
+    sample_container "$id"
+  done
+  (( samples += 1 ))
+}
+
+check_idle() {
+  local cpu_delta=$(( total_cpu - last_total_cpu )) time_delta=$(( NOW_US - last_sample_us ))
+  last_total_cpu=$total_cpu
+  last_sample_us=$NOW_US
+  (( idle_armed )) || return
+
+  # the cpu time of all containers in us per elapsed us, compared in millicores
+  if (( time_delta > 0 && cpu_delta * 1000 < idle_millicores * time_delta )); then
+    (( idle_streak += 1 ))
+  else
+    idle_streak=0
+  fi
+
+  if (( idle_streak >= idle_samples )); then
+    echo "sampler idle"
+    idle_armed=0
+  elif (( NOW_US >= idle_deadline_us )); then
+    echo "sampler idle timeout"
+    idle_armed=0
+  fi
+}
+
+arm_idle() {
+  local -a args=( $1 )
+  idle_millicores=${args[1]:-50}
+  idle_samples=${args[2]:-$RATE}
+  idle_deadline_us=$(( NOW_US + ${args[3]:-30} * 1000000 ))
+  idle_streak=0
+  idle_armed=1
+}
+
+exec {OUT}>>"$SAMPLES_FILE"
+[[ -s $SAMPLES_FILE ]] || printf 'timestamp\tID\tName\tCPUUsec\tMemUsage\tMemLimit\tNetIO_in\tNetIO_out\tBlockIO_in\tBlockIO_out\tPIDs\n' >&"$OUT"
+
+samples=0
+busy_us=0
+total_cpu=0
+last_total_cpu=0
+idle_armed=0
+stopped=0
+now_us
+start_us=$NOW_US
+next_us=$NOW_US
+last_sample_us=$NOW_US
+echo "sampler started"
+
+while true; do
+  now_us
+  iteration_start_us=$NOW_US
+  sample
+  now_us
+  check_idle
+  (( busy_us += NOW_US - iteration_start_us ))
+  (( samples == 2 )) && echo "sampler ready"
+
+  (( next_us += INTERVAL_US ))
+  if (( next_us - NOW_US < 1 )); then
+    # the sampler fell behind, do not try to catch up
+    next_us=$(( NOW_US + 1 ))
+  fi
+
+  # waiting on stdin doubles as the sleep between two samples. commands on stdin do not shift the sampling schedule
+  while true; do
+    now_us
+    (( wait_us = next_us - NOW_US ))
+    (( wait_us < 1 )) && break
+    printf -v timeout '%d.%06d' $(( wait_us / 1000000 )) $(( wait_us % 1000000 ))
+    read -r -t "$timeout" command 2>/dev/null
+    rc=$?
+    (( rc > 128 )) && break
+
+    if (( rc == 0 )) && [[ $command == idle* ]]; then
+      arm_idle "$command"
+    else
+      stopped=1
+      break
+    fi
+  done
+  (( stopped )) && break
+done
+
+now_us
+iteration_start_us=$NOW_US
+sample
+now_us
+(( busy_us += NOW_US - iteration_start_us ))
+exec {OUT}>&-
+
+# utime, stime, cutime and cstime of the sampler in clock ticks, including the name lookups
+read -r -a fields < "/proc/$BASHPID/stat"
+cpu_us=$(( (fields[13] + fields[14] + fields[15] + fields[16]) * 1000000 / CLK_TCK ))
+duration_us=$(( NOW_US - start_us ))
+
+printf 'sampler\ttarget_hz\tsamples\tduration\tbusy_time\tcpu_time\ncgroup\t%d\t%d\t%d.%06d\t%d.%06d\t%d.%06d\n' \
+  "$RATE" "$samples" \
+  $(( duration_us / 1000000 )) $(( duration_us % 1000000 )) \
+  $(( busy_us / 1000000 )) $(( busy_us % 1000000 )) \
+  $(( cpu_us / 1000000 )) $(( cpu_us % 1000000 )) > "$OVERHEAD_FILE"
+
+echo "sampler stopped after $samples samples, cpu time ${cpu_us}us, busy ${busy_us}us"
@@ -1,6 +1,7 @@
 from datetime import datetime
 from pathlib import Path
 
+import duckdb
 import pandas as pd
 
 from hub.benchmarkrun.host_params import HostParameters
@@ -20,7 +21,10 @@ class Evaluator:
 
     @staticmethod
     def __read_result(file):
-        df = pd.read_csv(file, sep=",")
+        if Path(file).suffix == ".parquet":
+            df = duckdb.read_parquet(str(file)).df()
+        else:
+            df = pd.read_csv(file, sep=",")
         df.columns = df.columns.str.lower()
 
         return df
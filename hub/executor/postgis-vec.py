@@ -138,11 +138,8 @@ class Executor(PostgisExecutor):
                 f"data/results/{self.network_manager.measurements_loc.file_prepend}.queryplan.txt")
             explain_path_host = self.host_base_path.joinpath(relative_explain_file)
             query_ea = f"""EXPLAIN {query};"""
-            with open("query_ea.sql", "w") as f:
-                f.write(query_ea)
-            self.transporter.send_file(Path("query_ea.sql"), self.host_base_path.joinpath("data/query_ea.sql"), **kwargs)
+            self.transporter.send_text(query_ea, self.host_base_path.joinpath("data/query_ea.sql"), **kwargs)
             self.network_manager.run_query_ssh(f'{self.host_base_path.joinpath("config/postgis-vec/execute-analyze.sh")} {Path("/").joinpath(relative_explain_file)}', **kwargs)
-            Path("query_ea.sql").unlink()
 
             explain_path = self.network_manager.host_params.controller_result_folder.joinpath(
                 f"results_{self.network_manager.measurements_loc.file_prepend}.queryplan.txt")
@@ -156,21 +153,20 @@ class Executor(PostgisExecutor):
             f"data/results/{self.network_manager.measurements_loc.file_prepend}.{'cold' if warm_start_no == 0 else f'warm-{warm_start_no}'}.csv")
         results_path_host = self.host_base_path.joinpath(relative_results_file)
         query = f"""\copy ({query}) To '{Path("/").joinpath(relative_results_file)}';"""
-        with open("query.sql", "w") as f:
-            f.write(query)
-        self.transporter.send_file(Path("query.sql"), self.host_base_path.joinpath("data/query.sql"), **kwargs)
+        self.transporter.send_text(query, self.host_base_path.joinpath("data/query.sql"), **kwargs)
         self.network_manager.run_query_ssh(self.host_base_path.joinpath("config/postgis-vec/execute.sh"), **kwargs)
-        Path("query.sql").unlink()
 
         result_path = self.network_manager.host_params.controller_result_folder.joinpath(
             f"results_{self.network_manager.measurements_loc.file_prepend}.{'cold' if warm_start_no == 0 else f'warm-{warm_start_no}'}.csv")
-        self.transporter.get_file(
+        result_path = self.transporter.get_result_file(
             results_path_host,
             result_path,
+            csv_options=self.RESULT_CSV_OPTIONS,
             **kwargs,
         )
 
-        self.network_manager.run_remote_rm_file(results_path_host)
+        # deleted in a batch after the execution stage, keeping the round trip out of the measured window
+        self.network_manager.queue_ssh(f"rm {results_path_host}")
 
         return result_path
 
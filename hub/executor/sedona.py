@@ -98,7 +98,7 @@ class Executor:
         result_path = self.network_manager.host_params.controller_result_folder.joinpath(
             f"results_{self.network_manager.measurements_loc.file_prepend}.{'cold' if warm_start_no == 0 else f'warm-{warm_start_no}'}.csv")
         result_file = self.host_base_path.joinpath("data/results/results_sedona.csv")
-        self.transporter.get_file(
+        result_path = self.transporter.get_result_file(
             result_file,
             result_path,
             **kwargs,
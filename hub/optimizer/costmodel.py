@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import json
+import math
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from duckdb.duckdb import DuckDBPyConnection
+from pandas import DataFrame
+from shapely.set_operations import intersection
+
+from hub.benchmarkrun.tilesize import TileSize
+from hub.enums.stage import Stage
+from hub.utils.rasterlocation import RasterLocation
+from hub.utils.vectorlocation import VectorLocation
+
+# the stages an end-to-end run consists of, each one is modelled on its own
+STAGES = [Stage.PREPROCESS.value, Stage.INGESTION.value, Stage.EXECUTION.value]
+
+# the duration of every stage of past runs together with the features of the run. the duration of a stage is the span
+# of its timing markers. the execution stage spans the cold start, all warm starts and the pauses between them, thus
+# only the cold start is used, i.e., the span between its meta markers
+TRAINING_QUERY = """
+with stage_time as (
+    select run_id, stage, (epoch_ms(max("timestamp")) - epoch_ms(min("timestamp"))) / 1000 as duration
+    from timings
+    where list_contains($stages, stage) and stage != $execution
+    group by run_id, stage
+    union all
+    select run_id,
+           stage,
+           (epoch_ms(max("timestamp") filter (where event = 'end'))
+            - epoch_ms(min("timestamp") filter (where event = 'start'))) / 1000 as duration
+    from timings
+    where stage = $execution and marker = 'benchi_meta' and comment = 'cold'
+    group by run_id, stage
+)
+select st.run_id,
+       st.stage,
+       st.duration,
+       p.system,
+       coalesce(try_cast(split_part(p.raster_tile_size, 'x', 1) as bigint)
+                * try_cast(split_part(p.raster_tile_size, 'x', 2) as bigint), 0) as tile_pixels,
+       coalesce(p.raster_clip, false) as raster_clip,
+       coalesce(contains(lower(p.vector_filter_at_stage), 'preprocess'), false) as filter_at_preprocess,
+       coalesce(p.raster_resolution, 1.0) as raster_resolution,
+       rf.raster_pixels,
+       rf.vector_features,
+       rf.filter_selectivity,
+       rf.extent_selectivity,
+       rf.crs_aligned
+from stage_time st
+join benchmark_run br on st.run_id = br.id
+join parameters p on br.parameters = p.id
+join run_features rf on rf.run_id = br.id
+where st.duration > 0
+"""
+
+
+@dataclass
+class PlanEstimate:
+    """
+    the predicted end-to-end time of a candidate configuration. low and high bound the prediction by one standard
+    deviation of every stage
+    """
+    system: str
+    tile_size: TileSize
+    raster_clip: bool
+    filter_at_preprocess: bool
+    seconds: float
+    low: float
+    high: float
+    stage_seconds: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def log_spread(self) -> float:
+        """
+        :return: the standard deviation of the prediction on the log scale
+        """
+        return (math.log(self.high) - math.log(self.low)) / 2
+
+    def __str__(self):
+        return f"{self.system} {self.tile_size}: {self.seconds:.1f} s ({self.low:.1f} - {self.high:.1f} s)"
+
+
+class StageModel:
+    """
+    ridge regression of the logarithm of the duration of a single stage
+    """
+
+    def __init__(self, systems: list[str], coefficients: np.ndarray, mean: np.ndarray, std: np.ndarray,
+                 covariance: np.ndarray, sigma: float, samples: int):
+        """
+        the init function
+        :param systems: the systems seen in the training data, each has its own intercept and slopes
+        :param coefficients: the coefficients of the standardized features
+        :param mean: the mean of every feature in the training data
+        :param std: the standard deviation of every feature in the training data
+        :param covariance: the covariance of the coefficients, divided by the residual variance
+        :param sigma: the standard deviation of the residuals
+        :param samples: the amount of training samples
+        """
+        self.systems = systems
+        self.coefficients = coefficients
+        self.mean = mean
+        self.std = std
+        self.covariance = covariance
+        self.sigma = sigma
+        self.samples = samples
+
+    @staticmethod
+    def design(df: DataFrame, systems: list[str]) -> np.ndarray:
+        """
+        builds the features of every row. besides the features of the run, every system gets its own intercept and
+        its own slopes for the size of both datasets
+        :param df: the runs
+        :param systems: the systems
+        :return: the feature matrix without intercept column
+        """
+        base = np.column_stack([
+            np.log1p(df["raster_pixels"].to_numpy(dtype="float64")),
+            np.log1p(df["vector_features"].to_numpy(dtype="float64")),
+            df["filter_selectivity"].to_numpy(dtype="float64"),
+            df["extent_selectivity"].to_numpy(dtype="float64"),
+            df["crs_aligned"].to_numpy(dtype="float64"),
+            np.log1p(df["tile_pixels"].to_numpy(dtype="float64")),
+            df["raster_clip"].to_numpy(dtype="float64"),
+            df["filter_at_preprocess"].to_numpy(dtype="float64"),
+            np.log(df["raster_resolution"].to_numpy(dtype="float64")),
+        ])
+        system = np.column_stack([(df["system"] == s).to_numpy(dtype="float64") for s in systems])
+
+        return np.hstack([base, system, system * base[:, [0]], system * base[:, [1]]])
+
+    @classmethod
+    def fit(cls, df: DataFrame, ridge: float) -> StageModel:
+        """
+        fits the model to the runs of a stage
+        :param df: the runs including their duration
+        :param ridge: the strength of the regularization
+        :return: the model
+        """
+        systems = sorted(df["system"].unique().tolist())
+        features = cls.design(df, systems)
+        mean = features.mean(axis=0)
+        std = features.std(axis=0)
+        std[std == 0] = 1.0
+
+        x = np.hstack([np.ones((len(df), 1)), (features - mean) / std])
+        y = np.log(df["duration"].to_numpy(dtype="float64"))
+
+        penalty = np.eye(x.shape[1]) * ridge
+        penalty[0, 0] = 0
+        inverse = np.linalg.pinv(x.T @ x + penalty)
+        coefficients = inverse @ x.T @ y
+
+        residuals = y - x @ coefficients
+        dof = max(len(y) - np.trace(x @ inverse @ x.T), 1.0)
+        sigma = float(np.sqrt(residuals @ residuals / dof))
+
+        return cls(systems, coefficients, mean, std, inverse @ x.T @ x @ inverse, sigma, len(y))
+
+    def predict(self, df: DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """
+        predicts the logarithm of the duration
+        :param df: the candidate runs
+        :return: the predicted mean and its standard deviation, which grows for candidates unlike the training data
+        """
+        x = np.hstack([np.ones((len(df), 1)), (self.design(df, self.systems) - self.mean) / self.std])
+        variance = self.sigma ** 2 * (1 + np.einsum("ij,jk,ik->i", x, self.covariance, x))
+
+        return x @ self.coefficients, np.sqrt(variance)
+
+
+class CostModel:
+    """
+    predicts the end-to-end time of a configuration from the timings of past runs. every stage is modelled by a
+    regression over the size of the datasets, the selectivity of the workload, the crs alignment, the tile size and the
+    system
+    """
+    MIN_SAMPLES = 10
+    RIDGE = 1.0
+
+    # the features per dataset and workload, shared by all hosts performing runs at the same time
+    _features_cache: dict[tuple, dict] = {}
+    _features_lock = threading.Lock()
+
+    def __init__(self, stage_models: dict[str, StageModel], reason: str = ""):
+        """
+        the init function
+        :param stage_models: the model per stage
+        :param reason: why the model is not trained, if it is not
+        """
+        self.stage_models = stage_models
+        self.reason = reason
+
+    @property
+    def is_trained(self) -> bool:
+        return all(stage in self.stage_models for stage in STAGES)
+
+    @property
+    def systems(self) -> set[str]:
+        """
+        :return: the systems seen in the training data of every stage
+        """
+        return set.intersection(*[set(m.systems) for m in self.stage_models.values()]) if self.stage_models else set()
+
+    @staticmethod
+    def run_features(rl: RasterLocation, vl: VectorLocation, workload: dict) -> dict:
+        """
+        returns the features of the datasets and workload of a run
+        :param rl: the raster dataset
+        :param vl: the vector dataset
+        :param workload: the workload
+        :return: the features
+        """
+        raster_extent = rl.get_extent()
+        vector_extent = vl.get_extent()
+
+        return {
+            "raster_pixels": rl.get_pixels(),
+            "vector_features": vl.get_feature_count(),
+            "filter_selectivity": vl.get_selectivity(workload.get("condition", {}).get("vector", {})),
+            "extent_selectivity": intersection(raster_extent, vector_extent).area / max(vector_extent.area,
+                                                                                        raster_extent.area),
+            "crs_aligned": rl.get_crs() == vl.get_crs(),
+        }
+
+    @classmethod
+    def cached_run_features(cls, rl: RasterLocation, vl: VectorLocation, workload: dict) -> dict | None:
+        """
+        returns the features of the datasets and workload of a run. they are computed once per dataset files and
+        workload condition, the runs of a benchmark set mostly differ in their parameters only. the features are not
+        needed to perform the run, thus a failure is only reported
+        :param rl: the raster dataset
+        :param vl: the vector dataset
+        :param workload: the workload
+        :return: the features, None if they cannot be computed
+        """
+        key = (tuple(str(f) for f in rl.controller_file), tuple(str(f) for f in vl.controller_file),
+               json.dumps(workload.get("condition", {}).get("vector", {}), sort_keys=True, default=str))
+
+        with cls._features_lock:
+            if key not in cls._features_cache:
+                try:
+                    cls._features_cache[key] = cls.run_features(rl, vl, workload)
+                except Exception as e:
+                    print(f"could not compute the features of the run, the cost model will not learn from it: {e}")
+                    return None
+
+            return cls._features_cache[key]
+
+    @classmethod
+    def fit(cls, connection: DuckDBPyConnection, ridge: float = RIDGE) -> CostModel:
+        """
+        fits the model of every stage to the past runs in the database
+        :param connection: the connection to the results database
+        :param ridge: the strength of the regularization
+        :return: the model
+        """
+        runs = connection.execute(TRAINING_QUERY, {"stages": STAGES, "execution": Stage.EXECUTION.value}).fetch_df()
+
+        stage_models = {}
+        missing = []
+        for stage in STAGES:
+            stage_runs = runs[runs["stage"] == stage]
+            if len(stage_runs) < cls.MIN_SAMPLES:
+                missing.append(f"{stage} ({len(stage_runs)} of {cls.MIN_SAMPLES} runs)")
+                continue
+
+            stage_models[stage] = StageModel.fit(stage_runs, ridge)
+
+        reason = f"too few past runs with recorded features for {', '.join(missing)}" if missing else ""
+        return cls(stage_models, reason)
+
+    def predict(self, features: dict, candidates: list[dict]) -> list[PlanEstimate]:
+        """
+        predicts the end-to-end time of candidate configurations. candidates whose system is not part of the training
+        data are skipped
+        :param features: the features of the datasets and workload
+        :param candidates: the configurations, each with system, tile_size, raster_clip and filter_at_preprocess
+        :return: the estimates, cheapest first
+        """
+        candidates = [c for c in candidates if c["system"] in self.systems]
+        if not candidates:
+            return []
+
+        df = pd.DataFrame([features | {
+            "system": c["system"],
+            "tile_pixels": max(c["tile_size"].width, 0) * max(c["tile_size"].height, 0),
+            "raster_clip": c["raster_clip"],
+            "filter_at_preprocess": c["filter_at_preprocess"],
+            "raster_resolution": c.get("raster_resolution", 1.0),
+        } for c in candidates])
+
+        seconds = np.zeros(len(df))
+        low = np.zeros(len(df))
+        high = np.zeros(len(df))
+        stage_seconds = {}
+        for stage in STAGES:
+            mean, std = self.stage_models[stage].predict(df)
+            stage_seconds[stage] = np.exp(mean)
+            seconds += np.exp(mean)
+            low += np.exp(mean - std)
+            high += np.exp(mean + std)
+
+        estimates = [PlanEstimate(c["system"], c["tile_size"], c["raster_clip"], c["filter_at_preprocess"],
+                                  float(seconds[i]), float(low[i]), float(high[i]),
+                                  {stage: float(s[i]) for stage, s in stage_seconds.items()})
+                     for i, c in enumerate(candidates)]
+
+        return sorted(estimates, key=lambda e: e.seconds)
+
+    @staticmethod
+    def probability_cheapest(best: PlanEstimate, runner_up: PlanEstimate) -> float:
+        """
+        returns the probability that the best plan is actually cheaper than the runner-up, treating both predictions
+        as independent and log-normal
+        :param best: the cheapest plan
+        :param runner_up: the second cheapest plan
+        :return: the probability
+        """
+        spread = math.sqrt(best.log_spread ** 2 + runner_up.log_spread ** 2)
+        if spread == 0:
+            return 1.0
+
+        z = (math.log(runner_up.seconds) - math.log(best.seconds)) / spread
+        return 0.5 * (1 + math.erf(z / math.sqrt(2)))
+
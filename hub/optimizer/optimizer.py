@@ -9,7 +9,6 @@ import pyproj
 from duckdb.duckdb import DuckDBPyConnection
 from pandas import DataFrame
 from shapely import Polygon
-from shapely.set_operations import intersection
 
 from hub.enums.rasterfiletype import RasterFileType
 from hub.enums.vectorfiletype import VectorFileType
@@ -24,10 +23,14 @@ from hub.utils.system import System
 from hub.utils.network import BasicNetworkManager
 from hub.utils.check_predicate import ASTQuery
 from hub.utils.capabilities import Capabilities
+from hub.optimizer.costmodel import CostModel, PlanEstimate
 
 CAPABILITIES = Capabilities.read_capabilities()
 
 class Optimizer:
+    # the tile sizes the optimizer chooses from
+    TILE_SIZES = [TileSize(600, 600), TileSize(800, 800), TileSize(1000, 1000)]
+
     @staticmethod
     def create_run_config(workload, rl: RasterLocation, vl: VectorLocation, db_connection: DuckDBPyConnection,
                           nm: BasicNetworkManager,
@@ -76,10 +79,9 @@ class Optimizer:
 
         if preprocessed_raster.empty:
             vl_extent = vl.get_extent()
-            rl_tile_extent = rl.get_extent_per_file().items()
-            any_tile_covers_vector = any(e.covers(vl_extent) for _, e in rl_tile_extent)
-            tiles_intersect_vector = sum(e.intersects(vl_extent) for _, e in rl_tile_extent)
-            tiles_intersect_ratio = tiles_intersect_vector / len(rl.files)
+            any_tile_covers_vector = rl.tile_catalog.any_covers(vl_extent)
+            tiles_intersect_vector = len(rl.tile_catalog.intersecting(vl_extent))
+            tiles_intersect_ratio = tiles_intersect_vector / len(rl.tile_catalog)
 
             preprocessed_raster = pd.DataFrame([{
                 "id": rl.uuid,
@@ -153,8 +155,9 @@ class Optimizer:
         print("OPTIMIZER: pixels per feature:", pixels_per_feature)
         print("OPTIMIZER: selected tile size:", tile_size)
 
-        extent_selectivity = intersection(rl.get_extent(), vl.get_extent()).area / max(vl.get_extent().area, rl.get_extent().area)
-        filter_selectivity = vl.get_selectivity(workload.get("condition", {}).get("vector", {}))
+        features = CostModel.run_features(rl, vl, workload)
+        extent_selectivity = features["extent_selectivity"]
+        filter_selectivity = features["filter_selectivity"]
 
         print("OPTIMIZER: extent selectivity:", extent_selectivity)
         print("OPTIMIZER: filter selectivity:", filter_selectivity)
@@ -255,6 +258,14 @@ class Optimizer:
         optimized['total_score'] = optimized['score_base_raster'].fillna(0) + optimized['score_base_vector'].fillna(0)
         optimized = optimized.sort_values(by=['total_score'], ascending=False)
 
+        # the cost model overrides the system and tile size chosen by the scores. among the rows of its system, the
+        # scores still decide which available files are reused
+        best_plan = Optimizer.select_cheapest_plan(db_connection, features, optimized['target_system_name'].unique(),
+                                                   rl, vl)
+        if best_plan is not None:
+            optimized = pd.concat([optimized[optimized['target_system_name'] == best_plan.system],
+                                   optimized[optimized['target_system_name'] != best_plan.system]])
+            tile_size = best_plan.tile_size
 
 
         optimized_config = optimized.iloc[0]
@@ -311,11 +322,8 @@ class Optimizer:
         system = System.get_by_value(optimized_config['target_system_name'])
         align_to_crs = DataType.RASTER if rl.should_preprocess else DataType.VECTOR
         align_crs_at_stage = Stage.PREPROCESS
-        vector_filter_at_stage = Stage.EXECUTION if system in [System.BEAST] and filter_selectivity > 0.05 else Stage.PREPROCESS
-        raster_clip = True
-
-        if system == System.POSTGIS and rl.get_pixels() <= 5_000_000 and vl.get_feature_count() <= 100_000:
-            raster_clip = False
+        vector_filter_at_stage = Optimizer.choose_vector_filter_at_stage(system, filter_selectivity)
+        raster_clip = Optimizer.choose_raster_clip(system, rl, vl)
 
         # raster_singlefile = system in [System.BEAST]
         raster_tile_size = tile_size
@@ -510,6 +518,65 @@ class Optimizer:
         #     raster_clip=extent_selectivity <= 0.1,
         # )
 
+    @staticmethod
+    def choose_vector_filter_at_stage(system: System, filter_selectivity: float) -> Stage:
+        return Stage.EXECUTION if system in [System.BEAST] and filter_selectivity > 0.05 else Stage.PREPROCESS
+
+    @staticmethod
+    def choose_raster_clip(system: System, rl: RasterLocation, vl: VectorLocation) -> bool:
+        return not (system == System.POSTGIS and rl.get_pixels() <= 5_000_000 and vl.get_feature_count() <= 100_000)
+
+    @staticmethod
+    def select_cheapest_plan(db_connection: DuckDBPyConnection, features: dict, systems: list[str],
+                             rl: RasterLocation, vl: VectorLocation) -> PlanEstimate | None:
+        """
+        predicts the end-to-end time of every system and tile size with the cost model trained on past runs
+        :param db_connection: the database connection
+        :param features: the features of the datasets and workload
+        :param systems: the candidate systems
+        :param rl: the raster dataset
+        :param vl: the vector dataset
+        :return: the cheapest plan, None if the cost model cannot be trained or knows none of the systems
+        """
+        cost_model = CostModel.fit(db_connection)
+        if not cost_model.is_trained:
+            print(f"OPTIMIZER: cost model not trained, {cost_model.reason}. Using the scores.")
+            return None
+
+        candidates = []
+        for system_name in systems:
+            system = System.get_by_value(system_name)
+            for tile_size in Optimizer.TILE_SIZES:
+                candidates.append({
+                    "system": system_name,
+                    "tile_size": tile_size,
+                    "raster_clip": Optimizer.choose_raster_clip(system, rl, vl),
+                    "filter_at_preprocess": Optimizer.choose_vector_filter_at_stage(
+                        system, features["filter_selectivity"]) == Stage.PREPROCESS,
+                })
+
+        unknown = sorted(set(systems) - cost_model.systems)
+        if unknown:
+            print(f"OPTIMIZER: cost model has no past runs of {unknown}, not considering them")
+
+        estimates = cost_model.predict(features, candidates)
+        if not estimates:
+            print("OPTIMIZER: cost model knows none of the candidate systems. Using the scores.")
+            return None
+
+        for estimate in estimates:
+            print("OPTIMIZER: predicted", estimate)
+
+        best = estimates[0]
+        if len(estimates) > 1:
+            probability = CostModel.probability_cheapest(best, estimates[1])
+            print(f"OPTIMIZER: selected {best}, cheaper than {estimates[1].system} {estimates[1].tile_size} with "
+                  f"probability {probability:.0%}")
+        else:
+            print(f"OPTIMIZER: selected {best}, the only candidate")
+
+        return best
+
     @staticmethod
     def add_vector_info(vector_ds: DataFrame, vl: VectorLocation, ast: ASTQuery) -> DataFrame:
         vector_ds['filter_predicate'] = vector_ds['filter_predicate'].apply(
@@ -3,6 +3,8 @@ import copy
 import importlib
 import json
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from pathlib import Path
 from time import sleep, time
@@ -21,9 +23,12 @@ from hub.utils.filetransporter import FileTransporter
 from hub.utils.network import NetworkManager
 from hub.utils.system import System
 from hub.utils.interfaces import ExecutorInterface
-from hub.zsresultsdb.submit_data import DuckDBRunCursor
+from hub.zsresultsdb.submit_data import DuckDBRunCursor, RESULT_CSV_OPTIONS
 from hub.utils.capabilities import Capabilities
 from hub.utils.network import BasicNetworkManager
+from hub.utils.runprefetcher import RunPrefetcher
+from hub.utils.adaptiverepetition import AdaptiveRepetition
+from hub.optimizer.costmodel import CostModel
 from hub.optimizer.optimizer import Optimizer
 from hub.zsresultsdb.init_duckdb import InitializeDuckDB
 
@@ -51,12 +56,23 @@ class Setup:
     """
     the main utility containing all benchi-related routines
     """
+    # written into the preprocessed directory of a dataset by preprocess.py once the preprocess stage completed, the
+    # name is passed along with the preprocess parameters
+    PREPROCESSED_SENTINEL = ".benchi_preprocessed"
 
-    def __init__(self, progress_listener=None) -> None:
+    def __init__(self, progress_listener=None, fanout=False) -> None:
+        """
+        the init function
+        :param progress_listener: called with the progress and the maximum progress whenever a step is completed
+        :param fanout: whether other hosts perform runs of the same benchmark set at the same time
+        """
+        self._fanout = fanout
         self.logger = {}
         self._progress = 0
         self._max_progress = 0
         self._progress_listener = progress_listener
+        # the setups of the hosts of a fanout report their progress from their own threads
+        self._progress_lock = threading.Lock()
         self.workers_nm: list[BasicNetworkManager] = []
         self.workers_ft: list[FileTransporter] = []
         self.timings_list = []
@@ -66,9 +82,10 @@ class Setup:
         return self._progress
 
     def increase_progress(self):
-        self._progress += 1
-        if self._progress_listener:
-            self._progress_listener(self._progress, self._max_progress)
+        with self._progress_lock:
+            self._progress += 1
+            if self._progress_listener:
+                self._progress_listener(self._progress, self._max_progress)
 
     @property
     def max_progress(self) -> int:
@@ -108,29 +125,47 @@ class Setup:
 
         network_manager, run_cursor, transporter = self.setup_host(iteration, run, system)
 
-        self.do_preprocess(network_manager, run, system, optmizer_run)
+        # a failed stage must not leave its measured window open, it blocks all background work on the host
+        try:
+            self.do_preprocess(network_manager, run, system, optmizer_run)
+            run_cursor.write_checkpoint(Stage.PREPROCESS.value)
 
-        print("Post Preprocess DL: {}, {}".format(str(run.raster), str(run.vector)))
+            print("Post Preprocess DL: {}, {}".format(str(run.raster), str(run.vector)))
 
-        if stop_at_preprocess:
-            print("Stopping at preprocess")
-            transporter.get_measurements(run.measurements_loc)
+            if stop_at_preprocess:
+                print("Stopping at preprocess")
+                transporter.get_measurements(run.measurements_loc)
+                network_manager.close_timings()
 
-            return []
+                return []
 
-        self.do_ingestion(network_manager, run, system, optmizer_run)
+            self.do_ingestion(network_manager, run, system, optmizer_run)
+            run_cursor.write_checkpoint(Stage.INGESTION.value)
 
-        executor, result_files = self.do_execution(network_manager, run, system)
+            executor, result_files = self.do_execution(network_manager, run, system)
+            run_cursor.write_checkpoint(Stage.EXECUTION.value)
+        except BaseException:
+            network_manager.abort_measure_docker()
+            raise
 
         result_files_not_empty = self.pull_data(executor, result_files, run, run_cursor, transporter)
+        run_cursor.write_checkpoint("pull_data")
 
         if do_teardown:
             self.do_teardown(run, transporter)
 
+        setup_intervals = network_manager.multiplexer.pop_setup_intervals()
+        for start, end in setup_intervals:
+            self.timings_list.append(f"raven_marker,{start},start,ssh_setup,raven,,")
+            self.timings_list.append(f"raven_marker,{end},end,ssh_setup,raven,,")
+        # the multiplexer is shared by all runs on the host, only the connections established since the last run count
+        self.logger["SSH_CONNECTION_SETUP"] = int(sum(end - start for start, end in setup_intervals) * 1000)
+
         for timing in self.timings_list:
             network_manager.write_timings_marker(timing)
 
         self.timings_list = []
+        network_manager.close_timings()
 
         return list(map(lambda resfile: resfile[0], result_files_not_empty)), run_cursor.run_id
 
@@ -143,7 +178,11 @@ class Setup:
             Setup
             """
 
-        run_cursor = run.host_params.controller_db_connection.initialize_benchmark_run(run.benchmark_params, iteration)
+        run_cursor = run.host_params.controller_db_connection.initialize_benchmark_run(run.benchmark_params, iteration,
+                                                                                       run.host_params.ssh_connection)
+        run_features = CostModel.cached_run_features(run.raster, run.vector, run.workload)
+        if run_features is not None:
+            run_cursor.write_run_features(run_features)
         network_manager = NetworkManager(run.host_params, run.benchmark_params.system.name, run.measurements_loc,
                                          run_cursor, run.query_timeout)
         transporter = FileTransporter(network_manager)
@@ -176,7 +215,9 @@ class Setup:
             if "networks" in main_yaml["services"][system.name]:
                 del main_yaml["services"][system.name]["networks"]
 
-        PROJECT_ROOT.joinpath(f"deployment/files/{system.name}/docker-compose.yml").write_text(yaml.dump(main_yaml))
+        # the compose files depend on the run, thus they are sent on their own instead of being written into the config
+        # folder shared by all hosts
+        compose_files = {"docker-compose.yml": main_yaml}
 
         if system.name in capabilities["distributed"]:
             env = rendered_yaml["services"][system.name].get("environment", {})
@@ -222,7 +263,7 @@ class Setup:
 
                 del worker_yaml["services"][worker_name]["depends_on"]
 
-                PROJECT_ROOT.joinpath(f"deployment/files/{system.name}/docker-compose.worker.yml").write_text(yaml.dump(worker_yaml))
+                compose_files["docker-compose.worker.yml"] = worker_yaml
 
 
             else:
@@ -253,11 +294,20 @@ class Setup:
         """
             transfer configs and datasets to the host
             """
-        transporter.send_configs(log_time=self.logger)
+        with network_manager.batched(raise_on_failure=True):
+            transporter.create_config_dir()
+            transporter.create_data_dirs(run.vector)
+            transporter.create_data_dirs(run.raster)
+
+        transporter.send_configs(create_dirs=False, log_time=self.logger)
+        for compose_file, compose in compose_files.items():
+            transporter.send_text(yaml.dump(compose),
+                                  run.host_params.host_base_path.joinpath("config", system.name, compose_file),
+                                  log_time=self.logger)
         # print(run.vector)
-        transporter.send_data(run.vector, log_time=self.logger)
+        transporter.send_data(run.vector, create_dirs=False, log_time=self.logger)
         print(run.raster)
-        transporter.send_data(run.raster, log_time=self.logger)
+        transporter.send_data(run.raster, create_dirs=False, log_time=self.logger)
         # Give execute permission
         network_manager.run_ssh(f"chmod +x {run.host_params.host_base_path.joinpath('config/**/*.sh')}",
                                 log_time=self.logger)
@@ -289,7 +339,10 @@ class Setup:
             Preprocess stage
             """
         if run.raster.should_preprocess or run.vector.should_preprocess:
-            network_manager.start_measure_docker("preprocess", prerecord=False)
+            reuse_preprocessed = Stage.PREPROCESS.value in run.completed_stages and \
+                                 self.preprocessed_files_available(network_manager, run)
+            if not reuse_preprocessed:
+                network_manager.start_measure_docker("preprocess", prerecord=False)
             command = run.host_params.host_base_path.joinpath(f'config/{system}/preprocess.sh')
             vector_target_crs = run.benchmark_params.vector_target_crs.to_epsg() \
                 if run.benchmark_params.align_crs_at_stage == Stage.PREPROCESS \
@@ -339,6 +392,12 @@ class Setup:
                          f'--{"" if run.benchmark_params.raster_singlefile else "no-"}raster_singlefile ' \
                          f'--{"" if run.raster.should_preprocess else "no-"}preprocess_raster ' \
                          f'--{"" if run.vector.should_preprocess else "no-"}preprocess_vector ' \
+                         f'--raster_workers {run.host_params.preprocess_workers} ' \
+                         f'--{"" if run.host_params.raster_warp_vrt else "no-"}raster_warp_vrt ' \
+                         f'--{"" if run.host_params.raster_lazy_preprocessing else "no-"}raster_lazy ' \
+                         f'--{"" if run.host_params.raster_cog else "no-"}raster_cog ' \
+                         f'--raster_tile_pruning {run.host_params.tile_pruning} ' \
+                         f'--preprocessed_sentinel {self.PREPROCESSED_SENTINEL} ' \
                          f''
                          # f'''{'--extent "' + extent_str + '"' if extent else ""} ''' \
 
@@ -348,15 +407,19 @@ class Setup:
 
 
 
-            print(f"running {command} {parameters}")
-            "create a string that encodes parameters to a base64 string"
-            network_manager.run_ssh(f"{command} {base64.b64encode(parameters.encode('utf-8')).decode('utf-8')}",
-                                    log_time=self.logger,
-                                    )
+            if reuse_preprocessed:
+                print(f"reusing the files preprocessed by a failed attempt of the run, skipping {command} {parameters}")
+            else:
+                print(f"running {command} {parameters}")
+                "create a string that encodes parameters to a base64 string"
+                network_manager.run_ssh(f"{command} {base64.b64encode(parameters.encode('utf-8')).decode('utf-8')}",
+                                        log_time=self.logger,
+                                        )
             run.raster.check_file_is_merged(run.benchmark_params.raster_singlefile)
             run.raster.set_preprocessed(run.controller_params.controller_db_connection.get_cursor(), run.benchmark_params, run.workload, network_manager, optimizer_run)
             run.vector.set_preprocessed(run.controller_params.controller_db_connection.get_cursor(), run.benchmark_params, run.workload, network_manager, optimizer_run)
-            network_manager.stop_measure_docker()
+            if not reuse_preprocessed:
+                network_manager.stop_measure_docker()
         # print("Wait 5s until docker is ready")
         # sleep(5)
 
@@ -365,6 +428,29 @@ class Setup:
         self.increase_progress()
 
 
+    @classmethod
+    def preprocessed_sentinels(cls, run: BenchmarkRun) -> list[Path]:
+        """
+        the sentinels marking the output of the preprocess stage as complete, one per dataset that shall be preprocessed.
+        they are written at the very end of preprocessing and removed when it starts
+        :param run: the benchmark run
+        :return: the sentinels on the host
+        """
+        return [d.host_dir_preprocessed.joinpath(cls.PREPROCESSED_SENTINEL)
+                for d in (run.raster, run.vector) if d.should_preprocess]
+
+    @classmethod
+    def preprocessed_files_available(cls, network_manager: NetworkManager, run: BenchmarkRun) -> bool:
+        """
+        checks whether the output of the preprocess stage of a failed attempt of the run is still on the host. the
+        preprocessed directories only depend on the benchmark parameters, thus they are found again. the directories
+        are created during the setup, thus only the sentinels written after a successful preprocess stage tell
+        :param network_manager: the network manager of the host
+        :param run: the benchmark run
+        :return: whether all datasets that shall be preprocessed are available
+        """
+        return network_manager.run_ssh(" && ".join(f"test -f {s}" for s in cls.preprocessed_sentinels(run))) == 0
+
     def launch_workers(self,
                        system_i: System, network_manager: NetworkManager) -> None:
 
@@ -427,21 +513,41 @@ class Setup:
         result_files.append(executor.run_query(run.workload, warm_start_no=0, log_time=self.logger))
         network_manager.add_meta_marker_end()
         self.increase_progress()
-        # i warm starts
-        for i in range(1, run.warm_starts + 1):
-            sleep(8)
-            print(f"running warm start {i} out of {run.warm_starts} for parameters {run.benchmark_params}")
+        # i warm starts, either a fixed amount or until the execution time is stable
+        repetition = AdaptiveRepetition(run.warm_starts, **run.adaptive_warm_starts) \
+            if run.adaptive_warm_starts else None
+        i = 1
+        while (i <= run.warm_starts) if repetition is None else repetition.should_continue():
+            self.pause_between_executions(network_manager)
+            print(f"running warm start {i} out of "
+                  f"{run.warm_starts if repetition is None else f'at most {repetition.max_warm_starts}'} "
+                  f"for parameters {run.benchmark_params}")
             network_manager.add_meta_marker_start(i)
             result_files.append(executor.run_query(run.workload, warm_start_no=i, log_time=self.logger))
             network_manager.add_meta_marker_end()
 
-            self.increase_progress()
+            if repetition is not None:
+                repetition.add(network_manager.last_execution_time)
 
+            self.increase_progress()
+            i += 1
 
         network_manager.stop_measure_docker()
 
         return executor, result_files
 
+    @staticmethod
+    def pause_between_executions(network_manager: NetworkManager):
+        """
+        waits until the system-under-test settled after an execution run, i.e., until the resource sampler reports
+        the containers as idle. waits a fixed 8 seconds if the sampler cannot tell or the containers did not go idle
+        in time
+        :param network_manager: the network manager of the run
+        :return:
+        """
+        if not network_manager.wait_until_idle():
+            sleep(8)
+
     @print_timings(stage="pull_data")
     def pull_data(self,
                   executor: ExecutorInterface,
@@ -451,6 +557,8 @@ class Setup:
                   transporter: FileTransporter) -> list[tuple[Path, bool]]:
         transporter.get_measurements(run.measurements_loc)
         executor.post_run_cleanup()
+        # removes result files whose deletion was deferred out of the measured execution windows
+        transporter.network_manager.flush_batch()
         """
             transfer results to database
             """
@@ -459,7 +567,9 @@ class Setup:
         run_cursor.add_resource_utilization(
             [f for f in resource_utilization_files if f.exists()]
         )
-        result_files_emptiness_info = list(map(run_cursor.add_results_file, result_files))
+        # the executors do not share a base class, those whose results differ from the usual csv layout declare it
+        csv_options = getattr(executor, "RESULT_CSV_OPTIONS", RESULT_CSV_OPTIONS)
+        result_files_emptiness_info = [run_cursor.add_results_file(f, csv_options) for f in result_files]
         result_files_not_empty = list(filter(lambda r: r[1], result_files_emptiness_info))
 
         return result_files_not_empty
@@ -556,7 +666,7 @@ class Setup:
         return run_id
 
     def benchmark(self, experiment_file_name: str, config_file: str, system=None, post_cleanup=True,
-                  single_run=True, stop_at_preprocess=False) -> tuple[list[Path], Path, list[str]]:
+                  single_run=True, stop_at_preprocess=False, resume_set_id: int | None = None) -> tuple[list[Path], Path, list[str]]:
         """
         anchor function that starts a benchmark set
         :param experiment_file_name: the path to the experiment definintion
@@ -565,6 +675,7 @@ class Setup:
         :param post_cleanup: whether to perform a cleanup after the run. only evaluated if a single run is performed
         :param single_run: whether to perform only a single run (the first in the lsit of experiments). Intended for debugging purposes
         :param stop_at_preprocess: whether to stop the benchmark after preprocessing
+        :param resume_set_id: the id of an earlier benchmark set to continue instead of starting a new one
         :return: a list of paths containing references to the results
         """
         runs, iterations = FileIO.read_experiments_config(experiment_file_name, config_file,
@@ -577,8 +688,14 @@ class Setup:
         print(f"running {len(runs)} experiments")
         print([str(r.benchmark_params) for r in runs])
 
-        runs[0].host_params.controller_db_connection.initialize_benchmark_set(Path(experiment_file_name).parts[-1], runs[0].resource_limits)
-
+        if resume_set_id is not None:
+            runs[0].host_params.controller_db_connection.resume_benchmark_set(resume_set_id, Path(experiment_file_name).parts[-1])
+            runs = self.resume_runs(runs, stop_at_preprocess)
+            if not runs:
+                print(f"all runs of benchmark set {resume_set_id} are completed")
+                return [], None, []
+        else:
+            runs[0].host_params.controller_db_connection.initialize_benchmark_set(Path(experiment_file_name).parts[-1], runs[0].resource_limits)
 
         result_files = []
         if system:
@@ -586,28 +703,121 @@ class Setup:
                 run = next(r for r in runs if r.benchmark_params.system.name == system)
                 print(str(run))
 
-                run.raster.select_relevant_tiles(run.vector.get_extent(), "filesystem", run.controller_params.controller_db_connection.get_cursor())
+                run.raster.select_relevant_tiles(run.vector.get_extent(), "filesystem", run.controller_params.controller_db_connection.get_cursor(),
+                                                 run.vector.get_pruning_geometries(run.host_params.tile_pruning))
 
                 result_files.extend(self.run_tasks(run, stop_at_preprocess=stop_at_preprocess)[0])
                 if post_cleanup:
                     self.clean(config_file)
             else:
-                for run in list(filter(lambda r: r.benchmark_params.system.name == system, runs)):
-                    run.raster.select_relevant_tiles(run.vector.get_extent(), "filesystem",
-                                                     run.controller_params.controller_db_connection.get_cursor())
-
-                    result_files.extend(self.run_tasks(run, stop_at_preprocess=stop_at_preprocess)[0])
-                    self.clean(config_file)
+                result_files.extend(self.run_fanout(list(filter(lambda r: r.benchmark_params.system.name == system, runs)),
+                                                    config_file, stop_at_preprocess))
 
         else:
-            for run in runs:
-                run.raster.select_relevant_tiles(run.vector.get_extent(), "filesystem",
-                                                 run.controller_params.controller_db_connection.get_cursor())
+            result_files.extend(self.run_fanout(runs, config_file, stop_at_preprocess))
+
+        return result_files, runs[0].vector.controller_file[0], runs[0].workload.get("get", {}).get("vector", [])
+
+    @staticmethod
+    def resume_runs(runs: list[BenchmarkRun], stop_at_preprocess=False) -> list[BenchmarkRun]:
+        """
+        drops the runs that already completed within the resumed benchmark set. runs that failed part-way remember the
+        stages they completed, thus they pick up where they failed. a run is completed once its results are stored.
+        runs of sets recorded before stages were checkpointed are completed if all of their result files are stored
+        :param runs: the benchmark runs of the experiment
+        :param stop_at_preprocess: whether the benchmark stops after preprocessing
+        :return: the runs that still have to be performed
+        """
+        remaining = []
+        for run in runs:
+            stages, result_files = run.controller_params.controller_db_connection.get_run_progress(run.benchmark_params)
+            final_stage = Stage.PREPROCESS.value if stop_at_preprocess else "pull_data"
+
+            if final_stage in stages or (not stop_at_preprocess and result_files >= run.warm_starts + 1):
+                print(f"skipping completed run {run.benchmark_params}")
+                continue
+
+            if stages:
+                print(f"resuming run {run.benchmark_params}, completed stages: {', '.join(sorted(stages))}")
+
+            run.completed_stages = stages
+            remaining.append(run)
+
+        print(f"{len(runs) - len(remaining)} of {len(runs)} runs are already completed")
+        return remaining
+
+    def run_fanout(self, runs: list[BenchmarkRun], config_file: str, stop_at_preprocess=False) -> list[Path]:
+        """
+        spreads the benchmark runs across all hosts of the config. the runs are assigned round-robin and every run is
+        pinned to its host. all hosts work at the same time, each performing its runs one after another
+        :param runs: the benchmark runs
+        :param config_file: the location of the config file
+        :param stop_at_preprocess: whether to stop the benchmark after preprocessing
+        :return: the result files of all runs
+        """
+        if not runs:
+            return []
+
+        # all runs write into the same benchmark set, thus the hosts share the controller parameters of the runs
+        hosts, _ = FileIO.get_all_host_params(config_file, runs[0].controller_params)
+        if len(hosts) == 1:
+            return self.run_pipelined(runs, config_file, stop_at_preprocess)
+
+        runs_per_host = [runs[idx::len(hosts)] for idx in range(len(hosts))]
+        for host, host_runs in zip(hosts, runs_per_host):
+            for run in host_runs:
+                run.set_host(host)
+
+        def perform(host_runs: list[BenchmarkRun]) -> list[Path]:
+            host_setup = Setup(progress_listener=lambda progress, max_progress: self.increase_progress(), fanout=True)
+            return host_setup.run_pipelined(host_runs, config_file, stop_at_preprocess)
+
+        print(f"spreading {len(runs)} runs across {len(hosts)} hosts: "
+              f"{', '.join(f'{h.ssh_connection} ({len(r)})' for h, r in zip(hosts, runs_per_host))}")
+
+        result_files = []
+        with ThreadPoolExecutor(max_workers=len(hosts), thread_name_prefix="host") as pool:
+            for host_result_files in pool.map(perform, [host_runs for host_runs in runs_per_host if host_runs]):
+                result_files.extend(host_result_files)
+
+        return result_files
+
+    def run_pipelined(self, runs: list[BenchmarkRun], config_file: str, stop_at_preprocess=False) -> list[Path]:
+        """
+        performs the benchmark runs one after another. while a run is performed, the datasets and docker images of the
+        next run are staged on the host in the background. staging pauses during the measured windows of the run
+        :param runs: the benchmark runs
+        :param config_file: the location of the config file
+        :param stop_at_preprocess: whether to stop the benchmark after preprocessing
+        :return: the result files of all runs
+        """
+        def select_relevant_tiles(run: BenchmarkRun):
+            run.raster.select_relevant_tiles(run.vector.get_extent(), "filesystem",
+                                             run.controller_params.controller_db_connection.get_cursor(),
+                                             run.vector.get_pruning_geometries(run.host_params.tile_pruning))
+
+        result_files = []
+        if not runs:
+            return result_files
+
+        prefetcher = RunPrefetcher()
+        try:
+            select_relevant_tiles(runs[0])
+            prefetcher.prefetch(runs[0])
+
+            for run, next_run in zip(runs, runs[1:] + [None]):
+                prefetcher.wait()
+                if next_run is not None:
+                    select_relevant_tiles(next_run)
+                    prefetcher.prefetch(next_run)
 
                 result_files.extend(self.run_tasks(run, stop_at_preprocess=stop_at_preprocess)[0])
-                self.clean(config_file)
+                # the datasets of the next run are not linked yet
+                self.clean(config_file, run, prune_dataset_cache=next_run is None)
+        finally:
+            prefetcher.close()
 
-        return result_files, runs[0].vector.controller_file[0], runs[0].workload.get("get", {}).get("vector", [])
+        return result_files
 
     def evaluate(self, config_filename: str, result_files: list[Path], base_run_str="", evalfolder=""):
         """
@@ -623,22 +833,36 @@ class Setup:
         evaluator = Evaluator(result_files, host_params, evalfolder)
         evaluator.get_accuracy(base_run_str)
 
-    def clean(self, config_filename: str):
+    def clean(self, config_filename: str, run: BenchmarkRun = None, prune_dataset_cache: bool = True):
         """
         the cleanup routine
         :param config_filename: the config for which the cleanup shall be performed
+        :param run: the run whose host to clean up, the first host of the config if not given
+        :param prune_dataset_cache: whether to remove the cached dataset files that no dataset folder links to. must
+        not be set while datasets of later runs are staged in the background
         :return:
         """
-        host_params, controller_params = FileIO.get_host_params(config_filename)
+        if run is None:
+            host_params, controller_params = FileIO.get_host_params(config_filename)
+        else:
+            host_params, controller_params = run.host_params, run.host_params.controller_params
 
         network_manager = NetworkManager(host_params, "cleanup", None, None)
         file_transporter = FileTransporter(network_manager)
 
         file_transporter.send_file(PROJECT_ROOT.joinpath("teardown.sh"), Path("config/teardown.sh"))
         network_manager.run_ssh(f"chmod 755 {host_params.host_base_path.joinpath('config/teardown.sh')}")
-        network_manager.run_ssh(f"bash {host_params.host_base_path.joinpath('config/teardown.sh')} {host_params.host_base_path}")
-
-        controller_params.controller_db_connection.delete_available_files()
+        cache_dir = host_params.host_base_path.joinpath("data", FileTransporter.DATASET_CACHE_DIR) \
+            if prune_dataset_cache else ""
+        network_manager.run_ssh(f"bash {host_params.host_base_path.joinpath('config/teardown.sh')} {host_params.host_base_path} {cache_dir}")
+
+        # other hosts still use their available files, thus only the ones of the run are removed. its teardown removes
+        # them as well, but it is skipped if the run stops after preprocessing
+        if not self._fanout:
+            controller_params.controller_db_connection.delete_available_files()
+        elif run is not None:
+            controller_params.controller_db_connection.delete_available_file_by_uuid(run.raster.uuid)
+            controller_params.controller_db_connection.delete_available_file_by_uuid(run.vector.uuid)
 
         # network_manager.run_ssh("""kill $(ps aux | grep "docker stats" | awk {\\'print $2\\'} )""")
         # network_manager.run_ssh("docker stop $(docker ps -q)")
@@ -1,6 +1,8 @@
 #!/bin/bash
 
 BASE_DIR=$1
+# the dataset cache of the host, only pruned if given
+CACHE_DIR=$2
 
 docker run  \
   -v $BASE_DIR/config:/config \
@@ -14,9 +16,17 @@ docker run  \
   ubuntu:latest \
   bash -c 'find /data -iname "preprocessed_*" | while read r; do rm -rv $r; done'
 
+# removes the cached dataset files that no dataset folder links to anymore. the dataset folders hardlink the cached
+# files, or symlink them if hardlinks are not supported
+if [ -n "$CACHE_DIR" ] && [ -d "$CACHE_DIR" ]; then
+  find "$(dirname "$CACHE_DIR")" -path "$CACHE_DIR" -prune -o -type l -print0 | xargs -0 -r readlink -f | sort -u > "$CACHE_DIR.links"
+  find "$CACHE_DIR" -type f -links 1 | sort | comm -23 - "$CACHE_DIR.links" | xargs -r rm -v
+  rm -f "$CACHE_DIR.links"
+fi
 
 
 kill $(ps aux | grep "docker stats" | awk {'print $2'})
+kill $(ps aux | grep "cgroup_sampler.sh" | awk {'print $2'})
 docker stop $(docker ps -q)
 docker rm $(docker ps -aq)
 docker volume rm $(docker volume ls -q)
\ No newline at end of file
@@ -0,0 +1,95 @@
+import math
+import statistics
+
+
+class AdaptiveRepetition:
+    """
+    decides how many warm starts of a benchmark run are performed. warm starts are repeated until the confidence
+    interval of the mean execution time is narrower than the target relative width, at least min_warm_starts and at
+    most max_warm_starts times
+    """
+
+    def __init__(self, min_warm_starts: int, max_warm_starts: int = 20, ci_width: float = 0.05,
+                 confidence: float = 0.95) -> None:
+        """
+        the init function
+        :param min_warm_starts: the amount of warm starts that is always performed, at least 2
+        :param max_warm_starts: the amount of warm starts after which no more are performed
+        :param ci_width: the target width of the confidence interval relative to the mean execution time
+        :param confidence: the confidence level of the interval
+        """
+        self.min_warm_starts = max(min_warm_starts, 2)
+        self.max_warm_starts = max(max_warm_starts, self.min_warm_starts)
+        self.ci_width = ci_width
+        self.confidence = confidence
+        self._execution_times: list[float] = []
+
+    @property
+    def repetitions(self) -> int:
+        return len(self._execution_times)
+
+    def add(self, execution_time: float | None):
+        """
+        adds the execution time of a warm start. warm starts without an execution time still count as performed
+        :param execution_time: the execution time in seconds
+        :return:
+        """
+        self._execution_times.append(execution_time)
+
+    @property
+    def relative_ci_width(self) -> float:
+        """
+        the width of the confidence interval of the mean execution time relative to the mean
+        :return: the relative width, infinite if it cannot be computed
+        """
+        execution_times = [t for t in self._execution_times if t is not None]
+        if len(execution_times) < 2:
+            return math.inf
+
+        mean = statistics.fmean(execution_times)
+        if mean <= 0:
+            return math.inf
+
+        half_width = self._t_quantile(len(execution_times) - 1) * statistics.stdev(execution_times) / \
+            math.sqrt(len(execution_times))
+
+        return 2 * half_width / mean
+
+    def should_continue(self) -> bool:
+        """
+        whether another warm start shall be performed
+        :return:
+        """
+        if self.repetitions < self.min_warm_starts:
+            return True
+
+        if self.repetitions >= self.max_warm_starts:
+            print(f"stopping after the maximum of {self.max_warm_starts} warm starts, "
+                  f"relative confidence interval width is {self.relative_ci_width:.4f}")
+            return False
+
+        if self.relative_ci_width <= self.ci_width:
+            print(f"stopping after {self.repetitions} warm starts, "
+                  f"relative confidence interval width is {self.relative_ci_width:.4f}")
+            return False
+
+        return True
+
+    def _t_quantile(self, degrees_of_freedom: int) -> float:
+        """
+        the two-sided quantile of the student's t distribution. exact for one and two degrees of freedom, otherwise
+        approximated from the normal quantile by a cornish-fisher expansion
+        :param degrees_of_freedom: the degrees of freedom
+        :return: the quantile
+        """
+        p = 1 - (1 - self.confidence) / 2
+        if degrees_of_freedom == 1:
+            return math.tan(math.pi * (p - 0.5))
+        if degrees_of_freedom == 2:
+            return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+
+        z = statistics.NormalDist().inv_cdf(p)
+        v = degrees_of_freedom
+        return z + (z ** 3 + z) / (4 * v) \
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * v ** 2) \
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * v ** 3)
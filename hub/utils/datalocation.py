@@ -1,3 +1,4 @@
+import json
 import uuid
 import uuid
 import zipfile
@@ -34,6 +35,7 @@ class DataLocation:
     _suffix: VectorFileType | RasterFileType
     _allowed_endings: list[str]
     _metadata: list[dict]
+    _remote_metadata: dict[tuple, list[dict]]
     _uuid: str
 
     EXTENT_CRS = pyproj.CRS.from_string("EPSG:4087")
@@ -57,6 +59,7 @@ class DataLocation:
         self._while_init = True
 
         self._host_base = host_params.host_base_path
+        self._host_params = host_params
         self._data_type = data_type
         self._benchmark_params = None
 
@@ -95,6 +98,7 @@ class DataLocation:
         self._optimization_running = False
         self._should_preprocess = True
         self._is_ingested = False
+        self._remote_metadata = {}
         self.get_metadata()
         self._uuid = str(uuid.uuid4())
 
@@ -114,6 +118,16 @@ class DataLocation:
     def end_init(self):
         self._while_init = False
 
+    def set_host(self, host_params: HostParameters):
+        """
+        binds the dataset to the host the run is performed on
+        :param host_params: the host parameters
+        :return:
+        """
+        self._host_params = host_params
+        self._host_base = host_params.host_base_path.joinpath("data")
+        self._remote_metadata = {}
+
     def use_uuid_name(self):
         self._preprocessed_dir_override = Path("preprocessed_" + str(self._uuid))
         self._name_override = self.dataset_name + "_" + str(self._uuid)
@@ -121,6 +135,7 @@ class DataLocation:
     @abstractmethod
     def adjust_target_files(self, benchmark_params: BenchmarkParameters):
         self._benchmark_params = benchmark_params
+        self._remote_metadata = {}
 
     @property
     def preprocessed(self):
@@ -328,11 +343,44 @@ class DataLocation:
         switch that returned paths shall be output from the preprocess stage
         :return:"""
         self._preprocessed = True
+        # the preprocess stage rewrote the files on the host
+        self._remote_metadata = {}
 
         if self.should_preprocess:
             extent = self.get_remote_extent(nm)
             self.register_file(db_connection, params, workload, extent, True, optimizer_run, nm)
 
+    def probe_remote_metadata(self, nm: BasicNetworkManager, command: str) -> list[dict]:
+        """
+        returns the metadata of all dataset files on the host. a single container reads the metadata of every file and
+        prints it as one json array. the files are passed via stdin, a command line naming thousands of tiles exceeds
+        the limit of the operating system. the result is kept until the next run or the preprocess stage, thus the
+        extent, crs and dimension queries of a stage share one probe
+        :param nm: the network manager of the host
+        :param command: the command that prints the metadata of the file appended to it as json
+        :return: the metadata per file
+        """
+        key = (str(nm.host_params.ssh_connection), command, tuple(self.docker_file))
+        if key not in self._remote_metadata:
+            print(f"probing remote metadata of {len(self.docker_file)} files")
+            # escaped, thus the variables are expanded by the shell of the container instead of the one of the host
+            reads = f"printf [; sep=; while read -r f; do printf %s \\$sep; sep=,; {command} \\$f < /dev/null || printf null; " \
+                    f"done; printf ]"
+            result_raw = nm.run_ssh_return_result(
+                f'docker run --rm -i -v {self._host_base}:/data {self.GDAL_DOCKER_IMAGE} sh -c "{reads}"',
+                stdin="".join(f"{f}\n" for f in self.docker_file))
+            if not result_raw.strip():
+                raise FileNotFoundError(f"Could not probe the metadata of {len(self.docker_file)} files on the host")
+            metadata = json.loads(result_raw)
+
+            failed = [str(f) for f, meta in zip(self.docker_file, metadata) if meta is None]
+            if failed:
+                raise FileNotFoundError(f"Could not read the metadata of {failed} on the host")
+
+            self._remote_metadata[key] = metadata
+
+        return self._remote_metadata[key]
+
     # def set_name(self, new_name: str = None):
     #     """
     #     set the name of the dataset
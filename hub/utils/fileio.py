@@ -105,6 +105,7 @@ class FileIO:
 
         iterations = int(experiments.get("iterations", 1))
         warm_starts = int(experiments.get("warm_starts", 0))
+        adaptive_warm_starts = experiments.get("adaptive_warm_starts", {})
         timeout = int(experiments.get("timeout", 60 * 60 * 3))
         resource_limits = experiments.get("resource_limits", {})
 
@@ -134,7 +135,8 @@ class FileIO:
                 Path(experiments_filename).parts[-1],
                 warm_starts,
                 timeout,
-                resource_limits
+                resource_limits,
+                adaptive_warm_starts
             )
 
             run.set_host(host_params)
@@ -204,23 +206,44 @@ class FileIO:
     @staticmethod
     def get_host_params(config_filename: str) -> (HostParameters, ControllerParameters):
         """
-        loads the hsot parameters from a file
+        loads the parameters of the first host from a file
         :param config_filename: the location of the host parameter file
         :return:
         """
+        hosts, controller_params = FileIO.get_all_host_params(config_filename)
+        return hosts[0], controller_params
+
+    @staticmethod
+    def get_all_host_params(config_filename: str, controller_params: ControllerParameters = None) \
+            -> (list[HostParameters], ControllerParameters):
+        """
+        loads the parameters of all hosts from a file. all hosts share the controller parameters
+        :param config_filename: the location of the host parameter file
+        :param controller_params: existing controller parameters to be used instead of reading them from the file
+        :return:
+        """
         with PROJECT_ROOT.joinpath(config_filename).open(mode="r") as c:
             try:
                 yamlfile = yaml.safe_load(c)
 
-                controller_params = ControllerParameters(yamlfile["config"]["controller"]["results_folder"],
-                                                         Path(yamlfile["config"]["controller"]["results_db"]).expanduser())
+                if controller_params is None:
+                    controller_params = ControllerParameters(yamlfile["config"]["controller"]["results_folder"],
+                                                             Path(yamlfile["config"]["controller"]["results_db"]).expanduser())
 
                 return [HostParameters(h["host"],
                                        h["ssh_config_path"],
                                        Path(h["base_path"]),
                                        controller_params,
-                                       h.get("workers", []))
-                        for h in yamlfile["config"]["hosts"]][0], controller_params  # FIXME remove [0] eventually
+                                       h.get("workers", []),
+                                       h.get("resource_sampler", "cgroup"),
+                                       int(h.get("sampling_rate", 20)),
+                                       h.get("results_format", "csv"),
+                                       int(h.get("preprocess_workers", 0)),
+                                       bool(h.get("raster_warp_vrt", False)),
+                                       bool(h.get("raster_lazy_preprocessing", False)),
+                                       bool(h.get("raster_cog", False)),
+                                       h.get("tile_pruning", "extent"))
+                        for h in yamlfile["config"]["hosts"]], controller_params
 
             except yaml.YAMLError as exc:
                 raise Exception(f"error while processing host parameters: {exc}")
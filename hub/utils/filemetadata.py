@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, TYPE_CHECKING
+
+from osgeo import gdal
+
+if TYPE_CHECKING:
+    from hub.zsresultsdb.submit_data import DuckDBConnector
+
+
+class FileMetadataReader:
+    """
+    reads the metadata of raster and vector files in-process with GDAL, several files at once. the metadata equals the
+    json output of gdalinfo and ogrinfo. if a database connection is given, the metadata is cached in the results
+    database, keyed by the path, size and modification time of a file
+    """
+    MAX_WORKERS = 16
+
+    def __init__(self, db_connection: DuckDBConnector | None = None, max_workers: int = MAX_WORKERS) -> None:
+        """
+        the init function
+        :param db_connection: the connection to the results database, metadata is not cached if None
+        :param max_workers: the maximum amount of files read at once
+        """
+        self.db_connection = db_connection
+        self.max_workers = max_workers
+
+    def read_raster(self, files: list[Path]) -> list[dict]:
+        """
+        returns the metadata of raster files as returned by gdalinfo -json
+        :param files: the files
+        :return: the metadata per file
+        """
+        return self._read(files, "raster", self.read_raster_file)
+
+    def read_vector(self, files: list[Path]) -> list[dict]:
+        """
+        returns the metadata of vector files as returned by ogrinfo -json -nomd
+        :param files: the files
+        :return: the metadata per file
+        """
+        return self._read(files, "vector", self.read_vector_file)
+
+    @staticmethod
+    def read_raster_file(file: Path) -> dict:
+        with gdal.ExceptionMgr():
+            return gdal.Info(str(file), format="json")
+
+    @staticmethod
+    def read_vector_file(file: Path) -> dict:
+        with gdal.ExceptionMgr():
+            return gdal.VectorInfo(str(file), format="json", options=["-nomd"])
+
+    def _read(self, files: list[Path], kind: str, read_file: Callable[[Path], dict]) -> list[dict]:
+        """
+        returns the metadata of files, from the cache if a file did not change since it was cached
+        :param files: the files
+        :param kind: the class of data, either raster or vector
+        :param read_file: the function that reads the metadata of a single file
+        :return: the metadata per file
+        """
+        keys = []
+        for f in files:
+            stat = Path(f).stat()
+            keys.append((str(Path(f).absolute()), stat.st_size, stat.st_mtime_ns))
+
+        cached = self.db_connection.get_file_metadata(kind, keys) if self.db_connection is not None else {}
+        missing = [(f, key) for f, key in zip(files, keys) if key[0] not in cached]
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                read = list(pool.map(read_file, [f for f, _ in missing]))
+
+            for (_, key), metadata in zip(missing, read):
+                cached[key[0]] = metadata
+
+            if self.db_connection is not None:
+                self.db_connection.put_file_metadata(kind, [(*key, metadata) for (_, key), metadata in
+                                                            zip(missing, read)])
+
+        print(f"read metadata of {len(files)} {kind} files, {len(files) - len(missing)} from cache")
+
+        return [cached[key[0]] for key in keys]
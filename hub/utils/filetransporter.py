@@ -1,19 +1,51 @@
+import glob
+import hashlib
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 
+import duckdb
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 from hub.configuration import PROJECT_ROOT
 from hub.benchmarkrun.measurementslocation import MeasurementsLocation
 from hub.evaluation.measure_time import measure_time
 from hub.utils.datalocation import DataLocation
-from hub.enums.filetype import FileType
+from hub.utils.measurementgate import MeasurementGate
 from hub.utils.network import BasicNetworkManager
+from hub.zsresultsdb.submit_data import RESULT_CSV_OPTIONS, RESULT_CSV_SOURCE
 
 
 class FileTransporter:
     """
     wrapper around scp to perform remote file movement operations
     """
-    def __init__(self, network_manager: BasicNetworkManager) -> None:
+    DATASET_CACHE_DIR = ".cache"
+    RESULT_CHUNK_SIZE = 1 << 20
+    ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+    _content_hashes: dict[tuple[str, int, int], str] = {}
+
+    def __init__(self, network_manager: BasicNetworkManager, transfer_workers: int = 4,
+                 hash_contents: bool = False) -> None:
+        """
+        the init function
+        :param network_manager: the network manager of the host
+        :param transfer_workers: the number of dataset files transferred in parallel. must not exceed the MaxSessions
+        setting of the ssh server, since all transfers share one master connection
+        :param hash_contents: whether the dataset cache is keyed by the sha256 of the file contents instead of
+        path, size and mtime
+        """
         self.network_manager = network_manager
+        self.transfer_workers = transfer_workers
+        self.hash_contents = hash_contents
         # self.system = network_manager.system_full
         self.host_base_path = self.network_manager.host_params.host_base_path
         remote = self.network_manager.ssh_connection
@@ -27,6 +59,19 @@ class FileTransporter:
         # print(self.ssh_command)
         # print(self.scp_command_send)
 
+    def _run_transfer(self, command: str):
+        """
+        runs a transfer command through the multiplexed ssh connection of the network manager
+        :param command: the rsync or scp command
+        :return: the return code
+        """
+        if self.network_manager.is_batching:
+            # the transfer may depend on queued commands, e.g., on creating the target folder
+            self.network_manager.flush_batch()
+
+        self.network_manager.multiplexer.ensure_connected()
+        return self.network_manager.run_command(command)
+
     @measure_time
     def send_file(self, local: Path, remote: Path, **kwargs):
         """
@@ -43,9 +88,23 @@ class FileTransporter:
                 .replace("from_File_plch", str(local))
                 .replace("to_File_plch", str(self.host_base_path.joinpath(remote)))
             )
-            return self.network_manager.run_command(command)
+            return self._run_transfer(command)
         raise FileNotFoundError(local)
 
+    def send_text(self, text: str, remote: Path, **kwargs):
+        """
+        writes a text into a file on the host. the text is staged in a temporary folder of its own on the controller,
+        thus runs on several hosts at once do not overwrite each other's files
+        :param text: the content of the file
+        :param remote: the path on the host
+        :param kwargs:
+        :return:
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local = Path(tmp_dir).joinpath(remote.name)
+            local.write_text(text)
+            return self.send_file(local, remote, **kwargs)
+
     @measure_time
     def send_folder(self, local: Path, remote: Path, **kwargs):
         """
@@ -62,7 +121,7 @@ class FileTransporter:
                 .replace("from_File_plch", str(local))
                 .replace("to_File_plch", str(self.host_base_path.joinpath(remote)))
             )
-            return self.network_manager.run_command(command)
+            return self._run_transfer(command)
         raise FileNotFoundError(local)
 
     @measure_time
@@ -79,7 +138,7 @@ class FileTransporter:
             .replace("from_File_plch", str(self.host_base_path.joinpath(remote)))
             .replace("to_File_plch", str(local))
         )
-        return self.network_manager.run_command(command)
+        return self._run_transfer(command)
 
     @measure_time
     def get_folder(self, remote: Path, local: Path, **kwargs):
@@ -96,43 +155,238 @@ class FileTransporter:
             .replace("from_File_plch", str(self.host_base_path.joinpath(remote)) + "/.")  # FIXME scp adaptation
             .replace("to_File_plch", str(local))
         )
-        return self.network_manager.run_command(command)
+        return self._run_transfer(command)
+
+    @measure_time
+    def get_result_file(self, remote: Path, local: Path, csv_options: dict = RESULT_CSV_OPTIONS, **kwargs) -> Path:
+        """
+        retrieves a result file from the host. the file is compressed with zstd on the host, if available there and on
+        the controller, and streamed back in chunks through the ssh connection, without an intermediate file on either
+        side. if the host is configured to store results as parquet, the result is converted after the transfer
+        :param remote: the path on the host
+        :param local: the path on the controller
+        :param csv_options: the layout of the result file, see RESULT_CSV_OPTIONS
+        :param kwargs:
+        :return: the path to the result on the controller, with the suffix of the results format
+        """
+        remote_path = self.host_base_path.joinpath(remote)
+        if zstandard is not None:
+            remote_command = f"if command -v zstd > /dev/null; then zstd -q -c -T0 {remote_path}; else cat {remote_path}; fi"
+        else:
+            remote_command = f"cat {remote_path}"
+
+        if self.network_manager.is_batching:
+            self.network_manager.flush_batch()
+        self.network_manager.multiplexer.ensure_connected()
+
+        process = subprocess.Popen(f"{self.network_manager.ssh_command} '{remote_command}'",
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+
+        received = 0
+        with local.open("wb") as f:
+            chunk = process.stdout.read(self.RESULT_CHUNK_SIZE)
+            decompressor = zstandard.ZstdDecompressor().decompressobj() \
+                if zstandard is not None and chunk.startswith(self.ZSTD_MAGIC) else None
+
+            while chunk:
+                received += len(chunk)
+                f.write(decompressor.decompress(chunk) if decompressor is not None else chunk)
+                chunk = process.stdout.read(self.RESULT_CHUNK_SIZE)
+
+        return_code = process.wait()
+        print(f"received {received} bytes{' (zstd)' if decompressor is not None else ''} for {local.name}, "
+              f"{local.stat().st_size} bytes uncompressed")
+        if return_code != 0:
+            print(f"could not retrieve {remote_path}: {process.stderr.read().decode('utf-8').strip()}")
+            return local
+
+        if self.network_manager.host_params.results_format == "parquet":
+            return self._convert_to_parquet(local, csv_options)
+
+        return local
+
+    @staticmethod
+    def _convert_to_parquet(local: Path, csv_options: dict) -> Path:
+        """
+        converts a csv result file to parquet, such that it does not need to be parsed again later on
+        :param local: the csv file
+        :param csv_options: the layout of the csv file, see RESULT_CSV_OPTIONS
+        :return: the parquet file
+        """
+        parquet_file = local.with_suffix(".parquet")
+        if local.stat().st_size == 0:
+            print(f"{local.name} is empty, keeping it as is")
+            return local
+
+        with duckdb.connect() as conn:
+            conn.execute(f"copy (select * from {RESULT_CSV_SOURCE}) to '{parquet_file}' "
+                         f"(format parquet, compression zstd)", {"file": str(local)} | csv_options)
+        local.unlink()
+
+        return parquet_file
+
+    def create_config_dir(self):
+        """
+        creates the config folder on the host
+        :return:
+        """
+        self.network_manager.run_remote_mkdir(self.host_base_path.joinpath("config"))
+
+    def create_data_dirs(self, file: DataLocation):
+        """
+        creates the folders of a dataset on the host
+        :param file: the dataset
+        :return:
+        """
+        self.network_manager.run_remote_mkdir(file.host_dir)
+        self.network_manager.run_remote_mkdir(file.host_dir_preprocessed)
 
     @measure_time
-    def send_configs(self, **kwargs):
+    def send_configs(self, create_dirs=True, **kwargs):
         """
         sends all config files from the controller to the host
+        :param create_dirs: whether to create the config folder on the host first
         :param kwargs:
         :return:
         """
         host_config_path = self.host_base_path.joinpath("config")
         # print(host_config_path)
-        self.network_manager.run_remote_mkdir(host_config_path)
+        if create_dirs:
+            self.create_config_dir()
         self.send_folder(
             Path(f"{PROJECT_ROOT}/deployment/files/{self.network_manager.system_name}"),
             host_config_path
         )
 
     @measure_time
-    def send_data(self, file: DataLocation, **kwargs):
+    def send_data(self, file: DataLocation, create_dirs=True, **kwargs):
         """
-        sends a dataset from the controller to the host
+        stages a dataset on the host. the files are kept in a content-addressed cache on the host, such that files
+        that are already there from an earlier run are not transferred again. the dataset folder of the run is a view
+        of hardlinks into the cache. only the files of the dataset are staged, i.e., the relevant tiles of a raster,
+        together with their sidecar files. missing files are transferred in parallel. cached files that no dataset
+        folder links to anymore are removed by the teardown script of the cleanup
         :param file: the dataset
+        :param create_dirs: whether to create the folders of the dataset on the host first
         :param kwargs:
         :return:
         """
         # print(file)
-        host_dir_up = file.host_data_base
-        self.network_manager.run_remote_mkdir(file.host_dir)
-        self.network_manager.run_remote_mkdir(file.host_dir_preprocessed)
-        if file.type == FileType.FILE:
-            # raise NotImplementedError("Single Files are currently not supported")
-            self.send_folder(file.controller_location, host_dir_up)
-        elif file.type == FileType.FOLDER:
-            self.send_folder(file.controller_location, host_dir_up)
-        # elif file.type == FileType.ZIP_ARCHIVE:
-        #     self.send_file(file.controller_location, host_dir_up)
-        #     self.network_manager.run_command(f"{self.network_manager.ssh_command} unzip")
+        if create_dirs:
+            self.create_data_dirs(file)
+
+        cache_dir = file.host_data_base.joinpath(self.DATASET_CACHE_DIR)
+        host_dir = file.host_data_base.joinpath(file.dataset_name)
+
+        files, keys = self.stage_to_cache(file)
+
+        with self.network_manager.batched():
+            self.network_manager.run_ssh(f"mkdir -p {host_dir}")
+            for local, key in zip(files, keys):
+                # symlinks are relative, thus they also resolve within containers that mount the data folder
+                self.network_manager.run_ssh(f"ln -f {cache_dir.joinpath(key)} {host_dir.joinpath(local.name)} "
+                                             f"|| ln -sfr {cache_dir.joinpath(key)} {host_dir.joinpath(local.name)}")
+            self.network_manager.flush_batch(raise_on_failure=True)
+
+    def stage_to_cache(self, file: DataLocation, gate: MeasurementGate | None = None,
+                       cancelled: threading.Event | None = None) -> tuple[list[Path], list[str]]:
+        """
+        transfers all files of a dataset that are missing in the dataset cache on the host, without touching the
+        dataset folder of the run
+        :param file: the dataset
+        :param gate: if given, every remote operation is run as background unit of the gate
+        :param cancelled: if set, the remaining remote operations are not started
+        :return: the files of the dataset on the controller and their keys within the cache
+        """
+        cache_dir = file.host_data_base.joinpath(self.DATASET_CACHE_DIR)
+
+        def remote_unit():
+            return gate.background(cancelled) if gate is not None else nullcontext()
+
+        def send(item: tuple[str, Path]) -> int:
+            with remote_unit():
+                return self._send_to_cache(item[1], cache_dir.joinpath(item[0]))
+
+        files = self._dataset_files(file)
+        with ThreadPoolExecutor(max_workers=self.transfer_workers) as pool:
+            keys = list(pool.map(self._content_key, files))
+
+        with remote_unit():
+            cached = set(self.network_manager.run_ssh_return_result(f"mkdir -p {cache_dir} && ls -1 {cache_dir}")
+                         .split())
+        missing = {key: local for local, key in zip(files, keys) if key not in cached}
+        print(f"staging {len(files)} files of {file.dataset_name}, {len(missing)} of them are not cached on the host")
+
+        if missing:
+            self.network_manager.multiplexer.ensure_connected()
+            with ThreadPoolExecutor(max_workers=self.transfer_workers) as pool:
+                return_codes = list(pool.map(send, missing.items()))
+            if any(return_code != 0 for return_code in return_codes):
+                raise Exception(f"could not transfer {sum(rc != 0 for rc in return_codes)} files of "
+                                f"{file.dataset_name} to the host")
+
+        return files, keys
+
+    @staticmethod
+    def _dataset_files(file: DataLocation) -> list[Path]:
+        """
+        the files of a dataset on the controller, including sidecar files like .dbf, .prj or .aux.xml
+        :param file: the dataset
+        :return: the paths to all files that need to be staged
+        """
+        dataset_files = []
+        for local in file.controller_file:
+            # e.g., a merged file that only exists on the host
+            if not local.exists():
+                continue
+
+            dataset_files.extend(sorted(
+                sidecar for sidecar in local.parent.glob(f"{glob.escape(local.stem)}.*")
+                if sidecar.is_file() and (sidecar.stem == local.stem or sidecar.name.startswith(local.name))))
+
+        return list(dict.fromkeys(dataset_files))
+
+    def _content_key(self, local: Path) -> str:
+        """
+        the key of a file within the dataset cache on the host. content hashes are only computed once per file
+        version and controller process
+        :param local: the path on the controller
+        :return: the key
+        """
+        stat = local.stat()
+        version = (str(local.resolve()), stat.st_size, stat.st_mtime_ns)
+
+        if not self.hash_contents:
+            return hashlib.sha256(":".join(str(v) for v in version).encode("utf-8")).hexdigest()
+
+        if version not in FileTransporter._content_hashes:
+            digest = hashlib.sha256()
+            with local.open("rb") as f:
+                while chunk := f.read(1 << 20):
+                    digest.update(chunk)
+            FileTransporter._content_hashes[version] = digest.hexdigest()
+
+        return FileTransporter._content_hashes[version]
+
+    def _send_to_cache(self, local: Path, remote: Path) -> int:
+        """
+        transfers a single file into the dataset cache on the host. rsync only renames the file to its final name
+        once it is complete, thus interrupted transfers never appear as cached. thread-safe, unlike run_command
+        :param local: the path on the controller
+        :param remote: the path within the cache on the host
+        :return: the return code
+        """
+        command = (
+            self.rsync_command_send.replace("options_plch", "")
+            .replace("from_File_plch", str(local))
+            .replace("to_File_plch", str(remote))
+        )
+        result = subprocess.run(command, shell=True, capture_output=True, universal_newlines=True)
+        print(f"[{result.returncode}] {local} -> {remote.name}")
+        if result.returncode != 0:
+            print(result.stderr.strip())
+
+        return result.returncode
 
     def get_measurements(self, measurements_loc: MeasurementsLocation):
         """
@@ -0,0 +1,77 @@
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+
+class MeasurementGate:
+    """
+    keeps background work on a host, e.g., staging the next benchmark run, out of the measured windows. a measurement
+    is exclusive: it waits for running background units to complete, and no background unit starts while a
+    measurement is pending or running. gates are shared between all network managers of the same remote
+    """
+    _gates: dict[str, "MeasurementGate"] = {}
+    _gates_lock = threading.Lock()
+    # how often a waiting background unit checks whether it was cancelled, in seconds
+    CANCEL_POLL_INTERVAL = 1.0
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._measurements = 0
+        self._active_background = 0
+
+    @classmethod
+    def for_host(cls, ssh_connection: str) -> "MeasurementGate":
+        """
+        returns the gate of a remote, creates it if necessary
+        :param ssh_connection: the ssh connection base string
+        :return: the gate
+        """
+        with cls._gates_lock:
+            if ssh_connection not in cls._gates:
+                cls._gates[ssh_connection] = MeasurementGate()
+
+            return cls._gates[ssh_connection]
+
+    @property
+    def is_measuring(self) -> bool:
+        return self._measurements > 0
+
+    def begin_measurement(self):
+        """
+        marks the start of a measured window. blocks until all running background units are completed
+        :return:
+        """
+        with self._condition:
+            self._measurements += 1
+            if self._active_background > 0:
+                print(f"waiting for {self._active_background} background tasks before starting measurements")
+            self._condition.wait_for(lambda: self._active_background == 0)
+
+    def end_measurement(self):
+        """
+        marks the end of a measured window
+        :return:
+        """
+        with self._condition:
+            self._measurements = max(self._measurements - 1, 0)
+            self._condition.notify_all()
+
+    @contextmanager
+    def background(self, cancelled: Optional[threading.Event] = None):
+        """
+        context for a unit of background work on the host. waits until no measurement is pending or running
+        :param cancelled: if given and set, the unit is not started, even while waiting for a measurement
+        :return:
+        """
+        with self._condition:
+            while self._measurements > 0 and not (cancelled is not None and cancelled.is_set()):
+                self._condition.wait(timeout=self.CANCEL_POLL_INTERVAL)
+            if cancelled is not None and cancelled.is_set():
+                raise Exception("background work on the host was cancelled")
+            self._active_background += 1
+        try:
+            yield self
+        finally:
+            with self._condition:
+                self._active_background -= 1
+                self._condition.notify_all()
@@ -1,14 +1,35 @@
 import math
+import os
+import queue
+import selectors
 import subprocess
+import threading
 import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
 from subprocess import Popen
 from typing import Any
 
 from hub.benchmarkrun.host_params import HostParameters
+from hub.configuration import PROJECT_ROOT
 from hub.benchmarkrun.measurementslocation import MeasurementsLocation
 from hub.zsresultsdb.submit_data import DuckDBRunCursor
 from hub.evaluation.measure_time import measure_time
+from hub.utils.measurementgate import MeasurementGate
+from hub.utils.sshmultiplexer import SSHMultiplexer
+
+
+CGROUP_SAMPLER_SCRIPT = PROJECT_ROOT.joinpath("deployment", "sampler", "cgroup_sampler.sh")
+
+
+@dataclass
+class BatchResult:
+    command: str
+    return_code: int
+    output: str
 
 
 class BasicNetworkManager:
@@ -31,24 +52,48 @@ class BasicNetworkManager:
                  host_params: HostParameters,
                  system_name: str,
                  ssh_connection: str = "",
-                 query_timeout: int = 0
+                 query_timeout: int = 0,
+                 output_log_limit: int = 10_000
                  ) -> None:
         """
         the init function
+        :param output_log_limit: the maximum number of output lines of remote commands kept in output_log. 0 to keep none
         """
         self.ssh_connection = ssh_connection if ssh_connection != "" else host_params.ssh_connection
         self._host_params = host_params
         self.system_name = system_name
         self.query_timeout = query_timeout
 
-        self.ssh_options = f"" \
+        base_ssh_options = f"" \
                            f"-F {self._host_params.ssh_config_path.expanduser()} " \
                            f"-o 'StrictHostKeyChecking=no' " \
                            f"-o 'IdentitiesOnly=yes' "
+        self.multiplexer = SSHMultiplexer.get(self.ssh_connection, base_ssh_options)
+        self.ssh_options = self.multiplexer.ssh_options
+        self.gate = MeasurementGate.for_host(self.ssh_connection)
         self.ssh_command = (
             f"ssh {self.ssh_connection} {self.ssh_options}"
         )
 
+        self.output_log_limit = output_log_limit
+        self.output_log: deque[str] = deque(maxlen=output_log_limit if output_log_limit > 0 else None)
+        self._marker_queue: queue.Queue[tuple[str, float]] = queue.Queue()
+        self._marker_writer: threading.Thread | None = None
+        self._last_line = ""
+        self._last_line_cntr = 1
+
+        self._batch_queue: list[str] = []
+        self._batch_depth = 0
+        self.last_batch_results: list[BatchResult] = []
+
+    @property
+    def connection_setup_time(self) -> float:
+        """
+        the total time in seconds spent on establishing ssh connections to the remote
+        :return: the time in seconds
+        """
+        return self.multiplexer.setup_time_total
+
     @measure_time
     def run_command(self, command, **kwargs) -> int:
         """
@@ -65,48 +110,107 @@ class BasicNetworkManager:
         try:
             print(f"Running {command}")
             process = subprocess.Popen(
-                command, stdout=subprocess.PIPE, universal_newlines=True, shell=True
+                command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True
             )
-            last_line = ""
-            last_line_cntr = 1
-            while True:
-                output = str(process.stdout.readline())
-                if "benchi_marker" in output or "benchi_meta" in output:
-                    self.write_timings_marker(output)
-
-                if not output == "":
-                    if output == last_line:
-                        if last_line_cntr % (10 ** (math.floor(math.log10(last_line_cntr)))) == 0:
-                            print(f"{last_line_cntr} ", end="")
-
-                        last_line_cntr += 1
-                    else:
-                        if last_line_cntr > 1:
-                            print(last_line_cntr)
-                            last_line_cntr = 1
-
-                        print(output.strip())
-
-                return_code = process.poll()
-                if return_code is not None:
-                    print("RETURN CODE", return_code)
-                    print("\n\n")
-                    # Process has finished, read rest of the output
-                    if "ssh" in command and return_code == 255:
-                        raise Exception("Unable to establish SSH connection")
-
-                    for output in process.stdout.readlines():
-                        print(output.strip())
-                    return return_code
-
-                last_line = output
+
+            self._last_line = ""
+            self._last_line_cntr = 1
+            buffers = {process.stdout.fileno(): b"", process.stderr.fileno(): b""}
+
+            with selectors.DefaultSelector() as selector:
+                selector.register(process.stdout, selectors.EVENT_READ, "stdout")
+                selector.register(process.stderr, selectors.EVENT_READ, "stderr")
+
+                while selector.get_map():
+                    for key, _ in selector.select():
+                        chunk = os.read(key.fd, 65536)
+
+                        if not chunk:
+                            selector.unregister(key.fileobj)
+                            lines = [buffers[key.fd]] if buffers[key.fd] else []
+                        else:
+                            *lines, buffers[key.fd] = (buffers[key.fd] + chunk).split(b"\n")
+
+                        for line in lines:
+                            self._handle_output_line(line.decode("utf-8", errors="replace"), key.data, time.time())
+
+            return_code = process.wait()
+            if self._last_line_cntr > 1:
+                print(self._last_line_cntr)
+
+            # markers have to be written before returning, since they depend on the state of the manager
+            self._marker_queue.join()
+
+            print("RETURN CODE", return_code)
+            print("\n\n")
+            if "ssh" in command and return_code == 255:
+                raise Exception("Unable to establish SSH connection")
+
+            return return_code
         except Exception as e:
             print(e)
 
-    def write_timings_marker(self, marker: str):
+    def _handle_output_line(self, line: str, stream: str, received: float):
+        """
+        handles a single line of output of a running command. timings markers on stdout are handed to the background
+        writer together with the time the line was received by the controller
+        :param line: the line without the trailing newline
+        :param stream: either stdout or stderr
+        :param received: the unix timestamp the line was received by the controller
+        :return:
+        """
+        if stream == "stdout" and ("benchi_marker" in line or "benchi_meta" in line):
+            self._enqueue_timings_marker(line, received)
+
+        if self.output_log_limit != 0:
+            self.output_log.append(line)
+
+        if line == self._last_line:
+            if self._last_line_cntr % (10 ** (math.floor(math.log10(self._last_line_cntr)))) == 0:
+                print(f"{self._last_line_cntr} ", end="")
+
+            self._last_line_cntr += 1
+        else:
+            if self._last_line_cntr > 1:
+                print(self._last_line_cntr)
+                self._last_line_cntr = 1
+
+            print(line.strip())
+
+        self._last_line = line
+
+    def _enqueue_timings_marker(self, marker: str, received: float):
+        """
+        hands a timings marker to the background writer, starts the writer if necessary
+        :param marker: the timings string
+        :param received: the unix timestamp the marker was received by the controller
+        :return:
+        """
+        if self._marker_writer is None or not self._marker_writer.is_alive():
+            self._marker_writer = threading.Thread(target=self._write_queued_markers, daemon=True)
+            self._marker_writer.start()
+
+        self._marker_queue.put((marker, received))
+
+    def _write_queued_markers(self):
+        """
+        background loop that writes queued timings markers into the database
+        :return:
+        """
+        while True:
+            marker, received = self._marker_queue.get()
+            try:
+                self.write_timings_marker(marker, received)
+            except Exception as e:
+                print(f"could not write timings marker {marker.strip()}: {e}")
+            finally:
+                self._marker_queue.task_done()
+
+    def write_timings_marker(self, marker: str, received: float | None = None):
         """
         write a timings marker into the database
         :param marker: the timings string
+        :param received: the unix timestamp the marker was received by the controller, now if not given
         :return:
         """
         # This method should be implemented in subclasses
@@ -118,17 +222,128 @@ class BasicNetworkManager:
         prefixes a command with the ssh command to run it remotely on the host
         :param command: the command
         :param kwargs:
-        :return: the return code
+        :return: the return code. None if the command is queued in a batch, its result is returned by flush_batch
         """
+        if self._batch_depth > 0:
+            self.queue_ssh(command)
+            return None
+
+        self.multiplexer.ensure_connected()
         return self.run_command(
             f"{self.ssh_command} '{command}'"
         )
 
-    def run_ssh_return_result(self, command, **kwargs) -> str:
+    @property
+    def is_batching(self) -> bool:
+        """
+        whether remote commands are currently collected into a batch instead of being run
+        :return:
+        """
+        return self._batch_depth > 0
+
+    def queue_ssh(self, command: str):
+        """
+        queues a command to be run on the host with the next flush of the batch
+        :param command: the command
+        :return:
+        """
+        self._batch_queue.append(command)
+
+    @contextmanager
+    def batched(self, raise_on_failure: bool = False):
+        """
+        context in which all calls to run_ssh are queued instead of run. the queue is flushed as a single remote
+        script when the outermost context is left. commands are still run in the order they were queued, but each
+        command runs regardless of the exit status of the previous ones
+        :param raise_on_failure: whether to raise an exception if a command of the batch failed. only considered for
+        the outermost context, since only it flushes the queue
+        :return:
+        """
+        self._batch_depth += 1
+        completed = False
+        try:
+            yield self
+            completed = True
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                # an exception raised within the context is not hidden by the failures of the batch
+                self.flush_batch(raise_on_failure=raise_on_failure and completed)
+
+    def flush_batch(self, raise_on_failure: bool = False) -> list[BatchResult]:
+        """
+        runs all queued commands as one script on the host. the output and exit status of each command are kept
+        separate. timings markers in the output are recorded the same way as in run_command. failed commands are
+        reported
+        :param raise_on_failure: whether to raise an exception if a command failed
+        :return: the result per command, in the order of the queue
+        """
+        commands = self._batch_queue
+        self._batch_queue = []
+        if not commands:
+            return []
+
+        delimiter = f"benchi_batch_{uuid.uuid4().hex}"
+        script = "\n".join(
+            f"echo \"{delimiter},begin,{idx}\"\n"
+            f"( {command}\n) < /dev/null 2>&1\n"
+            f"echo \"{delimiter},end,{idx},$?\""
+            for idx, command in enumerate(commands))
+
+        print(f"Running batch of {len(commands)} commands: {commands}")
+        self.multiplexer.ensure_connected()
+        process = subprocess.run(f"{self.ssh_command} 'bash -s'",
+                                 input=script, shell=True, universal_newlines=True, capture_output=True)
+
+        outputs = {idx: [] for idx in range(len(commands))}
+        return_codes = {}
+        current_idx = None
+        for line in process.stdout.splitlines():
+            if line.startswith(f"{delimiter},begin,"):
+                current_idx = int(line.split(",")[2])
+            elif line.startswith(f"{delimiter},end,"):
+                _, _, idx, return_code = line.split(",")
+                return_codes[int(idx)] = int(return_code)
+                current_idx = None
+            elif current_idx is not None:
+                if "benchi_marker" in line or "benchi_meta" in line:
+                    self.write_timings_marker(line)
+                outputs[current_idx].append(line)
+
+        if process.returncode == 255:
+            print(f"batch terminated with ssh error: {process.stderr.strip()}")
+
+        # commands without an end delimiter did not complete, e.g., because the connection dropped
+        self.last_batch_results = [BatchResult(command, return_codes.get(idx, 255), "\n".join(outputs[idx]))
+                                   for idx, command in enumerate(commands)]
+
+        for result in self.last_batch_results:
+            print(f"[{result.return_code}] {result.command}")
+            if result.output:
+                print(result.output)
+
+        failed = [r for r in self.last_batch_results if r.return_code != 0]
+        if failed:
+            print(f"{len(failed)} of {len(commands)} batched commands failed: {[r.command for r in failed]}")
+            if raise_on_failure:
+                raise Exception(f"batched commands failed on the host: "
+                                f"{[(r.command, r.return_code) for r in failed]}")
+
+        return self.last_batch_results
+
+    def run_ssh_return_result(self, command, stdin: str | None = None, **kwargs) -> str:
+        """
+        runs a command on the host and returns its output
+        :param command: the command
+        :param stdin: the input of the command, e.g., a list of files that is too long for the command line
+        :param kwargs:
+        :return: the output, empty if the command could not be run
+        """
+        self.multiplexer.ensure_connected()
         try:
             result = subprocess.run(
                 f"{self.ssh_command} '{command}'",
-                shell=True, universal_newlines=True,
+                input=stdin, shell=True, universal_newlines=True,
                 capture_output=True)
             output_lines = result.stdout
             return output_lines
@@ -198,8 +413,14 @@ class NetworkManager(BasicNetworkManager):
         self._measurements_loc = measurements_loc
         self.socks_proxy = None
         self.measure_docker = None
+        self._resource_sampler = None
+        self._measuring = False
+        self._sampler_uploaded = False
         self.run_cursor = run_cursor
         self.warm_start_no = 0
+        self._execution_markers: list[tuple[str, str, float]] = []
+        self._timings_file = None
+        self._timings_lock = threading.Lock()
 
         super().__init__(
                          host_params,
@@ -246,6 +467,7 @@ class NetworkManager(BasicNetworkManager):
         :return: the socks proxy URL
         """
         print(f"starting new SOCKS5 proxy at port {port}")
+        self.multiplexer.ensure_connected(force_check=True)
         self.socks_proxy = subprocess.Popen(f"{self.ssh_command} -D {port} -N -v",
                                             stdout=subprocess.PIPE,
                                             stderr=subprocess.PIPE,
@@ -275,6 +497,134 @@ class NetworkManager(BasicNetworkManager):
         self.socks_proxy.terminate()
 
     def start_measure_docker(self, stage: str, prerecord=True):
+        """
+        starts recording the resource utilization of all containers on the host. uses the cgroup sampler unless the
+        host is configured to use docker stats. falls back to docker stats if the cgroup sampler cannot be started,
+        e.g., because the host does not use cgroup v2
+        :param stage: the stage for which the resource util shall be recorded
+        :param prerecord: whether to wait for the first samples prior to continuing
+        :return:
+        """
+        # background work on the host, e.g., staging the next run, must not interfere with the measurements
+        self.gate.begin_measurement()
+        self._measuring = True
+
+        try:
+            if self.host_params.resource_sampler == "cgroup" and self._start_cgroup_sampler(stage, prerecord):
+                self._resource_sampler = "cgroup"
+            else:
+                self._start_docker_stats(stage, prerecord)
+                self._resource_sampler = "docker"
+        except BaseException:
+            self._measuring = False
+            self.gate.end_measurement()
+            raise
+
+    def stop_measure_docker(self):
+        """
+        stops recording the resource utilization on the host
+        :return:
+        """
+        try:
+            if self._resource_sampler == "cgroup":
+                self._stop_cgroup_sampler()
+            else:
+                self._stop_docker_stats()
+        finally:
+            self._measuring = False
+            self.gate.end_measurement()
+
+        # stage boundary, the markers of the stage are written outside the measured window
+        self.flush_timings()
+
+    def abort_measure_docker(self):
+        """
+        stops the measurement a failed stage left running, thus background work on the host is not blocked anymore.
+        errors while stopping are only reported, in order not to hide the failure of the stage
+        :return:
+        """
+        if not self._measuring:
+            return
+
+        print("stopping the measurement of the failed stage")
+        try:
+            self.stop_measure_docker()
+        except Exception as e:
+            print(f"could not stop the measurement: {e}")
+
+    def _start_cgroup_sampler(self, stage: str, prerecord=True) -> bool:
+        """
+        starts the cgroup sampler on the host. the sampler is uploaded with the first call, it writes the samples of
+        the stage to the measurements folder and keeps running until it is told to stop via stdin
+        :param stage: the stage for which the resource util shall be recorded
+        :param prerecord: whether to wait for the first two samples prior to continuing
+        :return: whether the sampler is running
+        """
+        print(f"starting cgroup sampler at {self.host_params.sampling_rate} Hz for stage {stage}")
+        measurement_file = self.measurements_loc.host_measurements_folder.joinpath(f"{stage}.csv")
+        overhead_file = self.measurements_loc.host_measurements_folder.joinpath(f"{stage}.sampler.csv")
+        sampler_path = self.host_params.host_base_path.joinpath("sampler", CGROUP_SAMPLER_SCRIPT.name)
+
+        with self.batched():
+            self.run_ssh(f"mkdir -p {self.measurements_loc.host_measurements_folder} {sampler_path.parent}")
+            if not self._sampler_uploaded:
+                # the script is passed as heredoc within the batch script, thus it must not be wrapped in quotes
+                delimiter = f"benchi_sampler_{uuid.uuid4().hex}"
+                self.queue_ssh(f"cat > {sampler_path} <<'{delimiter}'\n{CGROUP_SAMPLER_SCRIPT.read_text()}\n{delimiter}")
+            # the sampler must be in place before it is started, even if called within an enclosing batch
+            self.flush_batch()
+
+        if not all(r.return_code == 0 for r in self.last_batch_results if str(sampler_path.parent) in r.command):
+            print("could not upload the cgroup sampler")
+            return False
+        self._sampler_uploaded = True
+
+        command = f"{self.ssh_command} 'bash {sampler_path} {measurement_file} {overhead_file} " \
+                  f"{self.host_params.sampling_rate}'"
+        print(command)
+        self.measure_docker = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            shell=True)
+
+        expected = "sampler ready" if prerecord else "sampler started"
+        for output in self.measure_docker.stdout:
+            print(output.strip())
+            if expected in output:
+                print(f"initialized cgroup sampler for stage {stage}")
+                return True
+
+        print(f"cgroup sampler exited with return code {self.measure_docker.wait()}")
+        return False
+
+    def _stop_cgroup_sampler(self):
+        """
+        tells the cgroup sampler to stop and waits for it to write its overhead
+        :return:
+        """
+        print("stopping cgroup sampler")
+        try:
+            self.measure_docker.stdin.write("stop\n")
+            self.measure_docker.stdin.close()
+        except BrokenPipeError:
+            print("cgroup sampler is not running anymore")
+
+        for output in self.measure_docker.stdout:
+            print(output.strip())
+            if "sampler stopped" in output:
+                break
+
+        try:
+            self.measure_docker.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.measure_docker.terminate()
+
+        print("completed cgroup sampling")
+
+    def _start_docker_stats(self, stage: str, prerecord=True):
         """
         starts a process that measures resource utilization on the host using docker stats. for this purpose, first the
         remote folder is created. then, the command is executed in a loop within the shell. Optionally waits for
@@ -284,12 +634,15 @@ class NetworkManager(BasicNetworkManager):
         :return:
         """
         print(f"starting measuring docker for stage {stage}")
-        self.run_ssh(f"mkdir -p {self.measurements_loc.host_measurements_folder}")
-
         measurement_file = self.measurements_loc.host_measurements_folder.joinpath(f"{stage}.csv")
         init_measurement_flag = "initialized measuring docker"
-        self.run_ssh(
-            f"echo \"timestamp\tID\tName\tCPUPerc\tMemUsage\tMemPerc\tNetIO\tBlockIO\tPIDs\" | tee {measurement_file}")
+        with self.batched():
+            self.run_ssh(f"mkdir -p {self.measurements_loc.host_measurements_folder}")
+            self.run_ssh(
+                f"echo \"timestamp\tID\tName\tCPUPerc\tMemUsage\tMemPerc\tNetIO\tBlockIO\tPIDs\" | tee {measurement_file}")
+            # the measurement loop appends to the file, thus it must exist before starting
+            self.flush_batch()
+
         command_docker = """docker stats --no-stream --format "{{.ID}}\\t{{.Name}}\\t{{.CPUPerc}}\\t{{.MemUsage}}\\t{{.MemPerc}}\\t{{.NetIO}}\\t{{.BlockIO}}\\t{{.PIDs}}" | while read -r line; do printf "%s\\t%s\\n" "$(date +%s.%06N)" "$line"; done"""
         command = f"{self.ssh_command} 'echo \"{init_measurement_flag}\"; while true; do {command_docker} | tee --append {measurement_file}; sleep 0; done'"
 
@@ -317,7 +670,7 @@ class NetworkManager(BasicNetworkManager):
                 print(f"initialized and pre-loaded docker measurements for stage {stage}")
                 break
 
-    def stop_measure_docker(self):
+    def _stop_docker_stats(self):
         """
         stops docker stats collection on the host. Waits for 20 measurements before killing the process
         :return:
@@ -342,33 +695,129 @@ class NetworkManager(BasicNetworkManager):
                 self.measure_docker.terminate()
                 break
 
-    def write_timings_marker(self, marker: str):
+    def write_timings_marker(self, marker: str, received: float | None = None):
         """
         write a timings marker into the database
         :param marker: the timings string
+        :param received: the unix timestamp the marker was received by the controller, now if not given
         :return:
         """
+        time_now = received if received is not None else time.time()
+
         if ",execution," in marker:
+            self._record_execution_marker(marker, time_now)
             marker = marker.replace(",execution,", f",execution-{self.warm_start_no},")
         # print(marker)
-        self.run_cursor.write_timings_marker(marker)
+        self.run_cursor.write_timings_marker(marker, time_now)
         # print("wrote timing to db")
 
-        time_now = time.time()
         timings_line = f"{marker.strip()},{time_now}"
 
-        with self.measurements_loc.timings_file.open("a") as f:
-            f.write(timings_line)
-            f.write("\n")
+        with self._timings_lock:
+            if self._timings_file is None:
+                self._timings_file = self.measurements_loc.timings_file.open("a")
+            self._timings_file.write(timings_line)
+            self._timings_file.write("\n")
+
+    def flush_timings(self):
+        """
+        writes all buffered timings markers to the database and the timings file
+        :return:
+        """
+        if self.run_cursor is not None:
+            self.run_cursor.flush_timings()
+
+        with self._timings_lock:
+            if self._timings_file is not None:
+                self._timings_file.flush()
+
+    def close_timings(self):
+        """
+        writes all buffered timings markers and closes the timings file. called once the run is completed
+        :return:
+        """
+        if self.run_cursor is not None:
+            self.run_cursor.close()
+
+        with self._timings_lock:
+            if self._timings_file is not None:
+                self._timings_file.close()
+                self._timings_file = None
+
+    def _record_execution_marker(self, marker: str, received: float):
+        """
+        keeps the execution markers of the current execution run in order to derive its execution time. markers
+        without a host timestamp use the time they were received by the controller
+        :param marker: the timings string
+        :param received: the unix timestamp the marker was received by the controller
+        :return:
+        """
+        name, timestamp, event = marker.strip().split(",")[:3]
+        self._execution_markers.append((name, event, float(timestamp) if timestamp else received))
+
+    @property
+    def last_execution_time(self) -> float | None:
+        """
+        the execution time of the last execution run in seconds. sums up the intervals between the start and end
+        markers of the system-under-test, uses the meta markers of the execution run if there are none
+        :return: the execution time, None if the markers are missing
+        """
+        for name in ("benchi_marker", "benchi_meta"):
+            execution_time = 0.0
+            start = None
+            for marker_name, event, timestamp in self._execution_markers:
+                if marker_name != name:
+                    continue
+                if event == "start":
+                    start = timestamp
+                elif event in ("end", "terminated") and start is not None:
+                    execution_time += timestamp - start
+                    start = None
+
+            if execution_time > 0:
+                return execution_time
+
+        return None
+
+    def wait_until_idle(self, max_wait: int = 30, cpu_millicores: int = 50) -> bool:
+        """
+        waits until the containers on the host went idle, i.e., together use less than the given cpu for a second.
+        relies on the cgroup sampler of the running measurement
+        :param max_wait: the maximum time to wait in seconds
+        :param cpu_millicores: the cpu usage below which the containers count as idle
+        :return: whether the containers went idle. False if they did not within the max wait, or if docker stats are
+        used instead
+        """
+        if self._resource_sampler != "cgroup" or self.measure_docker.poll() is not None:
+            return False
+
+        start = time.time()
+        try:
+            self.measure_docker.stdin.write(f"idle {cpu_millicores} {self.host_params.sampling_rate} {max_wait}\n")
+            self.measure_docker.stdin.flush()
+        except BrokenPipeError:
+            return False
+
+        for output in self.measure_docker.stdout:
+            if output.strip() == "sampler idle":
+                print(f"sampler idle after {time.time() - start:.2f} s")
+                return True
+            if output.strip() == "sampler idle timeout":
+                print(f"sampler did not go idle within {max_wait} s")
+                return False
+
+        return False
 
     def init_timings_sync_marker(self, system):
         """
         triggers a timings marker that records the clocks of the controller and the host in order to synchronize them.
-        Result is catched by the run_command function.
+        Result is catched by the run_command function. the marker is never batched, the controller time is taken when
+        its line is received and would include the other commands of the batch otherwise
         :param system: the system-under-test the marker shall be recorded for
         :return:
         """
-        self.run_ssh(f"""echo "benchi_marker,$(date +%s.%N),now,time_diff_check,{system},," """)
+        self.multiplexer.ensure_connected()
+        self.run_command(f"""{self.ssh_command} 'echo "benchi_marker,$(date +%s.%N),now,time_diff_check,{system},,"'""")
 
     def add_meta_marker_start(self, warm_start_no):
         """
@@ -377,6 +826,7 @@ class NetworkManager(BasicNetworkManager):
         :return:
         """
         self.warm_start_no = warm_start_no
+        self._execution_markers = []
         self.run_ssh(
             f"""echo "benchi_meta,$(date +%s.%N),start,execution,{self.system_name},,{"cold" if self.warm_start_no == 0 else f"warm_{self.warm_start_no}"}" """)
 
@@ -2,11 +2,13 @@ import argparse
 import base64
 import json
 import math
+import os
 import random
 import re
 import shutil
 import string
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from time import time, sleep
 from functools import wraps
 from pathlib import Path
@@ -14,12 +16,12 @@ from typing import Optional, Any
 from venv import logger
 
 import numpy as np
-import pandas as pd
 import geopandas as gpd
 import pyproj
 import rioxarray as rxr
 import shapely.geometry
 import shapely
+from osgeo import gdal, ogr, osr
 from osgeo_utils import gdal_polygonize
 from pyproj import CRS
 from shapely import lib
@@ -32,6 +34,25 @@ from hub.evaluation.measure_time import measure_time
 from hub.utils.capabilities import Capabilities
 
 
+# numpy types of the GDAL raster types, used to estimate the size of a VRT
+GDAL_NUMPY_TYPES = {
+    "Byte": "uint8",
+    "Int8": "int8",
+    "UInt16": "uint16",
+    "Int16": "int16",
+    "UInt32": "uint32",
+    "Int32": "int32",
+    "UInt64": "uint64",
+    "Int64": "int64",
+    "Float32": "float32",
+    "Float64": "float64",
+    "CInt16": "complex64",
+    "CInt32": "complex128",
+    "CFloat32": "complex64",
+    "CFloat64": "complex128",
+}
+
+
 def print_timings(dataset, comment):
     """
     print the amount of time taken for a given function as timing marker strings
@@ -126,6 +147,11 @@ class PreprocessConfig:
         self.raster_datatype = args.raster_datatype
         self.raster_singlefile = args.raster_singlefile
         self.raster_merged_name = args.raster_merged_name
+        self.raster_workers = args.raster_workers if args.raster_workers > 0 else len(os.sched_getaffinity(0))
+        self.raster_warp_vrt = args.raster_warp_vrt
+        self.raster_lazy = args.raster_lazy
+        self.raster_cog = args.raster_cog
+        self.raster_tile_pruning = args.raster_tile_pruning
 
         self.vector_filter = json.loads(
             base64.b64decode(args.vector_filter).decode("utf-8")) if args.vector_filter else {}
@@ -139,6 +165,8 @@ class PreprocessConfig:
 
         self.should_preprocess_vector = args.preprocess_vector
         self.should_preprocess_raster = args.preprocess_raster
+        # written into the output folders once preprocessing completed, thus a later attempt of the run can reuse them
+        self.preprocessed_sentinel = args.preprocessed_sentinel
 
 
 
@@ -205,6 +233,38 @@ class PreprocessConfig:
     def raster_file_path(self) -> list[Path]:
         return [self._raster_folder.joinpath(f) for f in self._raster_files]
 
+    @property
+    def sentinels(self) -> list[Path]:
+        """
+        the sentinels marking the output folders as complete, one per dataset that is preprocessed. none if the
+        controller did not name a sentinel
+        :return:
+        """
+        if not self.preprocessed_sentinel:
+            return []
+
+        folders = [self.vector_output_folder] if self.should_preprocess_vector else []
+        folders += [self.raster_output_folder] if self.should_preprocess_raster else []
+
+        return [folder.joinpath(self.preprocessed_sentinel) for folder in folders]
+
+    def clear_sentinels(self):
+        """
+        removes the sentinels of an earlier attempt, the output folders are incomplete until preprocessing completed
+        :return:
+        """
+        for sentinel in self.sentinels:
+            sentinel.unlink(missing_ok=True)
+
+    def write_sentinels(self):
+        """
+        marks the output folders as complete
+        :return:
+        """
+        for sentinel in self.sentinels:
+            sentinel.touch()
+            print(f"marked {sentinel.parent} as complete")
+
     def remove_intermediates(self):
         """
         remove intermediate results from the file system
@@ -216,27 +276,25 @@ class PreprocessConfig:
 
     def copy_to_output(self):
         """
-        copy the final intermediate result to the output folder
+        move the final intermediate result to the output folder
         :return:
         """
         if self.should_preprocess_vector:
-            print(f"copying vector files from {self.vector_folder}")
+            print(f"moving vector files from {self.vector_folder}")
             shutil.rmtree(self.vector_output_folder, ignore_errors=True)
             self.vector_output_folder.mkdir(parents=True, exist_ok=True)
             for f in self.vector_folder.iterdir():
                 if f.is_file():
-                    print(f"copy {f} to {self.vector_output_folder}")
-                    shutil.copy(f, self.vector_output_folder)
+                    self._finalize_file(f, self.vector_output_folder, "vector")
             # shutil.copytree(self.vector_folder, self.vector_output_folder, dirs_exist_ok=True)
 
         if self.should_preprocess_raster:
-            print(f"copying raster files from {self.raster_folder}")
+            print(f"moving raster files from {self.raster_folder}")
             shutil.rmtree(self.raster_output_folder, ignore_errors=True)
             self.raster_output_folder.mkdir(parents=True, exist_ok=True)
             for f in self.raster_folder.iterdir():
                 if f.is_file():
-                    print(f"copy {f} to {self.raster_output_folder}")
-                    shutil.copy(f, self.raster_output_folder)
+                    self._finalize_file(f, self.raster_output_folder, "raster")
 
             if self.system in self.capabilities["require_geotiff_ending"] or True:
                 for f in self.raster_output_folder.iterdir():
@@ -245,6 +303,38 @@ class PreprocessConfig:
                         print(f'created symlink {f.with_suffix(".geotiff")} to file {f}')
             # shutil.copytree(self.raster_folder, self.raster_output_folder, dirs_exist_ok=True)
 
+    def _finalize_file(self, file: Path, output_folder: Path, dataset: str):
+        """
+        puts a file into the output folder without copying its contents if possible. intermediate files are moved, as
+        they are removed afterward anyway. all other files are input files, which are hardlinked instead. files are
+        only copied if the output folder is on another device. prints the time taken as timings markers with the
+        events file_start and file_end
+        :param file: the file
+        :param output_folder: the output folder
+        :param dataset: the class of data, either raster or vector
+        :return:
+        """
+        output_file = output_folder.joinpath(file.name)
+        is_intermediate = any(folder in file.parents for folder in self.intermediate_folders)
+
+        start = time()
+        try:
+            if is_intermediate:
+                file.rename(output_file)
+                method = "move"
+            else:
+                os.link(file, output_file)
+                method = "link"
+        except OSError as e:
+            print(f"cannot {'move' if is_intermediate else 'link'} {file} to {output_folder}, copying it: {e}")
+            shutil.copy(file, output_folder)
+            method = "copy"
+        end = time()
+
+        print(f"{method} {file} to {output_folder}")
+        print(f"benchi_marker,{start},file_start,preprocess,{self.system},{dataset},finalize_{method} {file.name}")
+        print(f"benchi_marker,{end},file_end,preprocess,{self.system},{dataset},finalize_{method} {file.name}")
+
     @staticmethod
     def get_random_str(length):
         """
@@ -289,6 +379,10 @@ class PreprocessConfig:
             str(self.raster_target_crs),
             str(self.raster_resolution),
             str(self.raster_clip),
+            str(self.raster_workers),
+            str(self.raster_warp_vrt),
+            str(self.raster_lazy),
+            str(self.raster_cog),
             str(self.vector_filter),
             str(self.extent_wkt),
             str(self.bbox),
@@ -343,9 +437,8 @@ class Preprocessor:
         """
 
         if self.raster_meta is None:
-            self.raster_meta = json.loads(
-                subprocess.check_output(f'gdalinfo -json {self.config.raster_file_path[0]}', shell=True)
-                .decode('utf-8'))
+            with gdal.ExceptionMgr():
+                self.raster_meta = gdal.Info(str(self.config.raster_file_path[0]), format="json")
 
         return self.raster_meta
 
@@ -354,9 +447,9 @@ class Preprocessor:
         return the metadata of the vector dataset
         """
         if self.vector_meta is None:
-            self.vector_meta = json.loads(
-                subprocess.check_output(f'ogrinfo -json -nocount -nomd {self.config.vector_file_path[0]}', shell=True)
-                .decode('utf-8'))["layers"][0]
+            with gdal.ExceptionMgr():
+                self.vector_meta = gdal.VectorInfo(str(self.config.vector_file_path[0]), format="json",
+                                                   featureCount=False, options=["-nomd"])["layers"][0]
 
         return self.vector_meta
 
@@ -417,6 +510,103 @@ class Preprocessor:
         """
         self.config.set_raster_suffix(self.config.raster_target_suffix)
 
+    def run_tile_commands(self, commands: list[tuple[str, str]], comment: str):
+        """
+        runs one command per tile, at most raster_workers at once. the commands are processes themselves, thus a pool
+        of threads that wait for them suffices. for every tile, timings markers with the events tile_start and
+        tile_end are printed, which do not interfere with the markers of the whole step
+        :param commands: the name of the tile and its command
+        :param comment: the comment of the timings markers
+        :return:
+        """
+
+        def run_command(command: str) -> tuple[float, float, subprocess.CompletedProcess]:
+            start = time()
+            process = subprocess.run(command, shell=True, capture_output=True, universal_newlines=True)
+            return start, time(), process
+
+        print(f"processing {len(commands)} tiles with {min(self.config.raster_workers, len(commands))} workers")
+
+        with ThreadPoolExecutor(max_workers=self.config.raster_workers) as pool:
+            futures = [(tile, command, pool.submit(run_command, command)) for tile, command in commands]
+
+            # the output of a command is printed once it is done, thus it is not interleaved with the markers
+            for tile, command, future in futures:
+                start, end, process = future.result()
+
+                print(f"executing command for raster: {command}")
+                print(process.stdout, end="")
+                print(process.stderr, end="")
+                if process.returncode != 0:
+                    print(f"command for tile {tile} failed with return code {process.returncode}")
+
+                print(f"benchi_marker,{start},tile_start,preprocess,{self.config.system},raster,{comment} {tile}")
+                print(f"benchi_marker,{end},tile_end,preprocess,{self.config.system},raster,{comment} {tile}")
+
+    @staticmethod
+    def get_raster_size(raster_file: Path) -> tuple[int, int]:
+        """
+        returns the size of a raster file in pixels
+        :param raster_file: the raster file
+        :return: the width and height
+        """
+        with gdal.ExceptionMgr():
+            width, height = gdal.Info(str(raster_file), format="json")["size"]
+
+        return width, height
+
+    def raster_output_options(self, target_suffix: str) -> tuple[str, str]:
+        """
+        returns the output format option and suffix of a raster step. in the lazy pipeline, every step but the last
+        writes a VRT, which only references its input and does not process any pixels
+        :param target_suffix: the suffix if the output shall be materialized
+        :return: the format option and the suffix
+        """
+        if self.config.raster_lazy:
+            return "-of VRT ", ".vrt"
+
+        return "", target_suffix
+
+    def get_raster_file_size(self, raster_file: Path) -> int:
+        """
+        returns the size of a raster file in bytes. the size of a VRT is estimated from the amount of pixels, as the
+        file itself only references its sources
+        :param raster_file: the raster file
+        :return: the size in bytes
+        """
+        if raster_file.suffix != ".vrt":
+            return raster_file.stat().st_size
+
+        with gdal.ExceptionMgr():
+            meta = gdal.Info(str(raster_file), format="json")
+        bytes_per_pixel = sum(np.dtype(GDAL_NUMPY_TYPES.get(band["type"], "float64")).itemsize
+                              for band in meta["bands"])
+
+        return meta["size"][0] * meta["size"][1] * bytes_per_pixel
+
+    def get_pruning_geometries(self, crs: CRS) -> np.ndarray:
+        """
+        returns the geometries raster tiles and windows are pruned against, i.e., the envelope or the geometry of every
+        vector feature, depending on raster_tile_pruning
+        :param crs: the crs of the returned geometries
+        :return: the geometries
+        """
+        with gdal.ExceptionMgr():
+            dataset = ogr.Open(str(self.config.vector_file_path[0]))
+            layer = dataset.GetLayer(0)
+            layer_crs = CRS.from_wkt(layer.GetSpatialRef().ExportToWkt())
+            features = [f.GetGeometryRef() for f in layer]
+            features = [g for g in features if g is not None and not g.IsEmpty()]
+
+            if self.config.raster_tile_pruning == "envelope":
+                envelopes = np.array([g.GetEnvelope() for g in features], dtype="float64").reshape(-1, 4)
+                geometries = shapely.box(envelopes[:, 0], envelopes[:, 2], envelopes[:, 1], envelopes[:, 3])
+            else:
+                geometries = shapely.from_wkb([bytes(g.ExportToIsoWkb()) for g in features])
+
+        transformer = pyproj.Transformer.from_crs(layer_crs, crs, always_xy=True)
+        return shapely.transform(geometries, transformer.transform, interleaved=False)
+
 
 class MultiFilePreprocessor(Preprocessor):
     """
@@ -437,11 +627,13 @@ class MultiFilePreprocessor(Preprocessor):
         """
         print(f"merging raster files {self.config.raster_file}")
 
-        output_file = self._raster_tmp_out_folder.joinpath(self.config.raster_merged_name).with_suffix(".tiff")
+        output_format, output_suffix = self.raster_output_options(".tiff")
+        output_file = self._raster_tmp_out_folder.joinpath(self.config.raster_merged_name).with_suffix(output_suffix)
 
         input_files = " ".join([str(self.config.raster_folder.joinpath(f)) for f in self.config.raster_file])
 
         cmd_string = f"gdalwarp -multi --config GDAL_CACHEMAX 200000 -wm 200000 " \
+                     f"{output_format}" \
                      f"-t_srs {self.config.raster_target_crs} " \
                      f"{input_files} " \
                      f"{output_file}"
@@ -450,7 +642,7 @@ class MultiFilePreprocessor(Preprocessor):
 
         print("merged files with command:", cmd_string)
 
-        self.config.set_raster_suffix(".tiff")
+        self.config.set_raster_suffix(output_suffix)
         self.config.raster_file = [Path(output_file.name)]
         self.update_raster_folder()
 
@@ -491,7 +683,10 @@ class MultiFilePreprocessor(Preprocessor):
         """
         print(f"splitting raster file {self.config.raster_file}")
 
-        input_file = " ".join([str(r) for r in self.config.raster_file_path])
+        if len(self.config.raster_file) > 1:
+            print("warning: cannot split multiple raster files. only splitting the first file")
+
+        input_file = str(self.config.raster_file_path[0])
         output_folder = self._raster_tmp_out_folder
 
         max_width = kwargs.get("max_width", -1)
@@ -499,7 +694,7 @@ class MultiFilePreprocessor(Preprocessor):
 
 
         if max_width < 0 or max_height < 0:
-            ratio_2gb = self.config.raster_file_path[0].stat().st_size * 1.3 * 2 / (2 * 1024 * 1024 * 1024)  # size in GB
+            ratio_2gb = self.get_raster_file_size(self.config.raster_file_path[0]) * 1.3 * 2 / (2 * 1024 * 1024 * 1024)  # size in GB
 
             subdivs_per_axis = int(np.ceil(np.sqrt(ratio_2gb)))
             subdivs_x = subdivs_y = subdivs_per_axis
@@ -516,30 +711,127 @@ class MultiFilePreprocessor(Preprocessor):
         print(f"subdividing raster into {subdivs_x} x {subdivs_y} tiles of size {max_width} x {max_height}")
 
         has_next_step = kwargs.get("has_next_step", False)
+        desired_suffix = ".vrt" if has_next_step else self.config.raster_target_suffix
+
+        output_files = [[output_folder.joinpath(f'{self.config.raster_name}_{x}_{y}').with_suffix(desired_suffix)
+                         for x in range(0, subdivs_x)]
+                        for y in range(0, subdivs_y)]
+
+        if has_next_step:
+            # a VRT only references the window, no pixels are read
+            width, height = self.get_raster_meta()["size"]
+            with gdal.ExceptionMgr():
+                for y, row_files in enumerate(output_files):
+                    for x, output_file in enumerate(row_files):
+                        gdal.Translate(str(output_file), input_file, format="VRT",
+                                       srcWin=self.tile_window(x, y, max_width, max_height, width, height))
+        else:
+            print(f"splitting {subdivs_y} rows of tiles with {min(self.config.raster_workers, subdivs_y)} workers")
 
-        self.config.raster_file = []
-        for x in range(0, subdivs_x):
-            for y in range(0, subdivs_y):
-                cmd_string = f"gdal_translate " \
-                             f"-srcwin {x * max_width} {y * max_height} {max_width} {max_height} "
-
-                desired_suffix = self.config.raster_target_suffix
-
-                if has_next_step:
-                    cmd_string += "-of VRT "
-                    desired_suffix = ".vrt"
-
-                output_file = output_folder.joinpath(f'{self.config.raster_name}_{x}_{y}').with_suffix(desired_suffix)
+            with ThreadPoolExecutor(max_workers=self.config.raster_workers) as pool:
+                futures = [(y, pool.submit(self.split_raster_row, Path(input_file), y, max_width, max_height,
+                                           row_files, self.config.raster_cog))
+                           for y, row_files in enumerate(output_files)]
 
-                cmd_string += f"{input_file} " \
-                                f"{output_file} "
+                for y, future in futures:
+                    start, end = future.result()
+                    print(f"benchi_marker,{start},tile_start,preprocess,{self.config.system},raster,split row {y}")
+                    print(f"benchi_marker,{end},tile_end,preprocess,{self.config.system},raster,split row {y}")
 
-                subprocess.call(cmd_string, shell=True)
+        self.config.raster_file = [output_files[y][x] for x in range(0, subdivs_x) for y in range(0, subdivs_y)]
 
-                self.config.raster_file.append(output_file)
+        self.update_raster_folder()
 
+    @staticmethod
+    def tile_window(x: int, y: int, max_width: int, max_height: int, width: int, height: int) -> list[int]:
+        """
+        returns the window of a tile of a split raster. tiles at the right and bottom edge are cut at the extent of the
+        raster
+        :param x: the column of the tile
+        :param y: the row of the tile
+        :param max_width: the width of a tile
+        :param max_height: the height of a tile
+        :param width: the width of the raster
+        :param height: the height of the raster
+        :return: the x offset, y offset, width and height of the tile
+        """
+        x_off, y_off = x * max_width, y * max_height
+        return [x_off, y_off, min(max_width, width - x_off), min(max_height, height - y_off)]
 
-        self.update_raster_folder()
+    @staticmethod
+    def split_raster_row(input_file: Path, y: int, max_width: int, max_height: int, output_files: list[Path],
+                         cog: bool = False, chunk_bytes: int = 64 * 1024 * 1024) -> tuple[float, float]:
+        """
+        writes one row of tiles of a raster file. the source is read only once, in strips of whole blocks across the
+        full width, each strip is written into all tiles of the row. the tiles are cut like in tile_window
+        :param input_file: the raster file
+        :param y: the row of tiles
+        :param max_width: the width of a tile
+        :param max_height: the height of a tile
+        :param output_files: the output file of each tile in the row
+        :param cog: whether the tiles are written as cloud-optimized GeoTIFFs
+        :param chunk_bytes: the approximate amount of bytes read at once
+        :return: the start and end time
+        """
+        start = time()
+
+        with gdal.ExceptionMgr():
+            source = gdal.Open(str(input_file))
+            width, height = source.RasterXSize, source.RasterYSize
+            band_count = source.RasterCount
+            data_type = source.GetRasterBand(1).DataType
+            geo_transform = source.GetGeoTransform()
+
+            _, y_off, _, rows = MultiFilePreprocessor.tile_window(0, y, max_width, max_height, width, height)
+
+            # GTiff can be written window by window, all other formats are translated from it afterward
+            tiles = []
+            for x, output_file in enumerate(output_files):
+                x_off, _, columns, _ = MultiFilePreprocessor.tile_window(x, y, max_width, max_height, width, height)
+
+                is_gtiff = not cog and output_file.suffix in [".tif", ".tiff"]
+                tile_file = output_file if is_gtiff else output_file.with_suffix(f".tmp{output_file.suffix}.tiff")
+
+                tile = gdal.GetDriverByName("GTiff").Create(str(tile_file), columns, rows, band_count, data_type,
+                                                            options=["BIGTIFF=IF_SAFER"])
+                tile.SetGeoTransform((geo_transform[0] + x_off * geo_transform[1] + y_off * geo_transform[2],
+                                      geo_transform[1],
+                                      geo_transform[2],
+                                      geo_transform[3] + x_off * geo_transform[4] + y_off * geo_transform[5],
+                                      geo_transform[4],
+                                      geo_transform[5]))
+                tile.SetProjection(source.GetProjection())
+                for b in range(1, band_count + 1):
+                    no_data = source.GetRasterBand(b).GetNoDataValue()
+                    if no_data is not None:
+                        tile.GetRasterBand(b).SetNoDataValue(no_data)
+
+                tiles.append((x_off, columns, tile, tile_file, output_file))
+
+            block_rows = source.GetRasterBand(1).GetBlockSize()[1]
+            row_bytes = width * band_count * gdal.GetDataTypeSize(data_type) // 8
+            chunk_rows = max(block_rows, chunk_bytes // max(row_bytes, 1) // block_rows * block_rows)
+
+            for row in range(0, rows, chunk_rows):
+                chunk_height = min(chunk_rows, rows - row)
+                chunk = source.ReadAsArray(0, y_off + row, width, chunk_height) \
+                    .reshape((band_count, chunk_height, width))
+
+                for x_off, columns, tile, _, _ in tiles:
+                    for b in range(band_count):
+                        tile.GetRasterBand(b + 1).WriteArray(chunk[b, :, x_off:x_off + columns], 0, row)
+
+            # the tiles are closed before they are translated
+            translations = [(tile_file, output_file) for _, _, _, tile_file, output_file in tiles
+                            if tile_file != output_file]
+            tiles = None
+            source = None
+
+            for tile_file, output_file in translations:
+                gdal.Translate(str(output_file), str(tile_file), format="COG" if cog else None)
+                tile_file.unlink()
+
+        return start, time()
 
 
 class CRSFilterPreprocessor(Preprocessor):
@@ -554,24 +846,95 @@ class CRSFilterPreprocessor(Preprocessor):
     @print_timings("raster", "reproject")
     def clip_reproject_resolution_raster(self, *args, **kwargs):
         """
-        reprojects a raster dataset to the target CRS using gdalwarp
+        reprojects a raster dataset to the target CRS using gdalwarp. the tiles are warped in parallel. if
+        raster_warp_vrt is set, all tiles are warped into one VRT instead and the output is written in windows in
+        parallel
         :param args:
         :param kwargs:
         :return:
         """
         print(f"{'clipping and ' if self.config.raster_clip else ''}reprojecting raster file {self.config.raster_file}")
 
-        cmd_string = f"gdalwarp " \
-                     f"-t_srs {self.config.raster_target_crs} "
+        if self.config.raster_tile_pruning != "extent":
+            self.prune_raster_tiles()
 
-        if self.config.raster_clip:  # and False:
+        warp_vrt = self.config.raster_warp_vrt and len(self.config.raster_file) > 1 and not self.config.raster_singlefile
+
+        if self.config.raster_clip and len(self.config.raster_file) > 1 and not warp_vrt:
             # fix this by re-tiling all datasets from top-left, if a tile size is given. otherwise, use merged dataset
+            logger.warning("raster clipping is not supported for multiple raster files. merging files. this may take a while")
+            mf_preprocessor = MultiFilePreprocessor(self.config)
+            mf_preprocessor.merge_raster()
+
+        warp_options = self.get_warp_options()
+
+        target_suffix = self.config.raster_target_suffix if not self.config.raster_target_suffix in [".shp", ".geojson"] else self.config.raster_source_suffix
+        output_format, output_suffix = self.raster_output_options(target_suffix)
+
+        if warp_vrt:
+            self.warp_raster_windows(warp_options, output_format, output_suffix)
+        else:
+            commands = []
+            for f in self.config.raster_file_path:
+                output_file = self._raster_tmp_out_folder.joinpath(f.name)
+
+                resolution_option = ""
+                if self.config.raster_resolution != 1.0:
+                    width, height = self.get_raster_size(f)
+                    resolution_option = f"-ts {int(width / self.config.raster_resolution)} {int(height / self.config.raster_resolution)} "
+
+                commands.append((f.stem, f"gdalwarp "
+                                         f"{output_format}"
+                                         f"{warp_options}"
+                                         f"{resolution_option}"
+                                         f"{f} "
+                                         f"{output_file.with_suffix(output_suffix)} "
+                                         f"--debug ON"))
+
+            self.run_tile_commands(commands, "reproject")
 
-            if len(self.config.raster_file) > 1:
-                logger.warning("raster clipping is not supported for multiple raster files. merging files. this may take a while")
-                mf_preprocessor = MultiFilePreprocessor(self.config)
-                mf_preprocessor.merge_raster()
+        # TODO this could probably be streamlined for efficiency
+
+        self.update_raster_folder()
+        if self.config.raster_lazy:
+            self.config.set_raster_suffix(output_suffix)
+        else:
+            self.update_raster_suffix()
 
+        print(f"Transferred {self.config.raster_file_path} CRS to {self.config.raster_target_crs}")
+
+    def prune_raster_tiles(self):
+        """
+        drops the raster tiles that do not intersect the envelope or geometry of any vector feature
+        :return:
+        """
+        if len(self.config.raster_file) <= 1:
+            return
+
+        tree = shapely.STRtree(self.get_pruning_geometries(self.get_raster_crs()))
+
+        tile_extents = []
+        for f in self.config.raster_file_path:
+            with gdal.ExceptionMgr():
+                corners = gdal.Info(str(f), format="json")["cornerCoordinates"]
+            tile_extents.append(shapely.box(*corners["lowerLeft"], *corners["upperRight"]))
+
+        relevant = np.unique(tree.query(np.asarray(tile_extents), predicate="intersects")[0])
+        if len(relevant) == 0:
+            raise ValueError("No overlap between raster tiles and vector features found.")
+
+        print(f"pruned raster tiles against the vector features, {len(relevant)} of {len(self.config.raster_file)} "
+              f"tiles are relevant")
+        self.config.raster_file = [self.config.raster_file[i] for i in relevant]
+
+    def get_warp_options(self) -> str:
+        """
+        returns the gdalwarp options shared by all tiles, i.e., the target CRS, the clipping extent and the datatype
+        :return: the options
+        """
+        warp_options = f"-t_srs {self.config.raster_target_crs} "
+
+        if self.config.raster_clip:  # and False:
             extent = np.asarray(self.get_vector_meta()["geometryFields"][0]["extent"])
 
             # affine_transf = self.get_raster().rio.transform()
@@ -592,8 +955,7 @@ class CRSFilterPreprocessor(Preprocessor):
 
             (l, b, r, t) = list((px_count * pixel_size + fixpoint).reshape((4, 1)[0]))
 
-            cmd_string += f"{f'-te_srs {self.get_raster_crs().to_string()} -te {l} {b} {r} {t}' if self.config.raster_clip else ''} "
-
+            warp_options += f"-te_srs {self.get_raster_crs().to_string()} -te {l} {b} {r} {t} "
 
         current_raster_type = self.get_raster_meta()["bands"][0]["type"]
         if ((self.config.raster_datatype or self.config.system in self.config.capabilities["raster_require_double_precision"])
@@ -611,34 +973,76 @@ class CRSFilterPreprocessor(Preprocessor):
                         self.config.raster_datatype = current_raster_type
 
 
-            cmd_string += f"-ot {self.config.raster_datatype} "
+            warp_options += f"-ot {self.config.raster_datatype} "
 
-        for f in self.config.raster_file_path:
+        return warp_options
 
-            output_file = self._raster_tmp_out_folder.joinpath(f.name)
+    def warp_raster_windows(self, warp_options: str, output_format: str, output_suffix: str):
+        """
+        mosaics all tiles into a VRT and warps it into another VRT, which does not process any pixels yet. the warped
+        VRT is then written in horizontal windows in parallel, each window to its own file
+        :param warp_options: the gdalwarp options shared by all tiles
+        :param output_format: the format option of the output files
+        :param output_suffix: the suffix of the output files
+        :return:
+        """
+        # the VRTs must not end up in the output folder
+        vrt_folder = self.base_tmp_folder.joinpath(f"{self.config.raster_name}_vrt_{PreprocessConfig.get_random_str(12)}")
+        vrt_folder.mkdir(parents=True, exist_ok=True)
+        self.config.intermediate_folders.append(vrt_folder)
 
-            if self.config.raster_resolution != 1.0:
-                width, height = json.loads(
-                    subprocess.check_output(f'gdalinfo -json {self.config.raster_file_path}', shell=True)
-                    .decode('utf-8'))["size"]
-                cmd_string += f"-ts {int(width / self.config.raster_resolution)} {int(height / self.config.raster_resolution)} "
+        source_vrt = vrt_folder.joinpath(f"{self.config.raster_name}_source.vrt")
+        warped_vrt = vrt_folder.joinpath(f"{self.config.raster_name}_warped.vrt")
 
-            target_suffix = self.config.raster_target_suffix if not self.config.raster_target_suffix in [".shp", ".geojson"] else self.config.raster_source_suffix
+        input_files = " ".join([str(f) for f in self.config.raster_file_path])
+        subprocess.call(f"gdalbuildvrt {source_vrt} {input_files}", shell=True)
 
-            cmd_string += f"{f} " \
-                          f"{output_file.with_suffix(target_suffix)} " \
-                          f"--debug ON " \
-                          f""
+        resolution_option = ""
+        if self.config.raster_resolution != 1.0:
+            width, height = self.get_raster_size(source_vrt)
+            resolution_option = f"-ts {int(width / self.config.raster_resolution)} {int(height / self.config.raster_resolution)} "
 
-            print(f"executing command for raster: {cmd_string}")
-            subprocess.call(cmd_string, shell=True)
+        cmd_string = f"gdalwarp -of VRT {warp_options}{resolution_option}{source_vrt} {warped_vrt}"
+        print(f"executing command for raster: {cmd_string}")
+        subprocess.call(cmd_string, shell=True)
 
-        # TODO this could probably be streamlined for efficiency
+        with gdal.ExceptionMgr():
+            warped_meta = gdal.Info(str(warped_vrt), format="json")
+        width, height = warped_meta["size"]
+        window_height = max(256, int(math.ceil(height / self.config.raster_workers)))
+        y_offsets = list(enumerate(range(0, height, window_height)))
+
+        if self.config.raster_tile_pruning != "extent":
+            # windows without any vector feature are not written
+            x_min, x_size, _, y_max, _, y_size = warped_meta["geoTransform"]
+            windows = shapely.box(x_min,
+                                  [y_max + (y_off + min(window_height, height - y_off)) * y_size for _, y_off in y_offsets],
+                                  x_min + width * x_size,
+                                  [y_max + y_off * y_size for _, y_off in y_offsets])
+            tree = shapely.STRtree(self.get_pruning_geometries(self.config.raster_target_crs))
+            relevant = set(np.unique(tree.query(windows, predicate="intersects")[0]).tolist())
+            if not relevant:
+                raise ValueError("No overlap between raster windows and vector features found.")
+
+            print(f"pruned raster windows against the vector features, {len(relevant)} of {len(y_offsets)} windows "
+                  f"are relevant")
+            y_offsets = [y_offsets[i] for i in sorted(relevant)]
+
+        commands = []
+        self.config.raster_file = []
+        for y, y_off in y_offsets:
+            output_file = self._raster_tmp_out_folder.joinpath(f'{self.config.raster_name}_0_{y}') \
+                .with_suffix(output_suffix)
 
-        self.update_raster_folder()
-        self.update_raster_suffix()
+            commands.append((output_file.stem, f"gdal_translate "
+                                               f"{output_format}"
+                                               f"-srcwin 0 {y_off} {width} {min(window_height, height - y_off)} "
+                                               f"{warped_vrt} "
+                                               f"{output_file}"))
+            self.config.raster_file.append(Path(output_file.name))
 
-        print(f"Transferred {self.config.raster_file_path} CRS to {self.config.raster_target_crs}")
+        print(f"writing the warped raster in {len(commands)} windows of {width} x {window_height} pixels")
+        self.run_tile_commands(commands, "reproject")
 
     @measure_time
     @print_timings("vector", "reproject")
@@ -722,28 +1126,29 @@ class FileConverterPreprocessor(Preprocessor):
         self.update_raster_folder()
 
     @measure_time
-    @print_timings("raster", "translate")
-    def raster_to_xyz(self):
+    @print_timings("raster", "materialize")
+    def materialize_raster(self, *args, **kwargs):
         """
-        transforms a raster dataset into a xyz file
+        writes the VRTs of the lazy pipeline into the target format. all steps composed in a VRT are only computed
+        here, once per file and in parallel
+        :param args:
+        :param kwargs:
         :return:
         """
+        if not any(f.suffix == ".vrt" for f in self.config.raster_file):
+            return
 
-        for idx, f in enumerate(self.config.raster_file_path):
-            print(f"translating raster file {f} to xyz")
-
-            output_file = self._raster_tmp_out_folder \
-                .joinpath(f).with_suffix(f".xyz.{idx}")
-
-            subprocess.call(f"gdal_translate -of XYZ {self.config.raster_file_path} {output_file}", shell=True)
+        target_suffix = self.config.raster_target_suffix if not self.config.raster_target_suffix in [".shp", ".geojson"] else self.config.raster_source_suffix
 
-            print(f"translated raster file to {output_file}")
+        commands = []
+        for f in self.config.raster_file_path:
+            output_file = self._raster_tmp_out_folder.joinpath(f.name).with_suffix(target_suffix)
+            commands.append((f.stem, f"gdal_translate {f} {output_file}"))
 
-        subprocess.call(
-            f"cat {self._raster_tmp_out_folder}/*.xyz.* > {self._raster_tmp_out_folder}/{self.config.raster_file}.xyz",
-            shell=True)
+        print(f"materializing raster files {self.config.raster_file}")
+        self.run_tile_commands(commands, "materialize")
 
-        self.config.set_raster_suffix(".xyz")
+        self.config.raster_file = [Path(f.name).with_suffix(target_suffix) for f in self.config.raster_file]
         self.update_raster_folder()
 
     @measure_time
@@ -806,33 +1211,89 @@ class DataModelProcessor(Preprocessor):
         self.update_raster_folder()
         self.update_raster_suffix()
 
+    @measure_time
     @print_timings("raster", "vectorize")
     def vectorize_points(self, *args, **kwargs):
         """
-
-        vectorize a XYZ raster file into points using geopandas
+        vectorize raster files into points, one point at the center of each pixel that is not nodata. the rasters are
+        read in strips of whole blocks, the coordinates of a strip are computed at once from the geotransform. the
+        output layer stays open for all strips, each strip is written within one transaction. thus, memory is bounded
+        by the size of a strip and drivers that cannot append to an existing file are supported as well
         :param args:
         :param kwargs:
         :return:
         """
-
-        # we assume there only exists one file after xyz conversion
-
-        xyz_file = self.config.raster_file_path[0]
+        chunk_pixels = kwargs.get("chunk_pixels", 4 * 1024 * 1024)
 
         output_file = self._raster_tmp_out_folder \
             .joinpath(self.config.raster_file[0]).with_suffix(self.config.raster_target_suffix)
+        driver_name = self.get_driver_name(output_file)
+
+        with gdal.ExceptionMgr(), ogr.ExceptionMgr():
+            sources = [gdal.Open(str(f)) for f in self.config.raster_file_path]
+
+            spatial_ref = sources[0].GetSpatialRef()
+            if spatial_ref is None:
+                spatial_ref = osr.SpatialReference()
+                spatial_ref.ImportFromWkt(self.config.raster_target_crs.to_wkt())
+            spatial_ref.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+            is_integer = sources[0].GetRasterBand(1).ReadAsArray(0, 0, 1, 1).dtype.kind in "iub"
+
+            driver = ogr.GetDriverByName(driver_name)
+            if output_file.exists():
+                driver.DeleteDataSource(str(output_file))
+            data_source = driver.CreateDataSource(str(output_file))
+            layer = data_source.CreateLayer(output_file.stem, spatial_ref, ogr.wkbPoint)
+            layer.CreateField(ogr.FieldDefn("values", ogr.OFTInteger64 if is_integer else ogr.OFTReal))
+
+            # the feature and its geometry are reused for all points, the layer stores a copy of them
+            feature = ogr.Feature(layer.GetLayerDefn())
+            point = ogr.Geometry(ogr.wkbPoint)
+
+            point_count = 0
+            for source in sources:
+                band = source.GetRasterBand(1)
+                no_data = band.GetNoDataValue()
+                width, height = source.RasterXSize, source.RasterYSize
+                gt = source.GetGeoTransform()
+
+                block_rows = band.GetBlockSize()[1]
+                chunk_rows = max(block_rows, chunk_pixels // width // block_rows * block_rows)
+
+                for row in range(0, height, chunk_rows):
+                    values = band.ReadAsArray(0, row, width, min(chunk_rows, height - row))
+
+                    valid = ~np.isnan(values) if values.dtype.kind == "f" else np.ones(values.shape, dtype=bool)
+                    if no_data is not None:
+                        valid &= values != no_data
+
+                    rows, columns = np.nonzero(valid)
+                    if len(rows) == 0:
+                        continue
+                    rows = rows + row + 0.5
+                    columns = columns + 0.5
+                    x = gt[0] + columns * gt[1] + rows * gt[2]
+                    y = gt[3] + columns * gt[4] + rows * gt[5]
+
+                    layer.StartTransaction()
+                    for px, py, value in zip(x.tolist(), y.tolist(), values[valid].tolist()):
+                        point.SetPoint_2D(0, px, py)
+                        feature.SetGeometry(point)
+                        feature.SetField(0, value)
+                        feature.SetFID(-1)
+                        layer.CreateFeature(feature)
+                    layer.CommitTransaction()
+                    point_count += len(x)
+
+            # closing the data source writes the output
+            layer = None
+            data_source = None
+            sources = None
+
+        print(f"done vectorizing {point_count} points, saved output to {output_file}")
 
-        points = pd.read_csv(xyz_file, header=None, names=["x", "y", "values"], sep=" ")
-        geo_points = gpd.GeoDataFrame({
-            "geometry": gpd.points_from_xy(points["x"], points["y"], crs=self.config.raster_target_crs),
-            "values": points["values"]
-        })
-
-        geo_points.to_file(str(output_file), driver=self.get_driver_name(output_file), encoding="UTF-8")
-
-        print(f"done vectorizing with polygons, saved output to {output_file}")
-
+        self.config.raster_file = [Path(output_file.name)]
         self.update_raster_folder()
         self.update_raster_suffix()
 
@@ -923,6 +1384,18 @@ def main():
                         action=argparse.BooleanOptionalAction)
     parser.add_argument("--raster_merged_name", help="the name of the merged raster file if raster_singlefile is set to true", required=False, default="merged")
     parser.add_argument("--raster_datatype", help="the datatype of the raster file", required=False, default=None)
+    parser.add_argument("--raster_workers", help="the amount of raster tiles processed in parallel, all cores if 0",
+                        required=False, default=0, type=int)
+    parser.add_argument("--raster_warp_vrt", help="whether to warp all raster tiles into one VRT and write it in windows",
+                        required=False, action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument("--raster_lazy", help="whether to compose the raster steps as VRTs and write the raster only "
+                                              "once, in the target format",
+                        required=False, action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument("--raster_cog", help="whether split raster tiles are written as cloud-optimized GeoTIFFs",
+                        required=False, action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument("--raster_tile_pruning", help="what raster tiles and windows are pruned against, the extent of "
+                                                      "the vector dataset or the envelope or geometry of every feature",
+                        required=False, default="extent", choices=["extent", "envelope", "features"])
     parser.add_argument("--system", help="Specify which system should be benchmarked")
     parser.add_argument("--vector_filter", help="Filters to be applied on the vector feature fields", required=False,
                         default="")
@@ -934,11 +1407,14 @@ def main():
     parser.add_argument("--bbox_srs", help="The CRS of the bounding box", required=False, default="")
     parser.add_argument("--preprocess_vector", help="Whether to preprocess the vector data", required=False, action=argparse.BooleanOptionalAction, default=True)
     parser.add_argument("--preprocess_raster", help="Whether to preprocess the raster data", required=False, action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--preprocessed_sentinel", help="the file written into the output folders once preprocessing "
+                                                        "completed", required=False, default="")
     preprocess_config = PreprocessConfig(parser.parse_args(), capabilities)
     print(preprocess_config)
 
     should_preprocess_vector = preprocess_config.should_preprocess_vector
     should_preprocess_raster = preprocess_config.should_preprocess_raster
+    preprocess_config.clear_sentinels()
 
 
     mf_preprocessor = MultiFilePreprocessor(preprocess_config)
@@ -964,7 +1440,7 @@ def main():
         crs_preprocessor.config.check_raster_files_exist()
 
     if preprocess_config.system in capabilities["raster_max_2gb"]:
-        mf_preprocessor.split_raster(has_next_step=False)
+        mf_preprocessor.split_raster(has_next_step=preprocess_config.raster_lazy)
         mf_preprocessor.config.check_raster_files_exist()
 
     # TODO if raster -> raster needs to be converted
@@ -984,9 +1460,6 @@ def main():
             data_preprocessor.vectorize_polygons()
             data_preprocessor.config.check_raster_files_exist()
         elif preprocess_config.vectorization_type == VectorizationType.TO_POINTS:
-            file_converter = FileConverterPreprocessor(preprocess_config)
-            file_converter.raster_to_xyz()
-
             data_preprocessor = DataModelProcessor(preprocess_config)
             data_preprocessor.vectorize_points()
             data_preprocessor.config.check_raster_files_exist()
@@ -998,8 +1471,14 @@ def main():
         file_type_preprocessor.vector_to_csv_wkt(log_time=file_type_preprocessor.logger)
         print(file_type_preprocessor.logger)
 
+    if preprocess_config.raster_lazy and should_preprocess_raster:
+        materializer = FileConverterPreprocessor(preprocess_config)
+        materializer.materialize_raster()
+        materializer.config.check_raster_files_exist()
+
     preprocess_config.copy_to_output()
     preprocess_config.remove_intermediates()
+    preprocess_config.write_sentinels()
 
 
 if __name__ == "__main__":
@@ -1,8 +1,7 @@
-import json
-import subprocess
 import uuid
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pyproj
 import shapely
@@ -19,7 +18,9 @@ from hub.enums.rasterfiletype import RasterFileType
 from hub.enums.stage import Stage
 from hub.enums.vectorfiletype import VectorFileType
 from hub.utils.datalocation import DataLocation
+from hub.utils.filemetadata import FileMetadataReader
 from hub.utils.network import BasicNetworkManager
+from hub.utils.tilecatalog import TileCatalog
 from hub.utils.system import System
 
 
@@ -48,6 +49,7 @@ class RasterLocation(DataLocation):
 
         self._suffix = RasterFileType.get_by_value(self._files[0].suffix)
         self._is_clipped = False
+        self._tile_catalog = TileCatalog.from_metadata([str(f) for f in self._files], self._metadata, self.EXTENT_CRS)
         self._tiles = pd.DataFrame([
             {
                 "tile_stem": Path(t).stem,
@@ -57,7 +59,7 @@ class RasterLocation(DataLocation):
                 "is_preprocessed": False,
                 "is_ingested": False,
                 "is_merged": False
-            } for t, e in self.get_extent_per_file().items()
+            } for t, e in self._tile_catalog.extent_per_tile().items()
         ])
 
         # existing merged file
@@ -114,6 +116,14 @@ class RasterLocation(DataLocation):
     def get_tiles(self) -> DataFrame:
         return self._tiles
 
+    @property
+    def tile_catalog(self) -> TileCatalog:
+        """
+        the spatial index over the extents of all tiles of the dataset, built once from their metadata
+        :return:
+        """
+        return self._tile_catalog
+
     def docker_file_not_ingested(self) -> list[Path]:
         return [self.docker_dir.joinpath(f"{tile_stem}{self._target_suffix.value}") for tile_stem in self._tiles[self._tiles["is_relevant"] & ~self._tiles["is_ingested"]]["tile_stem"]]
 
@@ -132,13 +142,11 @@ class RasterLocation(DataLocation):
         return sum(t[0] * t[1] for t in self.get_dimensions().values())
 
     def get_approx_pixels_covered(self) -> int:
-        total_extent = self.get_extent(use_extent_crs=False).bounds
+        total_extent = self._tile_catalog.total_bounds()
         total_width = abs(total_extent[2] - total_extent[0])
         total_height = abs(total_extent[3] - total_extent[1])
 
-        tile_bounds = [extent.bounds for extent in self.get_extent_per_file().items()]
-        avg_tile_width = abs(sum(t[2] - t[0] for t in tile_bounds) / len(tile_bounds))
-        avg_tile_height = abs(sum(t[3] - t[1] for t in tile_bounds) / len(tile_bounds))
+        avg_tile_width, avg_tile_height = self._tile_catalog.mean_tile_size()
 
         width_in_tiles = total_width / avg_tile_width
         height_in_tiles = total_height / avg_tile_height
@@ -158,12 +166,8 @@ class RasterLocation(DataLocation):
             self._metadata = self.get_remote_metadata(nm)
             return self._metadata
 
-        def fetch_metadata(file) -> dict:
-            return json.loads(
-                subprocess.check_output(f'gdalinfo -json {file}', shell=True)
-                .decode('utf-8'))
-
-        self._metadata = [fetch_metadata(f) for f in self.controller_file]
+        reader = FileMetadataReader(self._host_params.controller_db_connection)
+        self._metadata = reader.read_raster(self.controller_file)
         return self._metadata
 
     def get_extent_per_file(self, use_extent_crs: bool = True) -> dict[str, Polygon]:
@@ -198,14 +202,7 @@ class RasterLocation(DataLocation):
         return shapely.unary_union(list(self.get_extent_per_file(use_extent_crs=use_extent_crs).values())).normalize()
 
     def get_remote_metadata(self, nm: BasicNetworkManager) -> list[dict]:
-        docker_command = f"docker run --rm -v {self._host_base}:/data {self.GDAL_DOCKER_IMAGE} gdalinfo -json"
-
-        def fetch_metadata(file) -> dict:
-            print("getting remote metadata for file:", file)
-            result_raw = nm.run_ssh_return_result(f"{docker_command} {file}")
-            return json.loads(result_raw)
-
-        return [fetch_metadata(f) for f in self.docker_file]
+        return self.probe_remote_metadata(nm, "gdalinfo -json")
 
     def get_remote_extent_per_file(self, nm: BasicNetworkManager, use_extent_crs: bool = True) -> dict[Path, Polygon]:
         def bbox_from_meta(metadata):
@@ -531,16 +528,28 @@ class RasterLocation(DataLocation):
 
             return results
 
-    def select_relevant_tiles(self, vector_extent: Polygon, system: str, db_connection: DuckDBPyConnection):
-        relevant_raster_files = {name: {"intersects": tile_extent.intersects(vector_extent),
-                                        "covers": tile_extent.covers(vector_extent)}
-                                 for name, tile_extent
-                                 in self.get_extent_per_file().items()}
-
-        if any([v["covers"] for v in relevant_raster_files.values()]):
-            relevant_raster_files = [[name for name, v in relevant_raster_files.items() if v["covers"]][0]]
+    def select_relevant_tiles(self, vector_extent: Polygon, system: str, db_connection: DuckDBPyConnection,
+                              vector_geometries: np.ndarray | None = None):
+        """
+        marks the tiles needed for the vector dataset as relevant. if a single tile covers the vector extent, only this
+        tile is relevant. otherwise, all tiles intersecting the vector extent are relevant, or, if the geometries of
+        the vector features are given, only the tiles intersecting any of them
+        :param vector_extent: the extent of the vector dataset
+        :param system: the system
+        :param db_connection: the database connection
+        :param vector_geometries: the geometries or envelopes of the vector features, in the extent crs
+        :return:
+        """
+        covering = self._tile_catalog.covering(vector_extent)
+
+        if len(covering) > 0:
+            relevant_raster_files = self._tile_catalog.names_of(covering[:1])
+        elif vector_geometries is not None:
+            relevant_raster_files = self._tile_catalog.names_of(self._tile_catalog.intersecting(vector_geometries))
+            print(f"pruned raster tiles against {len(vector_geometries)} vector features, "
+                  f"{len(relevant_raster_files)} of {len(self._tile_catalog)} tiles are relevant")
         else:
-            relevant_raster_files = [name for name, v in relevant_raster_files.items() if v["intersects"]]
+            relevant_raster_files = self._tile_catalog.names_of(self._tile_catalog.intersecting(vector_extent))
 
         if not relevant_raster_files:
             raise ValueError(f"No overlap between raster tiles and vector dataset found.")
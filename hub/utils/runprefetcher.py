@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import jinja2
+import yaml
+
+from hub.benchmarkrun.benchmark_run import BenchmarkRun
+from hub.configuration import PROJECT_ROOT
+from hub.utils.filetransporter import FileTransporter
+from hub.utils.network import BasicNetworkManager
+
+
+class RunPrefetcher:
+    """
+    stages what a benchmark run needs on the host in the background, i.e., transfers its datasets into the dataset
+    cache and pulls the docker images of its system. every remote operation is a background unit of the measurement
+    gate of the host, thus nothing is transferred while another run is within a measured window
+    """
+
+    def __init__(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self._pending: Future | None = None
+        self._cancelled = threading.Event()
+
+    def prefetch(self, run: BenchmarkRun):
+        """
+        starts staging a run in the background. only one run is staged at a time
+        :param run: the benchmark run
+        :return:
+        """
+        self.wait()
+        self._pending = self._executor.submit(self._prefetch, run)
+
+    def wait(self):
+        """
+        waits until the run that is currently staged is completed. failures are only reported, since the setup of the
+        run stages everything that is still missing
+        :return:
+        """
+        if self._pending is None:
+            return
+
+        try:
+            self._pending.result()
+        except Exception as e:
+            print(f"prefetching failed, staging during setup instead: {e}")
+        finally:
+            self._pending = None
+
+    def close(self):
+        """
+        cancels the pending prefetch and stops the background thread. a remote operation that is already running is
+        completed, the ones waiting for a measured window to end are not started
+        :return:
+        """
+        self._cancelled.set()
+        self.wait()
+        self._executor.shutdown()
+
+    def _prefetch(self, run: BenchmarkRun):
+        system_name = run.benchmark_params.system.name
+        network_manager = BasicNetworkManager(run.host_params, system_name)
+        transporter = FileTransporter(network_manager)
+
+        print(f"prefetching run {run.benchmark_params}")
+        for dataset in (run.vector, run.raster):
+            transporter.stage_to_cache(dataset, gate=network_manager.gate, cancelled=self._cancelled)
+
+        for image in RunPrefetcher._docker_images(system_name):
+            with network_manager.gate.background(self._cancelled):
+                network_manager.run_ssh(f"docker pull --quiet {image}")
+
+    @staticmethod
+    def _docker_images(system_name: str) -> list[str]:
+        """
+        the docker images used by the compose file of a system. services that are built locally are skipped
+        :param system_name: the name of the system-under-test
+        :return: the image names
+        """
+        template_loader = jinja2.FileSystemLoader(searchpath=PROJECT_ROOT.joinpath(f"deployment/files/{system_name}/"))
+        template = jinja2.Environment(loader=template_loader).get_template("docker-compose.yml.j2")
+        services = yaml.safe_load(template.render()).get("services", {})
+
+        return sorted({service["image"] for service in services.values() if "image" in service and "build" not in service})
@@ -0,0 +1,149 @@
+import atexit
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from hub.configuration import PROJECT_ROOT
+
+
+class SSHMultiplexer:
+    """
+    keeps a persistent, multiplexed ssh master connection (ControlMaster) per remote. all ssh, scp and rsync calls that
+    use the returned ssh options are tunneled through the master socket, thus the ssh handshake is only done once.
+    masters are shared between all network managers of the same remote within the controller process
+    """
+    CONTROL_DIR = PROJECT_ROOT.parent.joinpath("ssh", "controlmasters")
+    CONTROL_PERSIST = 600
+    HEALTH_CHECK_INTERVAL = 10
+
+    _pool: dict[tuple[str, str], "SSHMultiplexer"] = {}
+    _pool_lock = threading.Lock()
+
+    def __init__(self, ssh_connection: str, base_ssh_options: str) -> None:
+        """
+        the init function. does not open the connection yet
+        :param ssh_connection: the ssh connection base string
+        :param base_ssh_options: the ssh options without any multiplexing options
+        """
+        self.ssh_connection = ssh_connection
+        self.base_ssh_options = base_ssh_options
+        self.control_path = self.CONTROL_DIR.joinpath("%C")
+
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._setup_intervals: list[tuple[float, float]] = []
+        self.setup_time_total = 0.0
+        self.connects = 0
+
+    @classmethod
+    def get(cls, ssh_connection: str, base_ssh_options: str) -> "SSHMultiplexer":
+        """
+        returns the multiplexer of a remote from the pool, creates it if necessary
+        :param ssh_connection: the ssh connection base string
+        :param base_ssh_options: the ssh options without any multiplexing options
+        :return: the multiplexer
+        """
+        key = (ssh_connection, base_ssh_options)
+        with cls._pool_lock:
+            if key not in cls._pool:
+                cls._pool[key] = SSHMultiplexer(ssh_connection, base_ssh_options)
+
+            return cls._pool[key]
+
+    @classmethod
+    def close_all(cls):
+        """
+        closes all master connections in the pool
+        :return:
+        """
+        for multiplexer in cls._pool.values():
+            multiplexer.close()
+
+    @property
+    def ssh_options(self) -> str:
+        """
+        the ssh options that route a connection through the master socket
+        :return: the options
+        """
+        return f"{self.base_ssh_options}" \
+               f"-o 'ControlMaster=auto' " \
+               f"-o 'ControlPath={self.control_path}' " \
+               f"-o 'ControlPersist={self.CONTROL_PERSIST}' "
+
+    def _control_command(self, operation: str) -> subprocess.CompletedProcess:
+        return subprocess.run(f"ssh {self.ssh_connection} {self.ssh_options} -O {operation}",
+                              shell=True, capture_output=True, universal_newlines=True)
+
+    def is_alive(self) -> bool:
+        """
+        checks whether the master connection is up
+        :return: whether the master answers
+        """
+        self._last_check = time.time()
+        return self._control_command("check").returncode == 0
+
+    def connect(self) -> bool:
+        """
+        starts a new master connection in the background and records the time needed for the handshake
+        :return: whether the master connection could be established
+        """
+        self.CONTROL_DIR.mkdir(parents=True, exist_ok=True)
+
+        start = time.time()
+        return_code = subprocess.run(f"ssh {self.ssh_connection} {self.ssh_options} -M -N -f",
+                                     shell=True).returncode
+        end = time.time()
+
+        self._setup_intervals.append((start, end))
+        self.setup_time_total += end - start
+        self.connects += 1
+        self._last_check = end
+
+        if return_code != 0:
+            print(f"could not establish ssh master connection to {self.ssh_connection}")
+            return False
+
+        print(f"established ssh master connection to {self.ssh_connection} in {(end - start) * 1000:.2f} ms")
+        return True
+
+    def ensure_connected(self, force_check: bool = False) -> bool:
+        """
+        health check for the master connection. reconnects if the master is gone. the check itself is only done if
+        the last one is older than HEALTH_CHECK_INTERVAL seconds
+        :param force_check: whether to check regardless of the last check
+        :return: whether the master connection is up
+        """
+        if not force_check and time.time() - self._last_check < self.HEALTH_CHECK_INTERVAL:
+            return True
+
+        # several threads may use the same remote, only one of them may start a new master
+        with self._lock:
+            if self.is_alive():
+                return True
+
+            if self.connects > 0:
+                print(f"ssh master connection to {self.ssh_connection} lost, reconnecting")
+
+            return self.connect()
+
+    def pop_setup_intervals(self) -> list[tuple[float, float]]:
+        """
+        returns all (start, end) intervals spent on establishing connections since the last call
+        :return: the intervals
+        """
+        intervals = self._setup_intervals
+        self._setup_intervals = []
+        return intervals
+
+    def close(self):
+        """
+        closes the master connection
+        :return:
+        """
+        if self.connects > 0:
+            self._control_command("exit")
+            self.connects = 0
+
+
+atexit.register(SSHMultiplexer.close_all)
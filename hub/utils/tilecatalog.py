@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import numpy as np
+import pyproj
+import shapely
+from pyproj import CRS
+from shapely import Geometry
+
+
+class TileCatalog:
+    """
+    spatial index over the extents of the tiles of a raster dataset. answers which tiles intersect or cover a geometry,
+    e.g., the extent of the vector dataset or each of its features, without looping over the tiles
+    """
+
+    def __init__(self, names: list[str], extents: list[Geometry] | np.ndarray) -> None:
+        """
+        the init function
+        :param names: the names of the tiles
+        :param extents: the extents of the tiles, in the same order as the names
+        """
+        self._names = np.asarray(names, dtype=object)
+        self._extents = np.asarray(extents, dtype=object)
+        self._bounds = shapely.bounds(self._extents).reshape(-1, 4)
+        self._tree = shapely.STRtree(self._extents)
+
+    @classmethod
+    def from_metadata(cls, names: list[str], metadata: list[dict], target_crs: CRS | None) -> TileCatalog:
+        """
+        builds the catalog from the gdalinfo metadata of the tiles. the extents of all tiles in the same crs are
+        transformed at once
+        :param names: the names of the tiles
+        :param metadata: the gdalinfo metadata per tile
+        :param target_crs: the crs of the extents, the crs of each tile if None
+        :return: the catalog
+        """
+        corners = np.array([[*m["cornerCoordinates"]["lowerLeft"], *m["cornerCoordinates"]["upperRight"]]
+                            for m in metadata], dtype="float64").reshape(-1, 4)
+        epsg = np.array([m["stac"]["proj:epsg"] for m in metadata])
+        extents = shapely.box(corners[:, 0], corners[:, 1], corners[:, 2], corners[:, 3])
+
+        if target_crs is not None:
+            for tile_epsg in np.unique(epsg):
+                transformer = pyproj.Transformer.from_crs(CRS.from_epsg(int(tile_epsg)), target_crs, always_xy=True)
+                in_crs = epsg == tile_epsg
+                extents[in_crs] = shapely.transform(extents[in_crs], transformer.transform, interleaved=False)
+
+        return cls(names, extents)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @property
+    def names(self) -> list[str]:
+        return self._names.tolist()
+
+    @property
+    def extents(self) -> np.ndarray:
+        return self._extents
+
+    @property
+    def bounds(self) -> np.ndarray:
+        """
+        :return: the bounds of the tiles as array of xmin, ymin, xmax, ymax
+        """
+        return self._bounds
+
+    def extent_per_tile(self) -> dict[str, Geometry]:
+        return dict(zip(self._names.tolist(), self._extents.tolist()))
+
+    def intersecting(self, geometry: Geometry | np.ndarray) -> np.ndarray:
+        """
+        returns the tiles intersecting a geometry. if an array of geometries is given, returns the tiles intersecting
+        any of them
+        :param geometry: the geometry or array of geometries
+        :return: the indices of the tiles in ascending order
+        """
+        return self._query(geometry, "intersects")
+
+    def covering(self, geometry: Geometry | np.ndarray) -> np.ndarray:
+        """
+        returns the tiles covering a geometry. if an array of geometries is given, returns the tiles covering any of
+        them
+        :param geometry: the geometry or array of geometries
+        :return: the indices of the tiles in ascending order
+        """
+        return self._query(geometry, "covered_by")
+
+    def any_covers(self, geometry: Geometry) -> bool:
+        return len(self.covering(geometry)) > 0
+
+    def names_of(self, indices: np.ndarray) -> list[str]:
+        return self._names[indices].tolist()
+
+    def total_bounds(self) -> tuple[float, float, float, float]:
+        return (self._bounds[:, 0].min(), self._bounds[:, 1].min(),
+                self._bounds[:, 2].max(), self._bounds[:, 3].max())
+
+    def mean_tile_size(self) -> tuple[float, float]:
+        """
+        :return: the mean width and height of the tiles
+        """
+        return (float(np.abs(self._bounds[:, 2] - self._bounds[:, 0]).mean()),
+                float(np.abs(self._bounds[:, 3] - self._bounds[:, 1]).mean()))
+
+    def _query(self, geometry: Geometry | np.ndarray, predicate: str) -> np.ndarray:
+        """
+        queries the tree. the predicate is evaluated as predicate(geometry, tile)
+        :param geometry: the geometry or array of geometries
+        :param predicate: the shapely predicate
+        :return: the indices of the matching tiles in ascending order
+        """
+        result = self._tree.query(geometry, predicate=predicate)
+        return np.unique(result[1] if result.ndim == 2 else result)
@@ -2,9 +2,11 @@ import json
 import subprocess
 from pathlib import Path
 
+import numpy as np
 import pyproj
 import shapely
 from duckdb.duckdb import DuckDBPyConnection
+from osgeo import gdal, ogr
 from pandas import DataFrame
 from pyproj import CRS
 from shapely import box
@@ -18,6 +20,7 @@ from hub.enums.stage import Stage
 from hub.enums.vectorfiletype import VectorFileType
 from hub.executor.sqlbased import SQLBased
 from hub.utils.datalocation import DataLocation
+from hub.utils.filemetadata import FileMetadataReader
 from hub.utils.network import BasicNetworkManager
 from hub.utils.system import System
 
@@ -44,6 +47,8 @@ class VectorLocation(DataLocation):
         """
         super().__init__(path_str, DataType.VECTOR, host_params, name, uuid_name)
 
+        self._pruning_geometries = {}
+
         self._suffix = VectorFileType.get_by_value(self._files[0].suffix)
 
     def get_metadata(self, from_remote: bool = False, nm: BasicNetworkManager = None) -> list[dict]:
@@ -56,11 +61,8 @@ class VectorLocation(DataLocation):
             self._metadata = self.get_remote_metadata(nm)
             return self._metadata
 
-        def fetch_metadata(file) -> dict:
-            return json.loads(
-                subprocess.check_output(f'ogrinfo -json -nomd {file}', shell=True)
-                .decode('utf-8'))
-        self._metadata = [fetch_metadata(f) for f in self.controller_file]
+        reader = FileMetadataReader(self._host_params.controller_db_connection)
+        self._metadata = reader.read_vector(self.controller_file)
         return self._metadata
 
     def get_feature_count(self) -> int:
@@ -107,14 +109,40 @@ class VectorLocation(DataLocation):
     def get_extent_per_file(self, use_extent_crs: bool=True) -> dict[Path, Polygon]:
         return {self.files[0]: self.get_extent(use_extent_crs=use_extent_crs)}
 
-    def get_remote_metadata(self, nm: BasicNetworkManager) -> list[dict]:
-        docker_command = f"docker run --rm -v {self._host_base}:/data {self.GDAL_DOCKER_IMAGE} ogrinfo -json -nomd"
-
-        def fetch_metadata(file) -> dict:
-            result_raw = nm.run_ssh_return_result(f"{docker_command} {file}")
-            return json.loads(result_raw)
+    def get_pruning_geometries(self, mode: str) -> np.ndarray | None:
+        """
+        returns the geometries raster tiles are pruned against, in the extent crs. the geometries are read once per mode
+        :param mode: extent to prune against the extent of the dataset only, envelope to prune against the bounding box
+        of every feature, features to prune against the geometry of every feature
+        :return: the geometries, None if mode is extent
+        """
+        if mode == "extent":
+            return None
+        if mode not in ("envelope", "features"):
+            raise ValueError(f"Invalid tile pruning mode: {mode}, use extent, envelope or features")
+
+        if mode not in self._pruning_geometries:
+            with gdal.ExceptionMgr():
+                dataset = ogr.Open(str(self.controller_file[0]))
+                layer = dataset.GetLayer(0)
+                features = [f.GetGeometryRef() for f in layer]
+                features = [g for g in features if g is not None and not g.IsEmpty()]
+
+                if mode == "envelope":
+                    envelopes = np.array([g.GetEnvelope() for g in features], dtype="float64").reshape(-1, 4)
+                    geometries = shapely.box(envelopes[:, 0], envelopes[:, 2], envelopes[:, 1], envelopes[:, 3])
+                else:
+                    geometries = shapely.from_wkb([bytes(g.ExportToIsoWkb()) for g in features])
+
+            transformer = pyproj.Transformer.from_crs(self.get_crs(), self.EXTENT_CRS, always_xy=True)
+            self._pruning_geometries[mode] = shapely.transform(geometries, transformer.transform, interleaved=False)
+            print(f"read {len(features)} feature {'envelopes' if mode == 'envelope' else 'geometries'} to prune "
+                  f"raster tiles against")
+
+        return self._pruning_geometries[mode]
 
-        return [fetch_metadata(f) for f in self.docker_file]
+    def get_remote_metadata(self, nm: BasicNetworkManager) -> list[dict]:
+        return self.probe_remote_metadata(nm, "ogrinfo -json -nomd")
 
     def get_remote_extent(self, nm: BasicNetworkManager, use_extent_crs: bool=True) -> Polygon:
 
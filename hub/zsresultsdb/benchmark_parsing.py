@@ -0,0 +1,133 @@
+import argparse
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from hub.zsresultsdb.submit_data import DOCKER_STATS_QUERY, TO_BYTES_MACROS
+
+
+def generate_docker_stats(rows: int, seed: int = 0) -> str:
+    """
+    generates a docker stats resource utilization file as recorded by the docker stats sampler
+    :param rows: the amount of samples
+    :param seed: the seed of the random values
+    :return: the file contents
+    """
+    rng = random.Random(seed)
+    units = ["B", "kB", "MB", "GB", "KiB", "MiB", "GiB"]
+
+    def suffixed():
+        return f"{rng.uniform(0.1, 999):.3g}{rng.choice(units)}"
+
+    lines = ["timestamp\tID\tName\tCPUPerc\tMemUsage\tMemPerc\tNetIO\tBlockIO\tPIDs"]
+    timestamp = time.time()
+    for i in range(rows):
+        lines.append(f"{timestamp + i * 0.05:.6f}\t0123456789ab\tpostgis\t{rng.uniform(0, 800):.2f}%\t"
+                     f"{suffixed()} / {suffixed()}\t{rng.uniform(0, 100):.2f}%\t"
+                     f"{suffixed()} / {suffixed()}\t{suffixed()} / {suffixed()}\t{rng.randint(1, 200)}")
+
+    return "\n".join(lines)
+
+
+def convert_to_bytes(value: str) -> int:
+    """
+    the former conversion of a suffixed value to bytes, one value at a time
+    :param value:
+    :return:
+    """
+    if "e" in value:
+        regex_exp = re.compile("e\\+(\\d+)")
+        exp = int(regex_exp.search(value).group(1))
+        value = regex_exp.sub("0" * exp, value)
+    regex_str = re.compile("([0-9.]+)([PpTtGgMmKk]?)(i?)([Bb])")
+    match = regex_str.match(value)
+    val, factor_str, base_str, unit = match.group(1, 2, 3, 4)
+    factor_str = "B" if factor_str == "" else factor_str.upper()
+
+    base = 1024 if "i" in base_str else 1000
+    factor = {
+        "P": base ** 5,
+        "T": base ** 4,
+        "G": base ** 3,
+        "M": base ** 2,
+        "K": base ** 1,
+        "B": base ** 0
+    }[factor_str]
+
+    return int(float(val) * factor)
+
+
+def parse_docker_stats_pandas(util_file: Path) -> pd.DataFrame:
+    """
+    the former parsing path that loads the file into pandas and converts every cell on its own, kept as the baseline
+    of the benchmark
+    :param util_file: the docker stats file
+    :return: the parsed dataframe
+    """
+    util_df = pd.read_csv(util_file, delimiter="\t")
+    util_df.replace("--", np.nan, inplace=True)
+    util_df.dropna(inplace=True, axis=0)
+    util_df[["MemUsage", "MemLimit"]] = util_df["MemUsage"].str.split(" / ", expand=True)
+    util_df[["NetIO_in", "NetIO_out"]] = util_df["NetIO"].str.split(" / ", expand=True)
+    util_df[["BlockIO_in", "BlockIO_out"]] = util_df["BlockIO"].str.split(" / ", expand=True)
+
+    util_df["timestamp_host"] = pd.to_datetime(util_df["timestamp"] * (10 ** 9), unit="ns")
+    util_df["CPUUsage"] = util_df["CPUPerc"].str.rstrip(" %").astype("float") / 100
+    for column in ["MemUsage", "MemLimit", "NetIO_in", "NetIO_out", "BlockIO_in", "BlockIO_out"]:
+        util_df[column] = util_df[column].apply(convert_to_bytes)
+    util_df["PIDs"] = util_df["PIDs"].astype("int")
+
+    return util_df[
+        ["timestamp_host", "ID", "Name", "CPUUsage", "MemUsage", "MemLimit", "NetIO_in", "NetIO_out", "BlockIO_in",
+         "BlockIO_out", "PIDs"]]
+
+
+def main():
+    """
+    measures the throughput of parsing docker stats samples in rows per second, for the former pandas and the
+    current duckdb parsing path
+    :return:
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", help="The amount of samples to parse", type=int, default=500_000)
+    parser.add_argument("--repetitions", help="How often each parsing path is run", type=int, default=3)
+
+    args = parser.parse_args()
+
+    connection = duckdb.connect()
+    connection.execute(TO_BYTES_MACROS)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        util_file = Path(tmp_dir).joinpath("execution.csv")
+        util_file.write_text(generate_docker_stats(args.rows))
+
+        results = {}
+        for name, parse in [("pandas", parse_docker_stats_pandas),
+                            ("duckdb", lambda f: connection.execute(DOCKER_STATS_QUERY, {"file": str(f)}).df())]:
+            durations = []
+            for _ in range(args.repetitions):
+                start = time.perf_counter()
+                results[name] = parse(util_file)
+                durations.append(time.perf_counter() - start)
+
+            best = min(durations)
+            print(f"{name}: {args.rows} rows in {best:.3f} s, {args.rows / best:,.0f} rows/s")
+
+    # the database stores timestamps in microseconds
+    for result in results.values():
+        result["timestamp_host"] = result["timestamp_host"].dt.round("us").astype("datetime64[us]")
+
+    pd.testing.assert_frame_equal(results["pandas"].reset_index(drop=True),
+                                  results["duckdb"].reset_index(drop=True),
+                                  check_dtype=False)
+    print("both parsing paths return the same values")
+
+
+if __name__ == "__main__":
+    main()
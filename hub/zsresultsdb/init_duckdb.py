@@ -4,7 +4,7 @@ from typing import cast
 import pandas as pd
 
 from hub.benchmarkrun.benchmark_run import BenchmarkRun
-from hub.zsresultsdb.submit_data import DuckDBConnector
+from hub.zsresultsdb.submit_data import DuckDBConnector, FILE_METADATA_TABLE, parameters_fingerprint_query
 from hub.utils.rasterlocation import RasterLocation
 from hub.utils.vectorlocation import VectorLocation
 
@@ -76,9 +76,13 @@ class InitializeDuckDB:
             
             parallel_machines int,
             parallel_processes int,
+            
+            fingerprint varchar,
         )
         """)  # systems_table
 
+        self.initialize_parameter_fingerprints()
+
         self._connection.execute("""
         CREATE SEQUENCE IF NOT EXISTS seq_resourceid START 1;
         """)
@@ -115,11 +119,25 @@ class InitializeDuckDB:
             parameters int,
             benchmark_set int,
             iteration int,
+            host varchar,
             foreign key (parameters) references parameters(id),
             foreign key (benchmark_set) references benchmark_set(id)
         )
         """)  # benchmark_run_table
 
+        # databases created before runs were spread across hosts
+        self._connection.execute("alter table benchmark_run add column if not exists host varchar")
+
+        # databases created before the markers of a run were numbered identified them by controller_time. the primary
+        # key cannot be altered, thus the old table is replaced and its markers are numbered in the order received
+        unnumbered_timings = self._connection.execute("""
+        select count(*) filter (where column_name <> 'seq') > 0 and count(*) filter (where column_name = 'seq') = 0
+        from duckdb_columns()
+        where table_name = 'timings'
+        """).fetchone()[0]
+        if unnumbered_timings:
+            self._connection.execute("alter table timings rename to timings_unnumbered")
+
         self._connection.execute("""
         create table if not exists timings (
             run_id int,
@@ -130,11 +148,20 @@ class InitializeDuckDB:
             dataset varchar,
             comment varchar,
             controller_time datetime,
-            primary key (run_id, controller_time),
+            seq bigint,
+            primary key (run_id, seq),
             foreign key (run_id) references benchmark_run(id)
         )
         """)  # timings_table
 
+        if unnumbered_timings:
+            self._connection.execute("""
+            insert into timings
+            select *, row_number() over (partition by run_id order by controller_time) - 1
+            from timings_unnumbered
+            """)
+            self._connection.execute("drop table timings_unnumbered")
+
         self._connection.execute("""
         create table if not exists resource_util (
             run_id int,
@@ -154,6 +181,21 @@ class InitializeDuckDB:
         )
         """)  # resource_util_table
 
+        self._connection.execute("""
+        create table if not exists resource_sampler (
+            run_id int,
+            stage varchar,
+            sampler varchar,
+            target_hz uinteger,
+            samples uinteger,
+            duration double,
+            busy_time double,
+            cpu_time double,
+            achieved_hz double,
+            primary key (run_id, stage)
+        )
+        """)  # resource_sampler_table
+
         self._connection.execute("""
         create table if not exists results (
             run_id int,
@@ -161,10 +203,14 @@ class InitializeDuckDB:
             result_file varchar,
             line_count int,
             file_exists boolean,
+            result_table varchar,
             primary key (run_id, warm_start_no)
         )
         """)  # results_table
 
+        # databases created before result tables were stored
+        self._connection.execute("alter table results add column if not exists result_table varchar")
+
         self._connection.execute("""
         create table if not exists available_files (
             id uuid default gen_random_uuid(),
@@ -247,6 +293,39 @@ class InitializeDuckDB:
         )
         """)
 
+        self._connection.execute("""
+        create table if not exists run_checkpoint (
+            run_id int,
+            stage varchar,
+            completed_at timestamp,
+            primary key (run_id, stage),
+            foreign key (run_id) references benchmark_run(id)
+        )
+        """)  # run_checkpoint_table
+
+        self._connection.execute("""
+        create table if not exists warehouse_export (
+            benchmark_set int primary key,
+            exported_at timestamp,
+            pruned boolean,
+            foreign key (benchmark_set) references benchmark_set(id)
+        )
+        """)  # warehouse_export_table
+
+        self._connection.execute(FILE_METADATA_TABLE)  # file_metadata_table
+
+        self._connection.execute("""
+        create table if not exists run_features (
+            run_id int primary key,
+            raster_pixels ubigint,
+            vector_features ubigint,
+            filter_selectivity double,
+            extent_selectivity double,
+            crs_aligned boolean,
+            foreign key (run_id) references benchmark_run(id)
+        )
+        """)  # run_features_table
+
         print("initialized tables")
 
     def initialize_files(self, rasterfile: RasterLocation, vectorfile: VectorLocation) -> None:
@@ -296,27 +375,49 @@ class InitializeDuckDB:
 
         print(f"initialized experiments, added new experiment: {True if experiment_add else False}")
 
+    def initialize_parameter_fingerprints(self) -> None:
+        """
+        adds the fingerprint column to databases created before parameter combinations were fingerprinted and creates
+        the unique index used to look them up. if a combination was inserted multiple times, only its latest row is
+        fingerprinted, which is the one the former lookup returned
+        :return:
+        """
+        self._connection.execute("alter table parameters add column if not exists fingerprint varchar")
+
+        fingerprinted, total = self._connection.execute("select count(fingerprint), count(*) from parameters").fetchone()
+        if fingerprinted == 0 and total > 0:
+            self._connection.execute(f"""
+            update parameters set fingerprint = latest.fingerprint
+            from (
+                select id, fingerprint from ({parameters_fingerprint_query(self._connection, "parameters")})
+                qualify row_number() over (partition by fingerprint order by id desc) = 1
+            ) latest
+            where parameters.id = latest.id
+            """)
+            print(f"fingerprinted {total} existing parameter combinations")
+
+        self._connection.execute("create unique index if not exists parameters_fingerprint on parameters (fingerprint)")
+
     def initialize_parameters(self, experiments: list[BenchmarkRun]) -> None:
         """
-        inserts new parameter combinations into the database
+        inserts new parameter combinations into the database. combinations are identified by their fingerprint
         :param experiments: the lsit of experiments
         :return:
         """
-        # max_id = conn.execute("SELECT max(id) from parameters").fetchone()
-        # max_id = int(max_id[0]) if max_id[0] else 1
-        old_exp = self._connection.execute("select * from parameters").fetch_df().set_index("id")
+        # ids are assigned consecutively, the sequence of the table is not used
         new_exp_df = pd.DataFrame([e.benchmark_params.__dict__ for e in experiments]).fillna('')
-        new_exp_cleaned = self._connection.execute("select * from new_exp_df").fetch_df()
-        cleaned = new_exp_cleaned.merge(old_exp, how="left", indicator=True)
-        cleaned = cleaned[cleaned["_merge"] == 'left_only']
-        cleaned.drop(columns=["_merge"], axis=1, inplace=True)
-        max_id = len(old_exp)
-        cleaned.insert(0, "id", range(max_id + 1, max_id + len(cleaned) + 1))
-        self._connection.execute("INSERT INTO parameters SELECT * FROM cleaned")
-        # conn.executemany("insert into parameters values (?)", [e.benchmark_params.value_array() for e in experiments])
+        added = self._connection.execute(f"""
+        insert into parameters by name
+        select (select coalesce(max(id), 0) from parameters) + row_number() over () as id, * exclude (row_no)
+        from (
+            select *, row_number() over (partition by fingerprint) as row_no
+            from ({parameters_fingerprint_query(self._connection, "new_exp_df")})
+        )
+        where row_no = 1 and fingerprint not in (select fingerprint from parameters where fingerprint is not null)
+        """).fetchone()[0]
 
         print(
-            f"initialized parameters, added {len(cleaned)} new, "
+            f"initialized parameters, added {added} new, "
             f"now {self._connection.execute('SELECT count(*) from parameters').fetchone()} exist")
 
     def __del__(self):
@@ -1,17 +1,105 @@
 from __future__ import annotations
 
-import re
-import subprocess
+import atexit
+import json
+import threading
+import time
+import weakref
 from datetime import datetime
 from pathlib import Path
 
-import numpy as np
 import pandas as pd
 from duckdb import DuckDBPyConnection, connect
 from pandas import DataFrame
 
 from hub.benchmarkrun.benchmark_params import BenchmarkParameters
 
+# benchmark runs on different hosts write concurrently. a duckdb connection must not be shared between threads, thus
+# every write uses its own cursor. creating the cursor is serialized
+_cursor_lock = threading.Lock()
+
+
+# converts a suffixed value as printed by docker stats to bytes, e.g., 1.5MiB or 1e+03kB. created by DuckDBConnector
+# whenever it connects
+TO_BYTES_MACROS = r"""
+create or replace macro suffixed_to_bytes(p) as (
+    trunc(
+        cast(p.value as double)
+        * pow(10, coalesce(try_cast(p.exponent as integer), 0))
+        * pow(if(p.binary = 'i', 1024, 1000), if(p.prefix = '', 0, strpos('KMGTP', upper(p.prefix))))
+    )::ubigint
+);
+create or replace macro to_bytes(v) as (
+    suffixed_to_bytes(regexp_extract(v, '^([0-9.]+)(?:e\+([0-9]+))?([PpTtGgMmKk]?)(i?)[Bb]',
+                                     ['value', 'exponent', 'prefix', 'binary']))
+);
+"""
+
+# parses a docker stats file given as $file into the columns of resource_util. samples of stopped containers ("--")
+# are dropped
+DOCKER_STATS_QUERY = r"""
+select make_timestamp(cast("timestamp"::double * 1000000 as bigint)) as timestamp_host,
+       ID,
+       Name,
+       cast(rtrim(CPUPerc, ' %') as double) / 100 as CPUUsage,
+       to_bytes(split_part(MemUsage, ' / ', 1)) as MemUsage,
+       to_bytes(split_part(MemUsage, ' / ', 2)) as MemLimit,
+       to_bytes(split_part(NetIO, ' / ', 1)) as NetIO_in,
+       to_bytes(split_part(NetIO, ' / ', 2)) as NetIO_out,
+       to_bytes(split_part(BlockIO, ' / ', 1)) as BlockIO_in,
+       to_bytes(split_part(BlockIO, ' / ', 2)) as BlockIO_out,
+       cast(PIDs as uinteger) as PIDs
+from read_csv($file, delim = '\t', header = true, all_varchar = true)
+where columns(*) is not null and not contains(columns(*), '--')
+"""
+
+# the layout of the csv result files of most systems. executors whose results differ declare their own layout. it is
+# given to read_csv explicitly, sniffing it drops the first row of results without a header line
+RESULT_CSV_OPTIONS = {"header": True, "delim": ",", "nullstr": ""}
+
+# reads a csv result file given as $file in the layout given as $header, $delim and $nullstr
+RESULT_CSV_SOURCE = "read_csv($file, header = $header, delim = $delim, nullstr = $nullstr)"
+
+# the metadata of dataset files as read by gdalinfo/ogrinfo, valid as long as size and modification time of the file
+# do not change. created on first use, locations read their metadata before the database is initialized
+FILE_METADATA_TABLE = """
+create table if not exists file_metadata (
+    path varchar,
+    kind varchar,
+    size ubigint,
+    mtime_ns bigint,
+    metadata json,
+    primary key (path, kind)
+)
+"""
+
+
+def parameters_fingerprint_query(connection: DuckDBPyConnection, relation: str) -> str:
+    """
+    builds a query that adds the fingerprint of a parameter combination to every row of a relation with the columns of
+    the parameters table. the values are cast to the column types of the table before hashing, thus a combination has
+    the same fingerprint before and after it is inserted
+    :param connection: the duckdb connection
+    :param relation: the name of the relation, e.g., a dataframe of benchmark parameters
+    :return: the query
+    """
+    columns = [(name, column_type) for name, column_type, *_ in connection.execute("describe parameters").fetchall()
+               if name not in ("id", "fingerprint")]
+    values = ", ".join(f"coalesce(cast(cast(\"{name}\" as {column_type}) as varchar), '<null>')"
+                       for name, column_type in columns)
+
+    return f"select md5(concat_ws('|', {values})) as fingerprint, * from {relation}"
+
+
+def _cursor(connection: DuckDBPyConnection) -> DuckDBPyConnection:
+    """
+    creates a new cursor on a connection, safe to be called from multiple threads
+    :param connection: the duckdb connection
+    :return: the cursor
+    """
+    with _cursor_lock:
+        return connection.cursor()
+
 
 class DuckDBConnector:
     """
@@ -25,6 +113,10 @@ class DuckDBConnector:
         :param db_filename: the location of the database
         """
         self._connection = connect(database=str(db_filename), read_only=False)
+        # used to parse docker stats files, also in databases that were not set up by InitializeDuckDB
+        self._connection.execute(TO_BYTES_MACROS)
+        self._timings_journal_dir = Path(db_filename).with_suffix(".timings")
+        self._results_dir = Path(db_filename).with_suffix(".results")
         self._benchmark_set_id = -1
         self._is_initialized = False
 
@@ -35,7 +127,7 @@ class DuckDBConnector:
         returns a cursor of the database
         :return:
         """
-        return self._connection.cursor()
+        return _cursor(self._connection)
 
     def get_id_of_parameter(self, param: BenchmarkParameters) -> int:
         """
@@ -48,12 +140,14 @@ class DuckDBConnector:
 
         with self.get_cursor() as c:
             param_df = pd.DataFrame([param.__dict__]).fillna('')
-            param_df_cleaned = c.execute("select * from param_df").fetch_df()
-            all_params = c.execute("select * from parameters").fetch_df().set_index("id").drop_duplicates(keep="last")
-            all_params_dupes = pd.concat([all_params, param_df_cleaned])
-            param_db_row = all_params_dupes.duplicated(keep=False)[lambda x: x]
+            fingerprint = c.execute(f"select fingerprint from ({parameters_fingerprint_query(c, 'param_df')})") \
+                .fetchone()[0]
+            param_id = c.execute("select id from parameters where fingerprint = ?", [fingerprint]).fetchone()
+
+            if param_id is None:
+                raise ValueError(f"the benchmark parameters {param} are not in the database")
 
-            return int(param_db_row.head(1).index[0])
+            return int(param_id[0])
 
     def initialize_resource_limits(self, resource_limits: dict) -> tuple[int, dict]:
         """
@@ -64,14 +158,15 @@ class DuckDBConnector:
 
         resource_limits = dict(sorted(resource_limits.items(), key=lambda item: item[0]))
 
-        limit_id = self._connection.execute("select * from resource_limit rl where rl.limits = ?", [resource_limits]).fetchone()
+        with self.get_cursor() as conn:
+            limit_id = conn.execute("select * from resource_limit rl where rl.limits = ?", [resource_limits]).fetchone()
 
-        if limit_id:
-            print(f"resource limits already exist with id {limit_id}")
-            return limit_id[0], resource_limits
+            if limit_id:
+                print(f"resource limits already exist with id {limit_id}")
+                return limit_id[0], resource_limits
 
-        limit_id, limits = self._connection.execute("insert into resource_limit (limits) values (?) returning *",
-                                                    [resource_limits]).fetchone()
+            limit_id, limits = conn.execute("insert into resource_limit (limits) values (?) returning *",
+                                            [resource_limits]).fetchone()
 
         print(f"initialized resource limits")
         return limit_id, limits
@@ -92,15 +187,69 @@ class DuckDBConnector:
                 print(f"created benchmark set: {bench_set}")
                 self._benchmark_set_id = bench_set[0]
 
+            TimingsBuffer.recover(self._connection, self._timings_journal_dir)
             self._is_initialized = True
 
             return self._benchmark_set_id
 
-    def initialize_benchmark_run(self, params: BenchmarkParameters, iteration: int) -> DuckDBRunCursor:
+    def resume_benchmark_set(self, benchmark_set_id: int, experiment: str) -> int:
+        """
+        continues an existing benchmark set instead of creating a new one. all runs initialized afterward are
+        added to this set
+        :param benchmark_set_id: the id of the benchmark set to resume
+        :param experiment: the experiment name, only used to warn about a mismatch
+        :return: the benchmark set id
+        """
+        with self.get_cursor() as conn:
+            bench_set = conn.execute("select * from benchmark_set where id = ?", [benchmark_set_id]).fetchone()
+
+        if bench_set is None:
+            raise ValueError(f"benchmark set {benchmark_set_id} does not exist, cannot resume it")
+
+        if bench_set[1] != experiment:
+            print(f"benchmark set {benchmark_set_id} was created for experiment {bench_set[1]}, resuming it with {experiment}")
+
+        print(f"resuming benchmark set: {bench_set}")
+        TimingsBuffer.recover(self._connection, self._timings_journal_dir)
+        self._benchmark_set_id = bench_set[0]
+        self._is_initialized = True
+
+        return self._benchmark_set_id
+
+    def get_run_progress(self, param: BenchmarkParameters) -> tuple[set[str], int]:
+        """
+        returns how far the runs of a parameter combination got within the current benchmark set. only the run that
+        got furthest is considered
+        :param param: the benchmark parameter object
+        :return: the stages the run completed and the amount of result files it stored
+        """
+        param_id = self.get_id_of_parameter(param)
+
+        with self.get_cursor() as conn:
+            progress = conn.execute("""
+                select list(distinct rc.stage) filter (where rc.stage is not null) as stages,
+                       count(distinct r.warm_start_no) filter (where r.file_exists) as result_files
+                from benchmark_run br
+                left join run_checkpoint rc on rc.run_id = br.id
+                left join results r on r.run_id = br.id
+                where br.benchmark_set = ? and br.parameters = ?
+                group by br.id
+                order by count(distinct rc.stage) desc, result_files desc, br.id desc
+                limit 1
+            """, [self._benchmark_set_id, param_id]).fetchone()
+
+        if progress is None:
+            return set(), 0
+
+        return set(progress[0] or []), progress[1]
+
+    def initialize_benchmark_run(self, params: BenchmarkParameters, iteration: int,
+                                 host: str | None = None) -> DuckDBRunCursor:
         """
         initializes a benchmark run in the database
         :param params: the benchmark parameters object
         :param iteration: the iteration of the run
+        :param host: the host the run is performed on
         :return:
         """
         param_id = self.get_id_of_parameter(params)
@@ -108,21 +257,72 @@ class DuckDBConnector:
         with self.get_cursor() as conn:
             run = conn \
                 .execute(
-                f"insert into benchmark_run (parameters, benchmark_set, iteration) values ({param_id}, {self._benchmark_set_id}, {iteration}) returning *"
+                f"insert into benchmark_run (parameters, benchmark_set, iteration, host) values ({param_id}, {self._benchmark_set_id}, {iteration}, ?) returning *",
+                [host]
             ).fetchall()[0]
 
             print(f"created benchmark run: {run}")
-            return DuckDBRunCursor(self._connection, run[0])
+            return DuckDBRunCursor(self._connection, run[0], self._timings_journal_dir, self._results_dir)
 
 
 
+    def get_results(self, run_id: int, warm_start_no: int = 0) -> DataFrame:
+        """
+        returns the result table of an execution run as stored by add_results_file
+        :param run_id: the run id
+        :param warm_start_no: the number of the execution run, 0 for the cold start
+        :return: the result table, empty if the run has no results
+        """
+        with self.get_cursor() as conn:
+            result = conn.execute("select result_table from results where run_id = ? and warm_start_no = ?",
+                                  [run_id, warm_start_no]).fetchone()
+
+            if result is None or result[0] is None:
+                return pd.DataFrame()
+
+            return conn.execute("select * from read_parquet(?)", [result[0]]).fetch_df()
+
+    def get_file_metadata(self, kind: str, files: list[tuple[str, int, int]]) -> dict[str, dict]:
+        """
+        returns the cached metadata of files that did not change since their metadata was cached
+        :param kind: the class of data, either raster or vector
+        :param files: the path, size and modification time in ns of every file
+        :return: the metadata per path
+        """
+        files_df = pd.DataFrame(files, columns=["path", "size", "mtime_ns"])
+        with _cursor(self._connection) as conn:
+            conn.execute(FILE_METADATA_TABLE)
+            rows = conn.execute("""
+            select m.path, m.metadata
+            from file_metadata m
+            join files_df f on m.path = f.path and m.size = f.size and m.mtime_ns = f.mtime_ns
+            where m.kind = ?
+            """, [kind]).fetchall()
+
+        return {path: json.loads(metadata) for path, metadata in rows}
+
+    def put_file_metadata(self, kind: str, files: list[tuple[str, int, int, dict]]):
+        """
+        caches the metadata of files, replaces the former metadata of a path
+        :param kind: the class of data, either raster or vector
+        :param files: the path, size, modification time in ns and metadata of every file
+        :return:
+        """
+        files_df = pd.DataFrame([(path, kind, size, mtime_ns, json.dumps(metadata))
+                                 for path, size, mtime_ns, metadata in files],
+                                columns=["path", "kind", "size", "mtime_ns", "metadata"])
+        with _cursor(self._connection) as conn:
+            conn.execute(FILE_METADATA_TABLE)
+            conn.execute("insert or replace into file_metadata by name select * from files_df")
+
     def delete_available_file_by_uuid(self, uuid: str):
         """
-        deletes a file from the database by its uuid
+        deletes a file from the database by its uuid, together with the tiles registered for it
         :param uuid: the uuid of the file
         :return:
         """
-        with self._connection.cursor() as conn:
+        with _cursor(self._connection) as conn:
+            conn.execute("delete from tile_in_available where id_available = ?", [uuid])
             conn.execute("delete from available_files where id = ?", [uuid])
 
     def delete_available_files(self):
@@ -130,7 +330,7 @@ class DuckDBConnector:
         deletes all available files from the database
         :return:
         """
-        with self._connection.cursor() as conn:
+        with _cursor(self._connection) as conn:
             conn.execute("delete from tile_in_available")
             conn.execute("delete from available_files")
 
@@ -139,7 +339,7 @@ class DuckDBConnector:
         returns a dataframe of all available files in the database
         :return:
         """
-        with self._connection.cursor() as conn:
+        with _cursor(self._connection) as conn:
             return conn.execute("select * from available_files where name = ?", [name]).fetch_df()
 
     def write_optimize_system_used(self, run_id: int, system: str, previous_run_id: int, exp_group: str):
@@ -150,7 +350,7 @@ class DuckDBConnector:
         :param previous_run_id: the previous run id
         :return:
         """
-        with self._connection.cursor() as conn:
+        with _cursor(self._connection) as conn:
             conn.execute("insert into optimize_system_used (run_id, system, previous_run_id, experiment_group) values (?, ?, ?, ?)",
                          [run_id, system, previous_run_id, exp_group])
 
@@ -165,18 +365,228 @@ class DuckDBConnector:
         self._connection.close()
 
 
+# the columns of the timings table in the order of its definition, the buffered markers are inserted by position
+TIMINGS_COLUMNS = ["run_id", "marker", "timestamp", "event", "stage", "dataset", "comment", "controller_time", "seq"]
+
+
+class TimingsBuffer:
+    """
+    buffers the timings markers of a benchmark run in memory and inserts them into the database in bulk, once enough
+    markers are buffered, the oldest one is too old, or the buffer is flushed explicitly. before a marker is buffered,
+    it is appended to a journal file. the journal is cleared with every successful insert, thus markers that were not
+    inserted when the controller crashed are recovered from it the next time a benchmark set is initialized
+    """
+    _open_buffers: weakref.WeakSet[TimingsBuffer] = weakref.WeakSet()
+
+    def __init__(self, connection: DuckDBPyConnection, run_id: int, journal_file: Path, flush_rows: int = 5000,
+                 flush_interval: float = 30.0):
+        """
+        the init function
+        :param connection: the duckdb connection
+        :param run_id: the run id
+        :param journal_file: the file the buffered markers are journaled to
+        :param flush_rows: the amount of buffered markers after which they are inserted
+        :param flush_interval: the age of the oldest buffered marker in seconds after which the markers are inserted
+        """
+        self._connection = connection
+        self._run_id = run_id
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._rows: list[list] = []
+        self._oldest = 0.0
+        self._next_seq = TimingsBuffer.next_seq(connection, run_id)
+
+        self._journal_file = journal_file
+        self._journal_file.parent.mkdir(parents=True, exist_ok=True)
+        self._journal = self._journal_file.open("a", encoding="utf-8")
+
+        TimingsBuffer._open_buffers.add(self)
+
+    @staticmethod
+    def next_seq(connection: DuckDBPyConnection, run_id: int) -> int:
+        """
+        returns the sequence number of the next marker of a run, i.e., the one after the markers already inserted
+        :param connection: the duckdb connection
+        :param run_id: the run id
+        :return: the sequence number
+        """
+        with _cursor(connection) as conn:
+            return conn.execute("select coalesce(max(seq), -1) + 1 from timings where run_id = ?",
+                                [run_id]).fetchone()[0]
+
+    @staticmethod
+    def parse_marker(run_id: int, marker: str, controller_time: float, seq: int) -> list:
+        """
+        converts a timings string into a row of the timings table
+        :param run_id: the run id
+        :param marker: the timings string
+        :param controller_time: the unix timestamp the marker was received by the controller
+        :param seq: the sequence number of the marker within the run
+        :return: the row
+        """
+        marker, timestamp, event, stage, system, dataset, comment = tuple(marker.split(","))
+
+        return [
+            run_id,
+            marker,
+            datetime.fromtimestamp(float(timestamp)) if timestamp else None,
+            event.strip(),
+            stage.strip(),
+            dataset.strip(),
+            comment.strip(),
+            datetime.fromtimestamp(controller_time),
+            seq
+        ]
+
+    def append(self, marker: str, controller_time: float):
+        """
+        journals and buffers a timings marker, inserts the buffered markers if a threshold is reached
+        :param marker: the timings string
+        :param controller_time: the unix timestamp the marker was received by the controller
+        :return:
+        """
+        with self._lock:
+            # markers are identified by the order they were received in, several of them may be received within the
+            # same microsecond
+            seq = self._next_seq
+            self._next_seq += 1
+            row = self.parse_marker(self._run_id, marker, controller_time, seq)
+
+            self._journal.write(json.dumps({"marker": marker.strip(), "controller_time": controller_time, "seq": seq}))
+            self._journal.write("\n")
+            # handed to the operating system, thus it survives a crash of the controller process
+            self._journal.flush()
+
+            if not self._rows:
+                self._oldest = time.time()
+            self._rows.append(row)
+
+            if len(self._rows) >= self.flush_rows or time.time() - self._oldest >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        """
+        inserts all buffered markers into the database
+        :return:
+        """
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """
+        inserts all buffered markers and removes the journal
+        :return:
+        """
+        with self._lock:
+            if self._journal.closed:
+                return
+
+            self._flush()
+            self._journal.close()
+            if not self._rows:
+                self._journal_file.unlink(missing_ok=True)
+
+        TimingsBuffer._open_buffers.discard(self)
+
+    def _flush(self):
+        if not self._rows:
+            return
+
+        timings_df = pd.DataFrame(self._rows, columns=TIMINGS_COLUMNS)
+
+        try:
+            with _cursor(self._connection) as conn:
+                conn.execute("insert into timings select * from timings_df")
+        except Exception as e:
+            print(f"could not insert {len(self._rows)} timings markers, keeping them in the journal: {e}")
+            return
+
+        self._rows = []
+        self._journal.seek(0)
+        self._journal.truncate()
+
+    @staticmethod
+    def recover(connection: DuckDBPyConnection, journal_dir: Path):
+        """
+        inserts the markers of all journals that were left behind by a crashed controller
+        :param connection: the duckdb connection
+        :param journal_dir: the directory of the journals
+        :return:
+        """
+        open_journals = {b._journal_file for b in TimingsBuffer._open_buffers}
+
+        for journal_file in sorted(journal_dir.glob("run_*.jsonl")):
+            if journal_file in open_journals:
+                continue
+
+            run_id = int(journal_file.stem.removeprefix("run_"))
+            next_seq = TimingsBuffer.next_seq(connection, run_id)
+            rows = []
+            with journal_file.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # the last line may be incomplete
+                        continue
+                    # journals written before the markers were numbered are numbered after the inserted markers
+                    if "seq" not in entry:
+                        entry["seq"] = next_seq
+                        next_seq += 1
+                    rows.append(TimingsBuffer.parse_marker(run_id, entry["marker"], entry["controller_time"],
+                                                           entry["seq"]))
+
+            if rows:
+                timings_df = pd.DataFrame(rows, columns=TIMINGS_COLUMNS)
+                # the controller may have crashed after inserting the markers but before clearing the journal. only
+                # these identical rows are skipped, any other marker with the same key fails the insert
+                with _cursor(connection) as conn:
+                    conn.execute("""
+                    insert into timings
+                    select * from timings_df j
+                    where not exists (
+                        select 1 from timings t
+                        where t.run_id = j.run_id and t.seq = j.seq and t.controller_time = j.controller_time
+                          and t.marker is not distinct from j.marker and t.event is not distinct from j.event
+                          and t.stage is not distinct from j.stage and t.comment is not distinct from j.comment
+                          and t."timestamp" is not distinct from j."timestamp"
+                    )
+                    """)
+
+            print(f"recovered {len(rows)} timings markers of run {run_id} from {journal_file}")
+            journal_file.unlink()
+
+    @staticmethod
+    def close_all():
+        """
+        inserts the buffered markers of all open buffers
+        :return:
+        """
+        for timings_buffer in list(TimingsBuffer._open_buffers):
+            timings_buffer.close()
+
+
+atexit.register(TimingsBuffer.close_all)
+
+
 class DuckDBRunCursor:
     """
     a duckdb cursor to allow slightly parallel data entry
     """
-    def __init__(self, connection: DuckDBPyConnection, run_id: int):
+    def __init__(self, connection: DuckDBPyConnection, run_id: int, timings_journal_dir: Path, results_dir: Path):
         """
 
         :param connection: the duckdb connection
         :param run_id: the run id
+        :param timings_journal_dir: the directory the buffered timings markers are journaled to
+        :param results_dir: the directory the result tables are stored in as parquet files
         """
         self._connection = connection
         self._run_id = run_id
+        self._results_dir = results_dir.joinpath(f"run_{run_id}")
+        self._timings = TimingsBuffer(connection, run_id, timings_journal_dir.joinpath(f"run_{run_id}.jsonl"))
 
     @property
     def run_id(self) -> int:
@@ -186,26 +596,51 @@ class DuckDBRunCursor:
         """
         return self._run_id
 
-    def write_timings_marker(self, marker: str):
+    def write_timings_marker(self, marker: str, controller_time: float | None = None):
         """
-        inserts a timings marker into the database
+        writes a timings marker into the database. markers are buffered and inserted in bulk, see TimingsBuffer
         :param marker: the timings string
+        :param controller_time: the unix timestamp the marker was received by the controller, now if not given
         :return:
         """
-        marker, timestamp, event, stage, system, dataset, comment = tuple(marker.split(","))
+        self._timings.append(marker, controller_time if controller_time is not None else time.time())
 
-        with self._connection.cursor() as conn:
-            conn.execute("insert into timings values (?, ?, ?, ?, ?, ?, ?, ?)",
-                         [
-                             self._run_id,
-                             marker,
-                             datetime.fromtimestamp(float(timestamp)) if timestamp else None,
-                             event.strip(),
-                             stage.strip(),
-                             dataset.strip(),
-                             comment.strip(),
-                             datetime.now()
-                         ])
+    def flush_timings(self):
+        """
+        inserts all buffered timings markers into the database
+        :return:
+        """
+        self._timings.flush()
+
+    def write_run_features(self, features: dict):
+        """
+        writes the features of the datasets and workload of the run, used to train the cost model of the optimizer
+        :param features: the features, see CostModel.run_features
+        :return:
+        """
+        with _cursor(self._connection) as conn:
+            conn.execute("""
+            insert or replace into run_features
+                (run_id, raster_pixels, vector_features, filter_selectivity, extent_selectivity, crs_aligned)
+            values ($run_id, $raster_pixels, $vector_features, $filter_selectivity, $extent_selectivity, $crs_aligned)
+            """, {"run_id": self._run_id} | features)
+
+    def close(self):
+        """
+        inserts all buffered timings markers into the database and removes their journal
+        :return:
+        """
+        self._timings.close()
+
+    def write_checkpoint(self, stage: str):
+        """
+        records that the run completed a stage. written immediately, thus it survives a crash of the controller
+        :param stage: the completed stage
+        :return:
+        """
+        with _cursor(self._connection) as conn:
+            conn.execute("insert or replace into run_checkpoint values (?, ?, ?)",
+                         [self._run_id, stage, datetime.now()])
 
     def add_resource_utilization(self, util_files: list[Path]):
         """
@@ -215,17 +650,46 @@ class DuckDBRunCursor:
         """
         for f in util_files:
             stage = f.stem
-            util_df = pd.read_csv(f, delimiter="\t")
-            parsed_util_df = self._parse_docker_stats(util_df)
-            parsed_util_df.insert(loc=0, column="run_id", value=self._run_id)
-            parsed_util_df["stage"] = stage
-            with self._connection.cursor() as conn:
-                conn.execute("insert into resource_util select * from parsed_util_df")
+            with f.open("r") as util_file:
+                header = util_file.readline()
+
+            if "CPUUsec" in header:
+                parsed_util_df = self._parse_cgroup_samples(pd.read_csv(f, delimiter="\t"))
+                parsed_util_df.insert(loc=0, column="run_id", value=self._run_id)
+                parsed_util_df["stage"] = stage
+                with _cursor(self._connection) as conn:
+                    conn.execute("insert into resource_util select * from parsed_util_df")
+            else:
+                # docker stats files are parsed by duckdb directly, without loading them into pandas
+                with _cursor(self._connection) as conn:
+                    conn.execute(f"insert into resource_util select $run_id, *, $stage from ({DOCKER_STATS_QUERY})",
+                                 {"run_id": self._run_id, "stage": stage, "file": str(f)})
+
+            overhead_file = f.with_name(f"{stage}.sampler.csv")
+            if overhead_file.exists():
+                self.add_sampler_overhead(stage, overhead_file)
+
+    def add_sampler_overhead(self, stage: str, overhead_file: Path):
+        """
+        inserts the overhead the resource sampler caused on the host during a stage into the database
+        :param stage: the stage
+        :param overhead_file: the overhead file written by the sampler
+        :return:
+        """
+        overhead_df = pd.read_csv(overhead_file, delimiter="\t")
+        overhead_df["achieved_hz"] = overhead_df["samples"] / overhead_df["duration"]
+        overhead_df.insert(loc=0, column="run_id", value=self._run_id)
+        overhead_df.insert(loc=1, column="stage", value=stage)
+        with _cursor(self._connection) as conn:
+            conn.execute("insert into resource_sampler select * from overhead_df")
 
-    def add_results_file(self, filename: Path) -> (Path, bool):
+    def add_results_file(self, filename: Path, csv_options: dict = RESULT_CSV_OPTIONS) -> (Path, bool):
         """
-        inserts the location to a results file into the database
+        inserts the location to a results file into the database. csv results are additionally stored as a parquet
+        file next to the database, parquet results are referenced as they are. the row count is determined while
+        doing so, i.e., without a header line
         :param filename: the filename
+        :param csv_options: the layout of csv results, see RESULT_CSV_OPTIONS
         :return: the path and the information, whether it is empty or not
         """
         match filename.suffixes[0].split("-"):
@@ -236,71 +700,75 @@ class DuckDBRunCursor:
             case _:
                 raise Exception("could not find info on run type in results file name")
 
-        linecount = int(subprocess.run(f"wc -l {filename} | " + "awk '{ print $1 }'",
-                                       shell=True, capture_output=True).stdout.decode("utf-8").strip()) \
-            if filename.exists() else 0
-
-        with self._connection.cursor() as conn:
-            conn.execute("insert into results values (?, ?, ?, ?, ?)",
-                         [self._run_id, warm_start_no, str(filename), linecount, filename.exists()])
+        result_table = None
+        if not filename.exists():
+            linecount = 0
+        elif filename.suffix == ".parquet":
+            # the row count is taken from the parquet metadata, the file is not scanned
+            result_table = filename
+            with _cursor(self._connection) as conn:
+                linecount = conn.execute("select sum(num_rows) from parquet_file_metadata(?)",
+                                         [str(filename)]).fetchone()[0] or 0
+        else:
+            result_table, linecount = self._store_result_table(filename, warm_start_no, csv_options)
+
+        with _cursor(self._connection) as conn:
+            conn.execute("insert into results (run_id, warm_start_no, result_file, line_count, file_exists, result_table) "
+                         "values (?, ?, ?, ?, ?, ?)",
+                         [self._run_id, warm_start_no, str(filename), linecount, filename.exists(),
+                          str(result_table) if result_table else None])
 
         return filename, linecount > 0
 
+    def _store_result_table(self, filename: Path, warm_start_no: int,
+                            csv_options: dict) -> tuple[Path | None, int]:
+        """
+        stores a csv result file as parquet file in the results directory of the run
+        :param filename: the csv result file
+        :param warm_start_no: the number of the execution run
+        :param csv_options: the layout of the file, see RESULT_CSV_OPTIONS
+        :return: the parquet file and the amount of rows. if the file cannot be parsed, no parquet file is stored and
+        the lines of the file are counted instead
+        """
+        self._results_dir.mkdir(parents=True, exist_ok=True)
+        result_table = self._results_dir.joinpath(f"{warm_start_no}.parquet")
+
+        if filename.stat().st_size > 0:
+            try:
+                with _cursor(self._connection) as conn:
+                    rows = conn.execute(f"copy (select * from {RESULT_CSV_SOURCE}) to '{result_table}' "
+                                        f"(format parquet)", {"file": str(filename)} | csv_options).fetchone()[0]
+                return result_table, rows
+            except Exception as e:
+                print(f"could not store {filename} as result table, counting its lines instead: {e}")
+                result_table.unlink(missing_ok=True)
+
+        linecount = 0
+        with filename.open("rb") as f:
+            while chunk := f.read(1 << 20):
+                linecount += chunk.count(b"\n")
+
+        return None, max(linecount - int(csv_options["header"]), 0)
+
     @staticmethod
-    def _parse_docker_stats(util_df: DataFrame):
+    def _parse_cgroup_samples(util_df: DataFrame):
         """
-        a helper class that parses docker stats strings
+        a helper function that parses the samples of the cgroup sampler. the cpu usage is derived from the cumulative cpu
+        time of two consecutive samples of the same container, thus the first sample of each container is dropped
         :param util_df:
         :return:
         """
-        util_df.replace("--", np.NAN, inplace=True)
-        util_df.dropna(inplace=True, axis=0)
-        util_df[["MemUsage", "MemLimit"]] = util_df["MemUsage"].str.split(" / ", expand=True)
-        util_df[["NetIO_in", "NetIO_out"]] = util_df["NetIO"].str.split(" / ", expand=True)
-        util_df[["BlockIO_in", "BlockIO_out"]] = util_df["BlockIO"].str.split(" / ", expand=True)
+        util_df = util_df.sort_values(["ID", "timestamp"])
+        per_container = util_df.groupby("ID")
+        util_df["CPUUsage"] = per_container["CPUUsec"].diff() / (10 ** 6) / per_container["timestamp"].diff()
+        util_df = util_df.dropna(subset=["CPUUsage"])
 
         util_df["timestamp_host"] = pd.to_datetime(util_df["timestamp"] * (10 ** 9), unit="ns")
-        util_df["CPUUsage"] = util_df["CPUPerc"].str.rstrip(" %").astype("float") / 100
-        util_df["MemUsage"] = util_df["MemUsage"].apply(DuckDBRunCursor._convert_to_bytes)
-        util_df["MemLimit"] = util_df["MemLimit"].apply(DuckDBRunCursor._convert_to_bytes)
-        util_df["NetIO_in"] = util_df["NetIO_in"].apply(DuckDBRunCursor._convert_to_bytes)
-        util_df["NetIO_out"] = util_df["NetIO_out"].apply(DuckDBRunCursor._convert_to_bytes)
-        util_df["BlockIO_in"] = util_df["BlockIO_in"].apply(DuckDBRunCursor._convert_to_bytes)
-        util_df["BlockIO_out"] = util_df["BlockIO_out"].apply(DuckDBRunCursor._convert_to_bytes)
+        util_df["Name"] = util_df["Name"].fillna("")
+        util_df = util_df.drop_duplicates(subset=["timestamp_host"])
 
-        util_df["PIDs"] = util_df["PIDs"].astype("int")
-
-        # util_df.drop(["timestamp", "CPUPerc", "NetIO", "BlockIO", "MemPerc"], inplace=True, axis=1)
         out_df = util_df[
             ["timestamp_host", "ID", "Name", "CPUUsage", "MemUsage", "MemLimit", "NetIO_in", "NetIO_out", "BlockIO_in",
              "BlockIO_out", "PIDs"]]
 
         return out_df
-
-    @staticmethod
-    def _convert_to_bytes(value: str) -> int:
-        """
-        converts a suffixed value to byres
-        :param value:
-        :return:
-        """
-        if "e" in value:
-            regex_exp = re.compile("e\+(\d+)")
-            exp = int(regex_exp.search(value).group(1))
-            value = regex_exp.sub("0" * exp, value)
-        regex_str = re.compile("([0-9.]+)([PpTtGgMmKk]?)(i?)([Bb])")
-        match = regex_str.match(value)
-        val, factor_str, base_str, unit = match.group(1, 2, 3, 4)
-        factor_str = "B" if factor_str == "" else factor_str.upper()
-
-        base = 1024 if "i" in base_str else 1000
-        factor = {
-            "P": base ** 5,
-            "T": base ** 4,
-            "G": base ** 3,
-            "M": base ** 2,
-            "K": base ** 1,
-            "B": base ** 0
-        }[factor_str]
-
-        return int(float(val) * factor)
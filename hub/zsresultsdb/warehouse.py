@@ -0,0 +1,260 @@
+import argparse
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import yaml
+from duckdb import DuckDBPyConnection, connect
+from pandas import DataFrame
+
+# the measurement tables, exported as parquet datasets partitioned by benchmark set and system. the queries add both
+# partition columns to the rows of the given benchmark sets
+PARTITIONED_TABLES = {
+    "benchmark_run": """
+        select br.*, p.system
+        from benchmark_run br
+        join parameters p on br.parameters = p.id
+        where list_contains({sets}, br.benchmark_set)
+    """,
+    "timings": """
+        select t.*, br.benchmark_set, p.system
+        from timings t
+        join benchmark_run br on t.run_id = br.id
+        join parameters p on br.parameters = p.id
+        where list_contains({sets}, br.benchmark_set)
+    """,
+    "resource_util": """
+        select ru.*, br.benchmark_set, p.system
+        from resource_util ru
+        join benchmark_run br on ru.run_id = br.id
+        join parameters p on br.parameters = p.id
+        where list_contains({sets}, br.benchmark_set)
+    """,
+    "resource_sampler": """
+        select rs.*, br.benchmark_set, p.system
+        from resource_sampler rs
+        join benchmark_run br on rs.run_id = br.id
+        join parameters p on br.parameters = p.id
+        where list_contains({sets}, br.benchmark_set)
+    """,
+    "results": """
+        select r.*, br.benchmark_set, p.system
+        from results r
+        join benchmark_run br on r.run_id = br.id
+        join parameters p on br.parameters = p.id
+        where list_contains({sets}, br.benchmark_set)
+    """,
+}
+
+# reads a partitioned table, the partition columns keep the types of the live database
+PARTITIONED_SOURCE = "read_parquet('{table_dir}/**/*.parquet', hive_partitioning = true, union_by_name = true, " \
+                     "hive_types = {{'benchmark_set': integer, 'system': varchar}})"
+
+# the tables describing the benchmark sets, small enough to be rewritten as a whole on every export
+DIMENSION_TABLES = ["parameters", "benchmark_set", "experiments", "files", "resource_limit"]
+
+# the tables whose rows of exported benchmark sets are deleted from the live database when pruning
+PRUNED_TABLES = ["timings", "resource_util", "resource_sampler"]
+
+
+def export_warehouse(connection: DuckDBPyConnection, warehouse_dir: Path, benchmark_set_ids: list[int] | None = None,
+                     prune: bool = False) -> list[int]:
+    """
+    exports benchmark sets from the live database into the parquet warehouse. an exported benchmark set replaces its
+    former export. the schema of the live tables and the views over the warehouse are written alongside the data
+    :param connection: the connection to the live database
+    :param warehouse_dir: the directory of the warehouse
+    :param benchmark_set_ids: the benchmark sets to export, all sets not exported yet if None
+    :param prune: whether to delete the measurements of the exported sets from the live database afterward
+    :return: the ids of the exported benchmark sets
+    """
+    if benchmark_set_ids is None:
+        benchmark_set_ids = [row[0] for row in connection.execute(
+            "select id from benchmark_set where id not in (select benchmark_set from warehouse_export) order by id"
+        ).fetchall()]
+
+    pruned = {row[0] for row in connection.execute("select benchmark_set from warehouse_export where pruned").fetchall()}
+    if pruned.intersection(benchmark_set_ids):
+        print(f"skipping benchmark sets {sorted(pruned.intersection(benchmark_set_ids))}, "
+              f"their measurements were pruned from the database after their last export")
+        benchmark_set_ids = [i for i in benchmark_set_ids if i not in pruned]
+
+    if not benchmark_set_ids:
+        print("no benchmark sets to export")
+        return []
+
+    warehouse_dir.mkdir(parents=True, exist_ok=True)
+    sets = f"[{', '.join(str(int(i)) for i in benchmark_set_ids)}]"
+
+    for table, query in PARTITIONED_TABLES.items():
+        table_dir = warehouse_dir.joinpath(table)
+        for benchmark_set_id in benchmark_set_ids:
+            shutil.rmtree(table_dir.joinpath(f"benchmark_set={benchmark_set_id}"), ignore_errors=True)
+
+        connection.execute(f"""
+        copy ({query.format(sets=sets)}) to '{table_dir}'
+        (format parquet, compression zstd, partition_by (benchmark_set, system), overwrite_or_ignore true)
+        """)
+        # no partition is written for a table without rows, its view reads this file instead
+        connection.execute(f"copy (select * from ({query.format(sets=sets)}) limit 0) "
+                           f"to '{warehouse_dir.joinpath(f'{table}.empty.parquet')}' (format parquet)")
+
+    for table in DIMENSION_TABLES:
+        connection.execute(f"copy (select * from {table}) to '{warehouse_dir.joinpath(f'{table}.parquet')}' "
+                           f"(format parquet, compression zstd)")
+
+    schema = {table: [row[0] for row in connection.execute(f"describe {table}").fetchall()]
+              for table in [*PARTITIONED_TABLES, *DIMENSION_TABLES]}
+    warehouse_dir.joinpath("schema.json").write_text(json.dumps(schema, indent=2))
+    warehouse_dir.joinpath("views.sql").write_text(warehouse_views(warehouse_dir.absolute(), schema))
+
+    if prune:
+        for table in PRUNED_TABLES:
+            connection.execute(f"""
+            delete from {table}
+            where run_id in (select id from benchmark_run where list_contains({sets}, benchmark_set))
+            """)
+        connection.execute("checkpoint")
+        print(f"pruned the measurements of benchmark sets {benchmark_set_ids} from the database")
+
+    connection.execute(f"""
+    insert or replace into warehouse_export (benchmark_set, exported_at, pruned)
+    select unnest({sets}), ?, ?
+    """, [datetime.now(), prune])
+
+    print(f"exported benchmark sets {benchmark_set_ids} to {warehouse_dir}")
+    return benchmark_set_ids
+
+
+def warehouse_views(warehouse_dir: Path, schema: dict[str, list[str]]) -> str:
+    """
+    creates the views over the warehouse. every view has the name and the columns of its table in the live database,
+    thus queries written against the database run unchanged
+    :param warehouse_dir: the directory of the warehouse
+    :param schema: the columns of each table
+    :return: the create view statements, one per line
+    """
+    statements = []
+    for table, columns in schema.items():
+        if table in PARTITIONED_TABLES:
+            source = partitioned_source(warehouse_dir, table)
+            if source is None:
+                print(f"{table} is not part of the warehouse, export the benchmark sets again to add it")
+                continue
+        else:
+            source = f"read_parquet('{warehouse_dir.joinpath(f'{table}.parquet')}')"
+
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        statements.append(f"create or replace view {table} as select {column_list} from {source};")
+
+    return "\n".join(statements) + "\n"
+
+
+def partitioned_source(warehouse_dir: Path, table: str) -> str | None:
+    """
+    returns the source of a partitioned table. a table without any exported rows is read from its zero-row file, which
+    has the columns and types of the live table
+    :param warehouse_dir: the directory of the warehouse
+    :param table: the table, one of PARTITIONED_TABLES
+    :return: the source, None if the table was never exported
+    """
+    table_dir = warehouse_dir.joinpath(table)
+    if any(table_dir.glob("**/*.parquet")):
+        return PARTITIONED_SOURCE.format(table_dir=table_dir)
+
+    empty_file = warehouse_dir.joinpath(f"{table}.empty.parquet")
+    return f"read_parquet('{empty_file}')" if empty_file.exists() else None
+
+
+class ResultsWarehouse:
+    """
+    read-only query layer over the parquet warehouse. does not touch the live database, thus it can be used while
+    benchmarks are running
+    """
+
+    def __init__(self, warehouse_dir: Path):
+        """
+        the init function
+        :param warehouse_dir: the directory of the warehouse
+        """
+        self.warehouse_dir = Path(warehouse_dir).expanduser().absolute()
+        schema_file = self.warehouse_dir.joinpath("schema.json")
+        if not schema_file.exists():
+            raise FileNotFoundError(f"{self.warehouse_dir} is not a results warehouse, export benchmark sets first")
+
+        self._schema = json.loads(schema_file.read_text())
+        self._connection = connect()
+        self._connection.execute(warehouse_views(self.warehouse_dir, self._schema))
+
+    def query(self, sql: str, parameters: list | dict | None = None) -> DataFrame:
+        """
+        runs a query against the views of the warehouse
+        :param sql: the query
+        :param parameters: the parameters of the query
+        :return: the result
+        """
+        return self._connection.execute(sql, parameters).fetch_df()
+
+    def scan(self, table: str, benchmark_set_ids: list[int] | None = None,
+             systems: list[str] | None = None) -> DataFrame:
+        """
+        reads a partitioned table. only the partitions of the given benchmark sets and systems are read
+        :param table: the table, one of PARTITIONED_TABLES
+        :param benchmark_set_ids: the benchmark sets to read, all if None
+        :param systems: the systems to read, all if None
+        :return: the rows including the benchmark_set and system columns
+        """
+        if table not in PARTITIONED_TABLES:
+            raise ValueError(f"{table} is not partitioned, use one of {list(PARTITIONED_TABLES)}")
+
+        source = partitioned_source(self.warehouse_dir, table)
+        if source is None:
+            raise ValueError(f"{table} is not part of the warehouse, export the benchmark sets again to add it")
+
+        return self._connection.execute(f"""
+        select *
+        from {source}
+        where ($sets is null or list_contains($sets, benchmark_set))
+          and ($systems is null or list_contains($systems, system))
+        """, {"sets": benchmark_set_ids, "systems": systems}).fetch_df()
+
+    def close(self):
+        """
+        closes the connection
+        :return:
+        """
+        self._connection.close()
+
+
+def main():
+    """
+    exports benchmark sets from the results database into the parquet warehouse
+    :return:
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", help="Specify the path to the controller config file", required=True)
+    parser.add_argument("--warehouse",
+                        help="The directory of the warehouse, next to the results database if not given")
+    parser.add_argument("--sets", help="The benchmark sets to export, comma-separated. All sets not exported yet if "
+                                       "not given")
+    parser.add_argument("--prune", help="Delete the measurements of the exported sets from the results database",
+                        action="store_true")
+
+    args = parser.parse_args()
+
+    with open(args.config) as c:
+        db_path = Path(yaml.safe_load(c)["config"]["controller"]["results_db"]).expanduser()
+
+    warehouse_dir = Path(args.warehouse).expanduser() if args.warehouse else db_path.with_suffix(".warehouse")
+    benchmark_set_ids = [int(i) for i in args.sets.split(",")] if args.sets else None
+
+    connection = connect(database=str(db_path), read_only=False)
+    try:
+        export_warehouse(connection, warehouse_dir, benchmark_set_ids, args.prune)
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()